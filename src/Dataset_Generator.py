@@ -3,25 +3,33 @@ import numpy as np
 import os
 import cv2
 from mathutils import Matrix, Euler
+from launcher import generator_args, apply_thread_budget, seed_scene, scene_complete, write_scene_manifest
+from color_stage import apply_color_mode
+from render_plan import configure_renderer
+from material_registry import MaterialRegistry
+from telemetry import configure_telemetry, telemetry_name, stage, count, add_bytes, read_records, report
+
+# --scenes / --master-seed / --threads / --output-dir (see launcher.py)
+args = generator_args(default_scenes="0-9", default_output="output")
 
 # Initialize BlenderProc
 bproc.init()
+apply_thread_budget(bproc, args.threads)
+materials = MaterialRegistry(bproc)
 
 # Configuration
 objects_folder = os.path.join(os.path.dirname(__file__), "../obj")
+# Colour convention of the RGB PNGs (see color_stage.COLOR_MODES)
+COLOR_MODE = "gamma22"
+# Render quality/speed (see render_plan.RENDER_PRESETS); --preset overrides it
+RENDER_PRESET = "balanced"
 
 def load_all_objs():
     objects = []
     for file in os.listdir(objects_folder):
         if file.lower().endswith(".obj"):
             objs = bproc.loader.load_obj(os.path.join(objects_folder, file))
-            for obj in objs:
-                if not obj.get_materials():
-                    mat = obj.new_material("DefaultMaterial")
-                    # Bright red material with full opacity
-                    mat.set_principled_shader_value("Base Color", [1.0, 0.2, 0.2, 1.0])
-                    mat.set_principled_shader_value("Roughness", 0.2)
-                objects.extend(objs)
+            objects.extend(objs)
     return objects
 
 # Vibrant test colors (RGBA)
@@ -48,21 +56,38 @@ def setup_lights():
     point_light.set_energy(20)
     point_light.set_color([1, 1, 0.9])
 
-for scene_num in range(10):
-    if scene_num > 0:
+# Per-scene stage times, frames, bytes and peak RSS (summary: python telemetry.py <output_dir>)
+os.makedirs(args.output_dir, exist_ok=True)
+telemetry = configure_telemetry(os.path.join(args.output_dir, telemetry_name(args.shard_id)), args.shard_id,
+                                args.profile)
+
+first_scene = True
+for scene_num in args.scenes:
+    output_dir = os.path.join(args.output_dir, f"scene_{scene_num}")
+    if scene_complete(output_dir):
+        print(f"Scene {scene_num} already complete, skipping")
+        continue
+    if not first_scene:
         bproc.clean_up()
+        materials.collect_garbage()
+    first_scene = False
+    # Own seed per scene: any scene can be regenerated on its own
+    seed = seed_scene(args.master_seed, scene_num)
+    telemetry.begin_scene(scene_num, seed=seed)
     
-    loaded_objects = load_all_objs()
+    with stage("asset_load"):
+        loaded_objects = load_all_objs()
     setup_lights()
     
-    # MATERIAL SETUP - using the fixed colors from first script
+    # MATERIAL SETUP - using the fixed colors from first script, one shared material per color
     for idx, obj in enumerate(loaded_objects):
         obj.set_cp("category_id", 1)
         color = COLORS[idx % len(COLORS)]
-        for mat in obj.get_materials():
-            mat.set_principled_shader_value("Base Color", color)
-            mat.set_principled_shader_value("Roughness", 0.2)
-            mat.set_principled_shader_value("Metallic", 0.0)
+        mat = materials.get("flat", base_color=tuple(color), roughness=0.2, metallic=0.0)
+        if not obj.get_materials():
+            obj.add_material(mat)
+        for slot in range(len(obj.get_materials())):
+            obj.set_material(slot, mat)
     
     # Object placement with scaling from first script
     for obj in loaded_objects:
@@ -82,37 +107,43 @@ for scene_num in range(10):
         rotation = bproc.camera.rotation_from_forward_vec(-np.array(location))
         bproc.camera.add_camera_pose(Matrix.Translation(location) @ Matrix(rotation).to_4x4())
     
-    # RENDER SETTINGS - using settings from first script
-    bproc.renderer.set_max_amount_of_samples(100)
-    bproc.renderer.set_output_format("PNG")
-    bproc.renderer.enable_segmentation_output(default_values={'category_id': 0})
-    bproc.renderer.set_light_bounces(diffuse_bounces=4, glossy_bounces=4)
+    # RENDER SETTINGS - applied once per process (the segmentation pass must not be added twice)
+    render_settings = configure_renderer(bproc, preset=args.preset or RENDER_PRESET, map_by="class",
+                                         default_values={'category_id': 0})
     
     # Render
-    data = bproc.renderer.render()
+    with stage("render"):
+        data = bproc.renderer.render()
+    telemetry.end_profile(scene_num)
     
     # Save outputs
-    output_dir = f"output/scene_{scene_num}"
     os.makedirs(output_dir, exist_ok=True)
     
+    # Labels-only runs keep the segmentation only
+    if render_settings["labels_only"]:
+        data.pop("colors", None)
+
     # Save HDF5
-    bproc.writer.write_hdf5(output_dir, data)
-    
-    # Handle color images properly with gamma correction from first script
-    for i, img in enumerate(data["colors"]):
-        # Convert to numpy array if needed
-        if not isinstance(img, np.ndarray):
-            img = np.array(img)
-        
-        # Ensure proper color format
-        if len(img.shape) == 3 and img.shape[2] == 3:  # RGB image
-            # Apply gamma correction as in first script
-            gamma_corrected = np.clip(img/255, 0, 1)**(1/2.2) * 255
-            # Convert to BGR for OpenCV
-            img_bgr = cv2.cvtColor(gamma_corrected.astype(np.uint8), cv2.COLOR_RGB2BGR)
-            cv2.imwrite(os.path.join(output_dir, f"rgb_{i:04d}.png"), img_bgr)
+    with stage("write_hdf5"):
+        bproc.writer.write_hdf5(output_dir, data)
     
+    # Gamma correction of all frames at once (one LUT pass, already BGR for OpenCV)
+    if "colors" in data:
+        colors = np.asarray(data["colors"])
+        with stage("write_rgb"):
+            for i, img_bgr in enumerate(apply_color_mode(colors, COLOR_MODE, bgr=True)):
+                cv2.imwrite(os.path.join(output_dir, f"rgb_{i:04d}.png"), img_bgr)
+        img = colors[-1]
+        print(f"Color ranges - R: {np.min(img[:,:,0])} - {np.max(img[:,:,0])}")
+        print(f"Color ranges - G: {np.min(img[:,:,1])} - {np.max(img[:,:,1])}")
+        print(f"Color ranges - B: {np.min(img[:,:,2])} - {np.max(img[:,:,2])}")
+
+    write_scene_manifest(output_dir, scene_num, seed)
+    count("frames", len(data["class_segmaps"]))
+    add_bytes([os.path.join(output_dir, f) for f in os.listdir(output_dir)])
+    telemetry.end_scene(scene_num)
     print(f"Scene {scene_num} saved to {output_dir}")
-    print(f"Color ranges - R: {np.min(img[:,:,0])} - {np.max(img[:,:,0])}")
-    print(f"Color ranges - G: {np.min(img[:,:,1])} - {np.max(img[:,:,1])}")
-    print(f"Color ranges - B: {np.min(img[:,:,2])} - {np.max(img[:,:,2])}")
+
+telemetry.close()
+print(materials.summary())
+print(report(read_records([telemetry.path])))
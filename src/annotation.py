@@ -0,0 +1,257 @@
+import os
+import json
+import colorsys
+import threading
+import numpy as np
+
+# Original 20-colour COLORMAP of the generators; instance i < 20 keeps its old colour
+BASE_COLORMAP = np.array([
+    [230, 25, 75], [60, 180, 75], [255, 225, 25], [0, 130, 200], [245, 130, 48],
+    [145, 30, 180], [70, 240, 240], [240, 50, 230], [210, 245, 60], [250, 190, 190],
+    [0, 128, 128], [230, 190, 255], [170, 110, 40], [255, 250, 200], [128, 0, 0],
+    [170, 255, 195], [128, 128, 0], [255, 215, 180], [0, 0, 128], [128, 128, 128]
+], dtype=np.uint8)
+
+# Above this id a dense lookup table would be wasteful; map through np.unique instead
+MAX_LUT_SIZE = 1 << 20
+
+_palette = np.zeros((0, 3), dtype=np.uint8)
+
+
+def _extra_colors(start, stop):
+    """Distinct colours for ids past the base colormap (golden-ratio hue walk)"""
+    golden = 0.618033988749895
+    i = np.arange(start, stop)
+    hue = (i * golden) % 1.0
+    sat = 0.55 + 0.45 * ((i * 7) % 3) / 2
+    val = 0.65 + 0.35 * ((i * 5) % 2)
+    # colorsys.hsv_to_rgb for whole arrays
+    sector = (hue * 6.0).astype(np.int64)
+    f = hue * 6.0 - sector
+    p, q, t = val * (1 - sat), val * (1 - sat * f), val * (1 - sat * (1 - f))
+    rgb = np.choose(sector[:, None] % 6, [np.stack(c, axis=1) for c in
+                                          [(val, t, p), (q, val, p), (p, val, t), (p, q, val), (t, p, val), (val, p, q)]])
+    return (rgb * 255).astype(np.uint8)
+
+
+def palette(size):
+    """Colour of every instance id below `size`; id 0 (background) is black.
+
+    Built once and grown geometrically, so per-frame calls are free.
+    """
+    global _palette
+    if len(_palette) < size:
+        new_size = max(size, 2 * len(_palette), len(BASE_COLORMAP))
+        grown = np.zeros((new_size, 3), dtype=np.uint8)
+        n_base = len(BASE_COLORMAP)
+        grown[1:n_base] = BASE_COLORMAP[1:]
+        grown[n_base:] = _extra_colors(n_base, new_size)
+        _palette = grown
+    return _palette[:size]
+
+
+def colorize_segmentation(seg):
+    """(H, W) instance ids → (H, W, 3) uint8 colours with one lookup"""
+    if seg.size == 0:
+        return np.zeros((*seg.shape, 3), dtype=np.uint8)
+    max_id = int(seg.max())
+    if int(seg.min()) >= 0 and max_id < MAX_LUT_SIZE:
+        return palette(max_id + 1)[seg]
+    # Sparse / huge ids: colour the distinct ids only, hashed into the palette so an id
+    # keeps the colour of the dense path (ids below MAX_LUT_SIZE) whatever else is in the frame
+    ids, inverse = np.unique(seg, return_inverse=True)
+    colors = palette(MAX_LUT_SIZE)[(ids - 1) % (MAX_LUT_SIZE - 1) + 1]
+    colors[ids <= 0] = 0
+    return colors[inverse.reshape(seg.shape)]
+
+
+def segmentation_to_gray(seg):
+    """Instance ids stretched to 0–255 (uint8) without float temporaries; all-background → black"""
+    if seg.size == 0:
+        return np.zeros(seg.shape, dtype=np.uint8)
+    max_id = int(seg.max())
+    if max_id <= 0:
+        return np.zeros(seg.shape, dtype=np.uint8)
+    if int(seg.min()) >= 0 and max_id < MAX_LUT_SIZE:
+        lut = (np.arange(max_id + 1, dtype=np.int64) * 255 // max_id).astype(np.uint8)
+        return lut[seg]
+    return (np.clip(seg, 0, None) * (255.0 / max_id)).astype(np.uint8)
+
+
+# === Detection labels ===
+
+def category_lut(segmap, attribute_maps=None, category_segmap=None):
+    """Category of every instance id (array indexed by id, 0 = background / unknown).
+
+    Taken from bproc's instance attribute maps when present, else from a
+    category_id segmap, else every instance is its own category.
+    """
+    max_id = max(int(segmap.max()), 0) if segmap.size else 0
+    lut = np.zeros(max_id + 1, dtype=np.int32)
+    if attribute_maps:
+        for entry in attribute_maps:
+            if "idx" in entry and "category_id" in entry and 0 <= entry["idx"] <= max_id:
+                lut[entry["idx"]] = entry["category_id"]
+    elif category_segmap is not None:
+        lut[segmap.ravel()] = category_segmap.ravel()
+    else:
+        lut[:] = np.arange(max_id + 1)
+    lut[0] = 0
+    return lut
+
+
+def instance_stats(seg):
+    """ids, areas and (x, y, w, h) boxes of every instance > 0, in one pass over the pixels.
+
+    The inverse index (np.unique's, or a histogram rank for dense ids)
+    labels each pixel with its instance; one bincount per axis then marks
+    the rows / columns an instance touches.
+    """
+    h, w = seg.shape
+    if seg.size and int(seg.min()) >= 0 and int(seg.max()) < MAX_LUT_SIZE:
+        # Dense ids: a histogram replaces np.unique's sort
+        areas = np.bincount(seg.ravel())
+        ids = np.flatnonzero(areas)
+        areas = areas[ids]
+        rank = np.zeros(ids[-1] + 1, dtype=np.int32)
+        rank[ids] = np.arange(len(ids))
+        inverse = rank[seg]
+    else:
+        ids, inverse = np.unique(seg, return_inverse=True)
+        inverse = inverse.reshape(h, w)
+        areas = np.bincount(inverse.ravel(), minlength=len(ids))
+    keep = ids > 0
+    k = len(ids)
+    rows = np.bincount((inverse * h + np.arange(h)[:, None]).ravel(), minlength=k * h).reshape(k, h) > 0
+    cols = np.bincount((inverse * w + np.arange(w)[None, :]).ravel(), minlength=k * w).reshape(k, w) > 0
+    y0 = rows.argmax(axis=1)
+    y1 = h - rows[:, ::-1].argmax(axis=1)
+    x0 = cols.argmax(axis=1)
+    x1 = w - cols[:, ::-1].argmax(axis=1)
+    boxes = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1)
+    return ids[keep], areas[keep], boxes[keep]
+
+
+def rle_counts(seg, ids):
+    """Uncompressed COCO RLE (column-major run lengths, starting with zeros) of each id"""
+    flat = seg.ravel(order="F")
+    n = flat.size
+    starts = np.concatenate([[0], np.flatnonzero(flat[1:] != flat[:-1]) + 1])
+    ends = np.append(starts[1:], n)
+    values = flat[starts]
+    order = np.argsort(values, kind="stable")
+    values, starts, ends = values[order], starts[order], ends[order]
+    # Runs of one id are contiguous after the sort: gap before each run, then its length
+    first = np.ones(len(values), dtype=bool)
+    first[1:] = values[1:] != values[:-1]
+    prev_end = np.where(first, 0, np.roll(ends, 1))
+    pairs = np.stack([starts - prev_end, ends - starts], axis=1)
+    lo = np.searchsorted(values, ids, side="left")
+    hi = np.searchsorted(values, ids, side="right")
+    result = []
+    for a, b, last in zip(lo, hi, ends[np.maximum(hi - 1, 0)]):
+        counts = pairs[a:b].ravel().tolist()
+        if last < n:
+            counts.append(n - int(last))
+        result.append(counts)
+    return result
+
+
+def rle_to_string(counts):
+    """COCO compressed RLE string (same encoding as pycocotools' rleToString)"""
+    out = []
+    for i, x in enumerate(counts):
+        if i > 2:
+            x -= counts[i - 2]
+        more = True
+        while more:
+            c = x & 0x1f
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            out.append(chr(c + 48))
+    return "".join(out)
+
+
+def frame_annotations(seg, category_ids=None, min_area=1, with_rle=True):
+    """COCO-style annotations (without image / annotation ids) of every instance in a segmap"""
+    ids, areas, boxes = instance_stats(seg)
+    keep = areas >= min_area
+    ids, areas, boxes = ids[keep], areas[keep], boxes[keep]
+    if category_ids is None:
+        category_ids = category_lut(seg)
+    cats = category_ids[np.clip(ids, 0, len(category_ids) - 1)]
+    rles = rle_counts(seg, ids) if with_rle else [None] * len(ids)
+    h, w = seg.shape
+    annotations = []
+    for inst, cat, area, box, counts in zip(ids.tolist(), cats.tolist(), areas.tolist(), boxes.tolist(), rles):
+        ann = {"instance_id": inst, "category_id": cat, "bbox": box, "area": area, "iscrowd": 0}
+        if counts is not None:
+            ann["segmentation"] = {"size": [h, w], "counts": rle_to_string(counts)}
+        annotations.append(ann)
+    return annotations
+
+
+def yolo_lines(annotations, width, height):
+    """'class cx cy w h' lines (normalised); YOLO classes are category_id - 1"""
+    lines = []
+    for ann in annotations:
+        if ann["category_id"] <= 0:
+            continue
+        x, y, w, h = ann["bbox"]
+        lines.append(f"{ann['category_id'] - 1} {(x + w / 2) / width:.6f} {(y + h / 2) / height:.6f} "
+                     f"{w / width:.6f} {h / height:.6f}")
+    return lines
+
+
+def write_yolo(path, annotations, width, height):
+    with open(path, "w") as f:
+        f.write("\n".join(yolo_lines(annotations, width, height)) + "\n")
+
+
+class CocoWriter:
+    """Collects the annotations of one shard into a COCO JSON file.
+
+    Frames are appended to `path`.partial.jsonl as they are written (thread
+    safe, survives crashes and resumed runs); close() assembles the final
+    JSON, numbering images and annotations and keeping the last record of
+    a re-rendered frame.
+    """
+
+    def __init__(self, path, categories=None):
+        self.path = path
+        self.partial_path = path + ".partial.jsonl"
+        self.categories = categories
+        self._lock = threading.Lock()
+
+    def add_frame(self, file_name, width, height, annotations):
+        record = json.dumps({"file_name": file_name, "width": width, "height": height,
+                             "annotations": annotations})
+        with self._lock:
+            with open(self.partial_path, "a") as f:
+                f.write(record + "\n")
+
+    def close(self):
+        with self._lock:
+            if not os.path.exists(self.partial_path):
+                return None
+            frames = {}
+            with open(self.partial_path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        frames[record["file_name"]] = record
+            images, annotations, seen_cats = [], [], set()
+            for image_id, record in enumerate(sorted(frames.values(), key=lambda r: r["file_name"]), 1):
+                images.append({"id": image_id, "file_name": record["file_name"],
+                               "width": record["width"], "height": record["height"]})
+                for ann in record["annotations"]:
+                    annotations.append({"id": len(annotations) + 1, "image_id": image_id, **ann})
+                    seen_cats.add(ann["category_id"])
+            categories = self.categories or [{"id": c, "name": str(c)} for c in sorted(seen_cats) if c > 0]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"images": images, "annotations": annotations, "categories": categories}, f)
+            os.replace(tmp_path, self.path)
+            return len(images), len(annotations)
@@ -0,0 +1,149 @@
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class WriterSettings:
+    """Encoding knobs: trade disk throughput against CPU time"""
+
+    def __init__(self, png_compression=3, hdf5_compression="gzip", hdf5_compression_opts=4,
+                 hdf5_chunks=True):
+        self.png_compression = png_compression            # 0 (fast, big) … 9 (slow, small)
+        self.hdf5_compression = hdf5_compression          # "gzip", "lzf" or None
+        self.hdf5_compression_opts = hdf5_compression_opts if hdf5_compression == "gzip" else None
+        self.hdf5_chunks = hdf5_chunks                    # True (auto), None (contiguous) or a shape
+
+    def png_params(self):
+        import cv2
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(self.png_compression)]
+
+    def hdf5_kwargs(self):
+        return {"compression": self.hdf5_compression, "compression_opts": self.hdf5_compression_opts,
+                "chunks": self.hdf5_chunks}
+
+
+DEFAULT_SETTINGS = WriterSettings()
+
+
+def write_png(path, image, settings=DEFAULT_SETTINGS):
+    import cv2
+    if not cv2.imwrite(path, image, settings.png_params()):
+        raise IOError(f"No se pudo escribir {path}")
+
+
+class AsyncWriter:
+    """Bounded queue of write jobs executed in the background.
+
+    submit() blocks once `max_pending` jobs are queued or running, so a
+    renderer that is faster than the disk is slowed down instead of
+    filling memory with frames. Threads are enough for cv2 / h5py (they
+    release the GIL while encoding); use_processes=True needs job
+    functions that are importable outside Blender.
+    """
+
+    def __init__(self, max_pending=8, workers=2, use_processes=False):
+        pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._pool = pool_cls(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._callbacks = []        # (futures, fn, label) run in the caller's thread once futures are done
+        self._errors = []
+        self._closed = False
+        self.completed = 0
+        self.skipped_callbacks = 0
+        atexit.register(self.close)
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); waits while the queue is full (back-pressure)"""
+        if self._closed:
+            raise RuntimeError("AsyncWriter cerrado")
+        self._run_ready_callbacks()
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        error = future.exception()
+        with self._lock:
+            # Recorded before the future leaves _futures, so flush() sees it in one or the other
+            if error is not None:
+                self._errors.append(error)
+            self._futures.discard(future)
+            self.completed += 1
+        self._slots.release()
+        if error is not None:
+            print(f"❌ Error de escritura: {error}")
+
+    def after(self, futures, fn, label=None):
+        """Call fn() (in this thread) once all futures are done, e.g. to write a manifest.
+
+        Ready callbacks run in the order they were registered. If any of the
+        futures failed, fn is skipped with a message naming `label` and
+        counted in skipped_callbacks.
+        """
+        self._callbacks.append((list(futures), fn, label or getattr(fn, "__name__", repr(fn))))
+        self._run_ready_callbacks()
+
+    def _run_ready_callbacks(self):
+        callbacks, self._callbacks = self._callbacks, []
+        pending = []
+        i = 0
+        try:
+            while i < len(callbacks):
+                futures, fn, label = callbacks[i]
+                i += 1
+                if not all(f.done() for f in futures):
+                    pending.append(callbacks[i - 1])
+                    continue
+                failed = sum(f.exception() is not None for f in futures)
+                if failed:
+                    self.skipped_callbacks += 1
+                    print(f"❌ {failed}/{len(futures)} escrituras fallaron, se omite: {label}")
+                    continue
+                fn()
+        finally:
+            # Not yet run ones stay queued even if fn() raised; callbacks it registered go last
+            self._callbacks = pending + callbacks[i:] + self._callbacks
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._futures)
+
+    def flush(self):
+        """Wait for every queued job; raises the first error seen"""
+        with self._lock:
+            futures = list(self._futures)
+            errors, self._errors = self._errors, []
+        # Straight from the futures: exception() returns before their done-callbacks have run
+        waited = [error for error in (future.exception() for future in futures) if error is not None]
+        with self._lock:
+            self._errors = [e for e in self._errors if not any(e is w for w in waited)]
+        errors += waited
+        self._run_ready_callbacks()
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._pool.shutdown(wait=True)
+            atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,62 +1,177 @@
 import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def convert_obj_with_vertex_colors_to_ply(obj_path, ply_path):
-    vertices = []
-    faces = []
-
-    with open(obj_path, 'r') as f:
-        for line in f:
-            if line.startswith('v '):
-                parts = line.strip().split()
-                if len(parts) >= 7:
-                    x, y, z = map(float, parts[1:4])
-                    r, g, b = map(float, parts[4:7])
-                    r, g, b = int(r * 255), int(g * 255), int(b * 255)
-                    vertices.append((x, y, z, r, g, b))
-            elif line.startswith('f '):
-                parts = line.strip().split()
-                face = [int(p.split('/')[0]) - 1 for p in parts[1:]]
-                faces.append(face)
-
-    with open(ply_path, 'w') as f:
-        f.write('ply\n')
-        f.write('format ascii 1.0\n')
-        f.write(f'element vertex {len(vertices)}\n')
-        f.write('property float x\n')
-        f.write('property float y\n')
-        f.write('property float z\n')
-        f.write('property uchar red\n')
-        f.write('property uchar green\n')
-        f.write('property uchar blue\n')
-        f.write(f'element face {len(faces)}\n')
-        f.write('property list uchar int vertex_indices\n')
-        f.write('end_header\n')
-
-        for v in vertices:
-            f.write(f'{v[0]} {v[1]} {v[2]} {v[3]} {v[4]} {v[5]}\n')
-
-        for face in faces:
-            f.write(f'{len(face)} {" ".join(map(str, face))}\n')
-
-    print(f"✅ {os.path.basename(obj_path)} → {os.path.basename(ply_path)}")
-
-
-def convert_all_objs_in_folder(input_folder, output_folder):
+from obj_converter import convert_obj_with_vertex_colors_to_ply
+
+# Stamps of the sources already converted, stored next to the PLY files
+MANIFEST_NAME = ".obj2ply_manifest.json"
+
+# Seconds between manifest saves while a batch runs (always saved at the end, even on Ctrl+C)
+MANIFEST_SAVE_INTERVAL = 1.0
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """BLAKE2b digest of a file's content"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(output_folder, name=MANIFEST_NAME):
+    path = os.path.join(output_folder, name)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_folder, manifest, name=MANIFEST_NAME):
+    """Write the manifest through a temp file so a crash never leaves it half-written"""
+    tmp_path = os.path.join(output_folder, name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(output_folder, name))
+
+
+def needs_conversion(obj_path, ply_path, entry, check="hash", binary=True):
+    """Decide whether obj_path must be converted again.
+
+    Returns (needed, stamp) where stamp is the up-to-date manifest entry.
+    """
+    st = os.stat(obj_path)
+    stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "binary": binary}
+    if not entry or not os.path.exists(ply_path) or entry.get("binary") != binary:
+        return True, stamp
+    if entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+        stamp["digest"] = entry.get("digest")
+        return False, stamp
+    if check == "mtime":
+        return True, stamp
+    # Touched but maybe not modified (git checkout, copy): compare content
+    stamp["digest"] = file_digest(obj_path)
+    return stamp["digest"] != entry.get("digest"), stamp
+
+
+def convert_one(obj_path, ply_path, binary=True, with_digest=True, spill=False, progress=None):
+    """Convert a single file atomically; runs inside a worker process"""
+    start = time.perf_counter()
+    # Plain path (not mkstemp, whose 0600 mode os.replace would keep); one worker per file
+    tmp_path = ply_path + ".tmp"
+    try:
+        n_vertices, n_faces = convert_obj_with_vertex_colors_to_ply(
+            obj_path, tmp_path, binary=binary, verbose=False, spill=spill, progress=progress)
+        os.replace(tmp_path, ply_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {
+        "seconds": time.perf_counter() - start,
+        "vertices": n_vertices,
+        "faces": n_faces,
+        "digest": file_digest(obj_path) if with_digest else None,
+    }
+
+
+def convert_all_objs_in_folder(input_folder, output_folder, binary=True, workers=None,
+                               check="hash", force=False, spill=False, progress=None):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
-    for filename in os.listdir(input_folder):
+    old_manifest = load_manifest(output_folder)
+    # Rebuilt from the OBJs present now, so entries of deleted sources are dropped
+    manifest = {}
+    jobs = []
+    skipped = 0
+    for filename in sorted(os.listdir(input_folder)):
         if filename.lower().endswith(".obj"):
             obj_path = os.path.join(input_folder, filename)
             ply_filename = os.path.splitext(filename)[0] + ".ply"
             ply_path = os.path.join(output_folder, ply_filename)
-            convert_obj_with_vertex_colors_to_ply(obj_path, ply_path)
+            needed, stamp = needs_conversion(obj_path, ply_path, old_manifest.get(filename), check, binary)
+            if needed or force:
+                jobs.append((filename, obj_path, ply_path, stamp))
+            else:
+                manifest[filename] = stamp
+                skipped += 1
+    pruned = len(set(old_manifest) - {job[0] for job in jobs} - set(manifest))
 
+    start = time.perf_counter()
+    results = []
+    errors = 0
+    last_save = 0.0
+    try:
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(convert_one, job[1], job[2], binary, check == "hash", spill, progress): job
+                           for job in jobs}
+                for future in as_completed(futures):
+                    filename, obj_path, ply_path, stamp = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors += 1
+                        print(f"❌ {filename}: {e}")
+                        continue
+                    stamp["digest"] = result["digest"]
+                    manifest[filename] = stamp
+                    results.append((filename, obj_path, result))
+                    mb = os.path.getsize(obj_path) / 1e6
+                    print(f"✅ {filename} → {os.path.basename(ply_path)}  "
+                          f"{result['seconds']:.2f}s  {mb / max(result['seconds'], 1e-9):.1f} MB/s  "
+                          f"({result['vertices']} v, {result['faces']} f)")
+                    # Save as conversions finish so an interrupted batch keeps its progress
+                    if time.perf_counter() - last_save >= MANIFEST_SAVE_INTERVAL:
+                        save_manifest(output_folder, manifest)
+                        last_save = time.perf_counter()
+    finally:
+        save_manifest(output_folder, manifest)
 
-# === USO ===
-# Modifica estas rutas según tus carpetas
+    elapsed = time.perf_counter() - start
+    total_mb = sum(os.path.getsize(p) for _, p, _ in results) / 1e6
+    print(f"\nConvertidos: {len(results)}  Sin cambios: {skipped}  Errores: {errors}"
+          + (f"  Eliminados del manifiesto: {pruned}" if pruned else ""))
+    if results:
+        print(f"{total_mb:.1f} MB en {elapsed:.2f}s ({total_mb / max(elapsed, 1e-9):.1f} MB/s)")
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte todos los .obj de una carpeta a .ply")
+    parser.add_argument("input_folder", nargs="?", default="../obj")
+    parser.add_argument("output_folder", nargs="?", default="../ply")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="procesos en paralelo (por defecto: núcleos disponibles)")
+    parser.add_argument("--ascii", action="store_true", help="escribe PLY en ASCII en vez de binario")
+    parser.add_argument("--check", choices=["hash", "mtime"], default="hash",
+                        help="cómo detectar cambios cuando tamaño/mtime no coinciden")
+    parser.add_argument("--force", action="store_true", help="reconvierte aunque no haya cambios")
+    parser.add_argument("--spill", action="store_true",
+                        help="convierte a través de archivos temporales (escaneos que no caben en RAM)")
+    parser.add_argument("--progress", action="store_true", help="muestra avance y MB/s de archivos grandes")
+    parser.add_argument("--lod", action="store_true", help="genera también los LOD de los PLY (mesh_lod.py)")
+    return parser.parse_args(argv)
 
-input_folder = "../obj"
-output_folder = "../ply"
 
-convert_all_objs_in_folder(input_folder, output_folder)
+# === USO ===
+# python batch_obj_to_ply.py ../obj ../ply -j 8
+# python batch_obj_to_ply.py ../obj ../ply -j 8 --lod
+# python batch_obj_to_ply.py ../scans ../ply -j 2 --spill --progress     (escaneos de millones de vértices)
+
+if __name__ == "__main__":
+    args = parse_args()
+    convert_all_objs_in_folder(args.input_folder, args.output_folder, binary=not args.ascii,
+                               workers=args.workers, check=args.check, force=args.force,
+                               spill=args.spill, progress=args.progress or None)
+    if args.lod:
+        from mesh_lod import build_all_lods
+        build_all_lods(args.output_folder, workers=args.workers, force=args.force)
@@ -0,0 +1,57 @@
+import sys
+import time
+import numpy as np
+
+from annotation import BASE_COLORMAP, colorize_segmentation, segmentation_to_gray
+
+
+def synthetic_segmap(height=1080, width=1920, instances=200, seed=0):
+    """Label map with `instances` rectangular products on a background of 0"""
+    rng = np.random.default_rng(seed)
+    seg = np.zeros((height, width), dtype=np.int64)
+    for inst in range(1, instances + 1):
+        h, w = rng.integers(40, 160, size=2)
+        y, x = rng.integers(0, height - h), rng.integers(0, width - w)
+        seg[y:y + h, x:x + w] = inst
+    return seg
+
+
+def colorize_loop(seg):
+    """Original per-instance masking"""
+    COLORMAP = BASE_COLORMAP.copy()
+    seg_colored = np.zeros((*seg.shape, 3), dtype=np.uint8)
+    for instance_id in np.unique(seg):
+        if instance_id == 0:
+            continue
+        seg_colored[seg == instance_id] = COLORMAP[instance_id % len(COLORMAP)]
+    return seg_colored
+
+
+def gray_float(seg):
+    """Original float32 grayscale visualisation"""
+    return (seg.astype(np.float32) / seg.max() * 255).astype(np.uint8)
+
+
+def best_of(fn, arg, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(instances=200, repeats=5):
+    seg = synthetic_segmap(instances=instances)
+    print(f"1920x1080, {len(np.unique(seg)) - 1} visible instances")
+    for name, old, new in [("colour", colorize_loop, colorize_segmentation),
+                           ("gray", gray_float, segmentation_to_gray)]:
+        t_old = best_of(old, seg, repeats)
+        t_new = best_of(new, seg, repeats)
+        print(f"  {name:<7} loop/float {t_old * 1000:8.1f} ms   lut {t_new * 1000:7.1f} ms   x{t_old / t_new:.0f}")
+    same = np.array_equal(gray_float(seg), segmentation_to_gray(seg))
+    print(f"  gray output identical: {same}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
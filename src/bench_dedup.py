@@ -0,0 +1,110 @@
+import os
+import time
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+from dedup import HammingIndex, find_duplicates, popcount, DUPLICATE_DISTANCE, HASH_BITS
+from image_metrics import analyze_images, get_image_paths
+
+
+def burst_photos(folder, shots=40, burst=4, height=1200, width=1600, seed=0):
+    """`shots` different shelf-like scenes, each taken `burst` times with a little hand shake.
+
+    Returns the true scene of every file, in file name order.
+    """
+    rng = np.random.default_rng(seed)
+    scenes = []
+    for shot in range(shots):
+        # Blocky product facings on shelves, different for every shot
+        base = (rng.random((height // 40, width // 40, 3)) * 255).astype(np.uint8)
+        base = cv2.resize(base, (width + 64, height + 64), interpolation=cv2.INTER_NEAREST)
+        base = cv2.GaussianBlur(base, (5, 5), 1.5)
+        for k in range(burst):
+            dx, dy = rng.integers(0, 24, 2)
+            img = base[dy:dy + height, dx:dx + width].astype(np.float32) * rng.uniform(0.85, 1.15)
+            img = np.clip(img + rng.normal(0, 4, img.shape), 0, 255).astype(np.uint8)
+            cv2.imwrite(os.path.join(folder, f"{shot:04d}_{k}.jpg"), img,
+                        [cv2.IMWRITE_JPEG_QUALITY, int(rng.integers(75, 95))])
+            scenes.append(shot)
+    return np.array(scenes)
+
+
+def pair_set(i, j):
+    return set(zip(i.tolist(), j.tolist()))
+
+
+def brute_force_pairs(hashes, radius, block=256):
+    """All-pairs reference, `block` rows at a time"""
+    found = []
+    for start in range(0, len(hashes), block):
+        dist = popcount(hashes[start:start + block, None] ^ hashes[None, :])
+        i, j = np.nonzero(dist <= radius)
+        i += start
+        found.append(np.stack([i[i < j], j[i < j]]))
+    return np.concatenate(found, axis=1)
+
+
+def synthetic_hashes(n, radius, burst=3, seed=0):
+    """n 64-bit hashes: random ones, with about 1/burst of them bursts of near copies"""
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2 ** 63, n, dtype=np.int64).astype(np.uint64) << np.uint64(1)
+    hashes |= rng.integers(0, 2, n).astype(np.uint64)
+    copies = rng.random(n) < (burst - 1) / burst / 2
+    source = np.maximum(np.arange(n) - rng.integers(1, burst, n), 0)
+    for idx in np.flatnonzero(copies):
+        bits = rng.choice(HASH_BITS, rng.integers(0, radius + 1), replace=False)
+        hashes[idx] = hashes[source[idx]] ^ np.uint64(sum(1 << int(b) for b in bits))
+    return hashes
+
+
+def run_photos(shots, burst, radius):
+    with tempfile.TemporaryDirectory() as folder:
+        scenes = burst_photos(folder, shots, burst)
+        paths = sorted(get_image_paths(folder))
+        df = analyze_images(paths, workers=0)
+        start = time.perf_counter()
+        dups = find_duplicates(df, radius)
+        t_dedup = time.perf_counter() - start
+    # A pair of photos is a true duplicate when both come from the same shot
+    same = scenes[:, None] == scenes[None, :]
+    found = dups["dup_cluster"].to_numpy()
+    grouped = (found[:, None] == found[None, :]) & (found[:, None] >= 0)
+    upper = np.triu(np.ones_like(same), 1)
+    tp = (same & grouped & upper).sum()
+    precision = tp / max((grouped & upper).sum(), 1)
+    recall = tp / max((same & upper).sum(), 1)
+    kept = int(dups["dup_keep"].sum())
+    print(f"{len(paths)} fotos ({shots} tomas x {burst}): precisión {precision:.3f}, recall {recall:.3f}, "
+          f"se conservan {kept} (ideal {shots}), agrupado en {t_dedup * 1000:.0f} ms")
+
+
+def run_index(n, radius, brute_n):
+    hashes = synthetic_hashes(n, radius)
+    start = time.perf_counter()
+    index = HammingIndex(hashes)
+    i, j, _ = index.pairs(radius)
+    t_index = time.perf_counter() - start
+    print(f"\n{n:,} hashes, radio {radius}: índice {t_index:.2f}s, {len(i):,} pares")
+
+    m = min(n, brute_n)
+    sub_i, sub_j, _ = HammingIndex(hashes[:m]).pairs(radius)
+    start = time.perf_counter()
+    brute = brute_force_pairs(hashes[:m], radius)
+    t_brute = time.perf_counter() - start
+    same = pair_set(sub_i, sub_j) == pair_set(*brute)
+    print(f"fuerza bruta con {m:,}: {t_brute:.2f}s (~{t_brute * (n / m) ** 2:.0f}s con {n:,}), "
+          f"mismos pares que el índice: {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shots", type=int, default=40)
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--hashes", type=int, default=100000)
+    parser.add_argument("--brute", type=int, default=20000, help="hashes comparados todos contra todos")
+    parser.add_argument("--radius", type=int, default=DUPLICATE_DISTANCE)
+    args = parser.parse_args()
+    run_photos(args.shots, args.burst, args.radius)
+    run_index(args.hashes, args.radius, args.brute)
@@ -0,0 +1,75 @@
+import os
+import time
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+from image_metrics import (analyze_images, agreement_report, calibrate_blur_scale, get_image_paths,
+                           BLUR_SCALE, REDUCED_FLAGS)
+
+
+def field_photos(folder, count=120, height=3000, width=4000, seed=0):
+    """Phone-size JPEGs of shelf-like scenes: product facings plus 1/f texture, with
+    blur from none to heavy, sensor noise and exposure varying from photo to photo"""
+    rng = np.random.default_rng(seed)
+    ky = np.fft.fftfreq(height // 4)[:, None]
+    kx = np.fft.rfftfreq(width // 4)[None]
+    falloff = 1 / np.maximum(np.hypot(kx, ky), 1e-3)
+    for i in range(count):
+        cells = rng.integers(20, 80)
+        facings = (rng.random((height // cells, width // cells, 3)) * 255).astype(np.uint8)
+        img = cv2.resize(facings, (width, height), interpolation=cv2.INTER_NEAREST).astype(np.float32)
+        texture = np.fft.irfft2(np.fft.rfft2(rng.normal(size=(height // 4, width // 4))) * falloff)
+        texture = cv2.resize((texture / texture.std()).astype(np.float32), (width, height))
+        img = img * rng.uniform(0.2, 1.1) + texture[..., None] * rng.uniform(10, 40)
+        sigma = rng.choice([0, 0, 0, 0.5, 1, 1.5, 2, 4]) * rng.uniform(0.5, 1.5)
+        if sigma > 0:
+            img = cv2.GaussianBlur(img, (0, 0), sigma)
+        img += rng.normal(0, rng.uniform(0.5, 3), img.shape).astype(np.float32)
+        cv2.imwrite(os.path.join(folder, f"{i:05d}.jpg"), np.clip(img, 0, 255).astype(np.uint8),
+                    [cv2.IMWRITE_JPEG_QUALITY, int(rng.integers(80, 95))])
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run(count=120, height=3000, width=4000):
+    """Speed and agreement of the reduced decodes on synthetic photos.
+
+    BLUR_SCALE was fitted on these same photos, so the agreement here
+    does not validate it for real shelf photos (use image_metrics.py --agreement).
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        field_photos(folder, count, height, width)
+        paths = sorted(get_image_paths(folder))
+        exact, t_exact = timed(analyze_images, paths, workers=0)
+        approx = {}
+        for scale in REDUCED_FLAGS:
+            approx[scale] = timed(analyze_images, paths, workers=0, reduce=scale)
+
+    print(f"\n{count} fotos {width}x{height} ({width * height / 1e6:.0f} MP), 1 proceso")
+    print(f"  completa  {t_exact:6.2f}s  {count / t_exact:6.1f} img/s")
+    # Threshold fitted on the even photos, agreement measured on the odd ones
+    fit, held_out = exact.index % 2 == 0, exact.index % 2 == 1
+    for scale, (df, seconds) in approx.items():
+        fitted = calibrate_blur_scale(exact["laplacian_variance"][fit], df["laplacian_variance"][fit])
+        print(f"\n  1/{scale}       {seconds:6.2f}s  {count / seconds:6.1f} img/s  x{t_exact / seconds:.1f}   "
+              f"BLUR_SCALE[{scale}] = {BLUR_SCALE[scale]:.2f} (ajustado en fotos pares: {fitted:.2f})")
+        for label, scales in [("actual", BLUR_SCALE), ("ajustado", {**BLUR_SCALE, scale: fitted})]:
+            matrix, agreement = agreement_report(exact[held_out], df[held_out], blur_scale=scales)
+            print(f"    fotos impares, escala {label}: " + ", ".join(f"{c} {v:.0%}" for c, v in agreement.items()))
+        matrix, _ = agreement_report(exact, df)
+        print("    categoría principal, todas las fotos (filas: completa, columnas: reducida):")
+        print("      " + matrix.to_string().replace("\n", "\n      "))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=120)
+    parser.add_argument("--size", type=int, nargs=2, default=[4000, 3000], metavar=("W", "H"))
+    args = parser.parse_args()
+    run(args.count, args.size[1], args.size[0])
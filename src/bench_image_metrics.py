@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import tempfile
+import cv2
+import numpy as np
+from PIL import Image
+
+from image_metrics import analyze_images, get_image_paths
+
+
+def synthetic_photos(folder, count=200, height=1536, width=2048, seed=0):
+    """Noisy JPEGs of phone-photo size; every third one blurred"""
+    rng = np.random.default_rng(seed)
+    base = (rng.random((height // 8, width // 8, 3)) * 255).astype(np.uint8)
+    base = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    for i in range(count):
+        img = np.roll(base, i * 7, axis=1)
+        if i % 3 == 0:
+            img = cv2.GaussianBlur(img, (21, 21), 6)
+        cv2.imwrite(os.path.join(folder, f"{i:05d}.jpg"), img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def analyze_legacy(image_paths):
+    """Original notebook loop: PIL open + cv2.imread, grayscale once per metric"""
+    def gray(img):
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    data = []
+    for img_path in image_paths:
+        with Image.open(img_path) as img_pil:
+            width, height = img_pil.size
+            mode = img_pil.mode
+        img_cv = cv2.imread(img_path, cv2.IMREAD_UNCHANGED)
+        brightness = np.mean(gray(img_cv))
+        contrast = np.std(gray(img_cv))
+        lap_var = cv2.Laplacian(gray(img_cv), cv2.CV_64F).var()
+        _, counts = np.unique(gray(img_cv), return_counts=True)   # skimage.measure.shannon_entropy
+        p = counts / counts.sum()
+        entropy = -np.sum(p * np.log2(p))
+        data.append({"path": img_path, "width": width, "height": height, "mode": mode, "brightness": brightness,
+                     "contrast": contrast, "laplacian_variance": lap_var, "shannon_entropy": entropy})
+    return data
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run(count=200, workers=None):
+    with tempfile.TemporaryDirectory() as folder:
+        synthetic_photos(folder, count)
+        paths = sorted(get_image_paths(folder))
+        legacy, t_legacy = timed(analyze_legacy, paths)
+        serial, t_serial = timed(analyze_images, paths, workers=0)
+        _, t_parallel = timed(analyze_images, paths, output_path=os.path.join(folder, "m.csv"),
+                              workers=workers, return_df=False)
+
+    serial = serial.sort_values("path").reset_index(drop=True)
+    cols = ["brightness", "contrast", "laplacian_variance", "shannon_entropy"]
+    same = all(np.allclose([r[c] for r in legacy], serial[c]) for c in cols)
+    print(f"\n{count} fotos 2048x1536")
+    print(f"  notebook     {t_legacy:6.2f}s  {count / t_legacy:6.1f} img/s")
+    print(f"  1 proceso    {t_serial:6.2f}s  {count / t_serial:6.1f} img/s  x{t_legacy / t_serial:.1f}")
+    print(f"  paralelo     {t_parallel:6.2f}s  {count / t_parallel:6.1f} img/s  x{t_legacy / t_parallel:.1f}")
+    print(f"  métricas idénticas: {same}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
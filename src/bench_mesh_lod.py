@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import subprocess
+import tempfile
+import numpy as np
+
+# python bench_mesh_lod.py                    → FakeBproc, no Blender needed (geometry/memory only)
+# python bench_mesh_lod.py --blender          → every level rendered by `blenderproc run` in its own process
+if "--fake" in sys.argv:
+    from fake_bproc import FakeBproc
+    bproc = FakeBproc()
+elif "--level" in sys.argv:
+    import blenderproc as bproc
+
+from mesh_lod import build_all_lods, lod_paths, select_lods, LOD_BUDGETS
+from mesh_store import load_mesh
+from visibility import box_corners
+
+ply_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../ply")
+
+# 200 facings: 10 shelves of 20 products, each scaled to FACING_SIZE m (largest side)
+ROWS, COLUMNS = 10, 20
+FACING_SIZE = 0.25
+LEVELS = ["0", "1", "2", "3", "auto"]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def shelf_layout(names, bounds):
+    """(name, location, scale) of every facing, plus the camera pose looking at the shelf"""
+    facings = []
+    for i in range(ROWS * COLUMNS):
+        name = names[i % len(names)]
+        lo, hi = bounds[name]
+        scale = FACING_SIZE / float((hi - lo).max())
+        location = np.array([(i % COLUMNS - (COLUMNS - 1) / 2) * FACING_SIZE * 1.1,
+                             0.0, (i // COLUMNS) * FACING_SIZE * 1.2])
+        facings.append((name, location - (lo + hi) / 2 * scale, scale))
+    eye = np.array([0.0, -3.5, ROWS * FACING_SIZE * 0.6])
+    rotation = bproc.camera.rotation_from_forward_vec(np.array([0.0, 0.0, eye[2]]) - eye)
+    pose = np.eye(4)
+    pose[:3, :3], pose[:3, 3] = np.asarray(rotation), eye
+    return facings, pose
+
+
+def facing_levels(level, facings, bounds, pose):
+    if level != "auto":
+        return np.full(len(facings), int(level))
+    boxes = np.array([box_corners(bounds[name], location, scale=scale) for name, location, scale in facings])
+    K = np.array(bproc.camera.get_intrinsics_as_K_matrix())
+    return select_lods(boxes, [pose], K, (int(round(2 * K[0, 2])), int(round(2 * K[1, 2]))))
+
+
+def run_level(level, folder=ply_folder, render=False):
+    """Build (and render) the shelf at one LOD level; returns the measurements as a dict"""
+    from scene_pool import ScenePool
+
+    start = time.perf_counter()
+    pool = ScenePool(bproc, folder).load()
+    bounds = {name: pool.bounds(name) for name in pool.names}
+    facings, pose = shelf_layout(pool.names, bounds)
+    levels = facing_levels(level, facings, bounds, pose)
+
+    copies = {}
+    triangles = 0
+    world = []
+    for (name, location, scale), lvl in zip(facings, levels):
+        lvl = min(int(lvl), pool.lod_count(name) - 1)
+        copy_idx = copies.get((name, lvl), 0)
+        copies[(name, lvl)] = copy_idx + 1
+        pool.place(name, location, scale=[scale] * 3, copy_idx=copy_idx, lod=lvl)
+        mesh = load_mesh(lod_paths(pool.assets[name].path)[lvl])
+        triangles += len(mesh.faces)
+        if not render:
+            # Without Blender: the flattened world-space geometry a (non-instanced) BVH would be built over
+            world.append(mesh.positions() * np.float32(scale) + location.astype(np.float32))
+            world.append(np.asarray(mesh.faces).copy())
+    build_s = time.perf_counter() - start
+
+    render_s = None
+    if render:
+        from render_plan import configure_renderer, register_poses
+        configure_renderer(bproc, samples=64)
+        register_poses(bproc, [pose])
+        start = time.perf_counter()
+        bproc.renderer.render()
+        render_s = time.perf_counter() - start
+    return {"level": level, "facings": len(facings), "triangles": triangles,
+            "lod_histogram": np.bincount(levels.astype(int), minlength=4).tolist(),
+            "build_s": build_s, "render_s": render_s, "peak_rss_mb": peak_rss_mb()}
+
+
+def run(folder=ply_folder, blender=False, budgets=LOD_BUDGETS):
+    # LODs go to <copy>/lod in a temporary copy of the folder, not next to the real PLYs
+    with tempfile.TemporaryDirectory(prefix="bench_lod_") as work:
+        for fname in os.listdir(folder):
+            if fname.lower().endswith(".ply"):
+                shutil.copy2(os.path.join(folder, fname), work)
+        run_levels(work, blender, budgets)
+
+
+def run_levels(folder, blender=False, budgets=LOD_BUDGETS):
+    build_all_lods(folder, budgets)
+    print(f"\nEstante de {ROWS * COLUMNS} frentes ({ROWS}x{COLUMNS}), un proceso por nivel de LOD")
+    print(f"{'LOD':<6}{'triángulos':>12}{'montaje s':>11}{'render s':>10}{'RSS pico MB':>13}  LOD0-3")
+    for level in LEVELS:
+        if blender:
+            cmd = ["blenderproc", "run", os.path.abspath(__file__), folder, "--level", level]
+        else:
+            cmd = [sys.executable, os.path.abspath(__file__), folder, "--fake", "--level", level]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        result = json.loads([line for line in out.splitlines() if line.startswith("{")][-1])
+        render = f"{result['render_s']:10.2f}" if result["render_s"] is not None else f"{'-':>10}"
+        print(f"{level:<6}{result['triangles']:>12,}{result['build_s']:>11.2f}{render}"
+              f"{result['peak_rss_mb']:>13.0f}  {result['lod_histogram']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ply_folder", nargs="?", default=ply_folder, help="se copian a un directorio temporal; los LOD se escriben en su lod/")
+    parser.add_argument("--blender", action="store_true", help="renderiza cada nivel con blenderproc")
+    parser.add_argument("--fake", action="store_true", help="(interno) usa FakeBproc")
+    parser.add_argument("--level", choices=LEVELS, help="(interno) mide un solo nivel")
+    args = parser.parse_args()
+    if args.level is None:
+        run(os.path.abspath(args.ply_folder), args.blender)
+    else:
+        if not args.fake:
+            bproc.init()
+        print(json.dumps(run_level(args.level, args.ply_folder, render=not args.fake)))
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+
+from mesh_store import MeshCache, read_ply
+from obj_converter import VERTEX_DTYPE, write_ply
+
+ply_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../ply")
+
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def to_binary(src, dst):
+    """Re-write a (possibly ASCII) PLY as binary with the project's vertex layout"""
+    mesh = read_ply(src)
+    vertices = np.zeros(len(mesh.vertices), dtype=VERTEX_DTYPE)
+    for name in VERTEX_DTYPE.names:
+        if name in mesh.vertices.dtype.names:
+            vertices[name] = mesh.vertices[name]
+    write_ply(dst, vertices, mesh.faces)
+
+
+def simulate_run(paths, scenes, cache):
+    """Touch every asset once per scene, like the generators do; returns seconds"""
+    start = time.perf_counter()
+    for _ in range(scenes):
+        for path in paths:
+            mesh = cache.get(path) if cache is not None else read_ply(path)
+            mesh.bounds()
+    return time.perf_counter() - start
+
+
+def run(folder=ply_folder, scenes=10, copies=25):
+    names = sorted(f for f in os.listdir(folder) if f.lower().endswith(".ply"))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'asset':<16}{'ascii parse':>12}{'binary mmap':>13}{'binary read':>13}{'MB':>7}")
+        binaries = []
+        for name in names:
+            src = os.path.join(folder, name)
+            dst = os.path.join(tmp, name)
+            to_binary(src, dst)
+            binaries.append(dst)
+            t0 = time.perf_counter(); read_ply(src); t_ascii = time.perf_counter() - t0
+            t0 = time.perf_counter(); read_ply(dst).bounds(); t_map = time.perf_counter() - t0
+            t0 = time.perf_counter(); read_ply(dst, mmap=False).bounds(); t_read = time.perf_counter() - t0
+            print(f"{name:<16}{t_ascii:>11.4f}s{t_map:>12.4f}s{t_read:>12.4f}s"
+                  f"{os.path.getsize(dst) / 1e6:>7.2f}")
+
+        # "At scale": many SKUs → replicate the four assets under different names
+        library = []
+        for i in range(copies):
+            for path in binaries:
+                copy = os.path.join(tmp, f"{i:03d}_{os.path.basename(path)}")
+                try:
+                    os.link(path, copy)
+                except OSError:
+                    shutil.copyfile(path, copy)
+                library.append(copy)
+
+        print(f"\n{len(library)} assets x {scenes} scenes")
+        base = rss_mb()
+        t_nocache = simulate_run(library, scenes, None)
+        print(f"  re-parse every scene : {t_nocache:8.3f}s  RSS +{rss_mb() - base:6.1f} MB")
+        for mmap in (True, False):
+            cache = MeshCache(mmap=mmap)
+            base = rss_mb()
+            t_cache = simulate_run(library, scenes, cache)
+            print(f"  cache mmap={str(mmap):<5}     : {t_cache:8.3f}s  RSS +{rss_mb() - base:6.1f} MB  "
+                  f"hits={cache.hits} misses={cache.misses} cached={cache.total_bytes / 1e6:.1f} MB")
+            cache.clear()
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else ply_folder)
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import tempfile
+
+from obj_converter import convert_obj_with_vertex_colors_to_ply, read_obj
+
+obj_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../obj")
+
+
+def convert_line_by_line(obj_path, ply_path):
+    """Reference copy of the original per-line converter (ASCII output)"""
+    vertices = []
+    faces = []
+
+    with open(obj_path, 'r') as f:
+        for line in f:
+            if line.startswith('v '):
+                parts = line.strip().split()
+                if len(parts) >= 7:
+                    x, y, z = map(float, parts[1:4])
+                    r, g, b = map(float, parts[4:7])
+                    r, g, b = int(r * 255), int(g * 255), int(b * 255)
+                    vertices.append((x, y, z, r, g, b))
+            elif line.startswith('f '):
+                parts = line.strip().split()
+                face = [int(p.split('/')[0]) - 1 for p in parts[1:]]
+                faces.append(face)
+
+    with open(ply_path, 'w') as f:
+        f.write('ply\n')
+        f.write('format ascii 1.0\n')
+        f.write(f'element vertex {len(vertices)}\n')
+        f.write('property float x\n')
+        f.write('property float y\n')
+        f.write('property float z\n')
+        f.write('property uchar red\n')
+        f.write('property uchar green\n')
+        f.write('property uchar blue\n')
+        f.write(f'element face {len(faces)}\n')
+        f.write('property list uchar int vertex_indices\n')
+        f.write('end_header\n')
+
+        for v in vertices:
+            f.write(f'{v[0]} {v[1]} {v[2]} {v[3]} {v[4]} {v[5]}\n')
+
+        for face in faces:
+            f.write(f'{len(face)} {" ".join(map(str, face))}\n')
+
+
+def best_of(fn, repeats):
+    """Best wall-clock time of `repeats` calls to fn()"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(folder=obj_folder, repeats=3):
+    obj_files = sorted(f for f in os.listdir(folder) if f.lower().endswith(".obj"))
+    print(f"{'file':<18}{'line-by-line':>14}{'numpy ascii':>14}{'numpy binary':>14}"
+          f"{'ascii MB':>10}{'binary MB':>11}{'parse obj':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fname in obj_files:
+            obj_path = os.path.join(folder, fname)
+            old_ply = os.path.join(tmp, "old.ply")
+            ascii_ply = os.path.join(tmp, "ascii.ply")
+            bin_ply = os.path.join(tmp, "binary.ply")
+
+            t_old = best_of(lambda: convert_line_by_line(obj_path, old_ply), repeats)
+            t_ascii = best_of(lambda: convert_obj_with_vertex_colors_to_ply(obj_path, ascii_ply, binary=False, verbose=False), repeats)
+            t_bin = best_of(lambda: convert_obj_with_vertex_colors_to_ply(obj_path, bin_ply, verbose=False), repeats)
+            t_read = best_of(lambda: read_obj(obj_path), repeats)
+
+            print(f"{fname:<18}{t_old:>13.3f}s{t_ascii:>13.3f}s{t_bin:>13.3f}s"
+                  f"{os.path.getsize(old_ply) / 1e6:>10.2f}{os.path.getsize(bin_ply) / 1e6:>11.2f}"
+                  f"{t_read:>10.3f}s   (x{t_old / t_bin:.1f})")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else obj_folder)
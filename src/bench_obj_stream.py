@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+from obj_converter import convert_obj_with_vertex_colors_to_ply, _parse_vertices, _parse_faces, _split_records, write_ply
+
+MODES = ["whole", "chunked", "spill"]
+
+
+def write_scan(path, side, relative=False, rows_per_write=1 << 16):
+    """Synthetic coloured height-field scan: side x side vertices, quads as 'f' lines"""
+    with open(path, "w") as f:
+        for start in range(0, side * side, rows_per_write):
+            idx = np.arange(start, min(start + rows_per_write, side * side))
+            x, y = idx % side / side, idx // side / side
+            z = 0.05 * np.sin(12 * x) * np.cos(9 * y)
+            table = np.stack([x, y, z, x, y, 1 - x], axis=1)
+            f.write(("v %.6f %.6f %.6f %.4f %.4f %.4f\n" * len(table)) % tuple(table.ravel()))
+        n_vertices = side * side
+        for row in range(side - 1):
+            a = row * side + np.arange(side - 1) + 1
+            quads = np.stack([a, a + 1, a + side + 1, a + side], axis=1)
+            if relative:
+                # Every face written after all vertices: -1 is the last vertex
+                quads = quads - n_vertices - 1
+            f.write(("f %d %d %d %d\n" * len(quads)) % tuple(quads.ravel().tolist()))
+
+
+def convert_whole(obj_path, ply_path):
+    """Reference copy of the previous converter: whole file as a list of lines"""
+    with open(obj_path, "rb") as f:
+        lines = f.read().splitlines()
+    vertices = _parse_vertices(_split_records(lines, b"v "))
+    # Relative indices as the synthetic scan writes them: every face after all vertices
+    faces = _parse_faces(_split_records(lines, b"f "), len(vertices))
+    write_ply(ply_path, vertices, faces)
+    return len(vertices), len(faces)
+
+
+def run_mode(mode, obj_path, ply_path):
+    start = time.perf_counter()
+    if mode == "whole":
+        n_vertices, n_faces = convert_whole(obj_path, ply_path)
+    else:
+        n_vertices, n_faces = convert_obj_with_vertex_colors_to_ply(obj_path, ply_path, verbose=False,
+                                                                    spill=mode == "spill")
+    return {"mode": mode, "seconds": time.perf_counter() - start, "vertices": n_vertices, "faces": n_faces,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def run(side=1000, relative=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        obj_path = os.path.join(tmp, "scan.obj")
+        write_scan(obj_path, side, relative)
+        obj_mb = os.path.getsize(obj_path) / 1e6
+        # Interpreter + numpy, paid by every mode
+        base = float(subprocess.run([sys.executable, "-c", "import numpy, resource; "
+                                     "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)"],
+                                    capture_output=True, text=True, check=True).stdout)
+        print(f"OBJ {side}x{side}: {obj_mb:.0f} MB, {side * side:,} vértices"
+              f"{' (índices relativos)' if relative else ''}; base del intérprete {base:.0f} MB")
+        print(f"{'modo':<10}{'s':>8}{'MB/s':>8}{'RSS pico MB':>13}{'sobre base':>12}{'PLY MB':>9}{'pico/PLY':>10}")
+        reference = None
+        for mode in MODES:
+            ply_path = os.path.join(tmp, f"{mode}.ply")
+            cmd = [sys.executable, os.path.abspath(__file__), "--mode", mode, obj_path, ply_path]
+            result = json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True).stdout)
+            with open(ply_path, "rb") as f:
+                content = f.read()
+            same = "" if reference is None or content == reference else "  ≠ salida de 'whole'"
+            reference = reference or content
+            ply_mb = len(content) / 1e6
+            del content
+            above = result["peak_rss_mb"] - base
+            print(f"{mode:<10}{result['seconds']:>8.2f}{obj_mb / result['seconds']:>8.1f}"
+                  f"{result['peak_rss_mb']:>13.0f}{above:>12.0f}{ply_mb:>9.1f}{above / ply_mb:>10.2f}{same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--side", type=int, default=1000, help="vértices por lado del escaneo sintético")
+    parser.add_argument("--relative", action="store_true", help="caras con índices negativos")
+    parser.add_argument("--mode", choices=MODES, help="(interno) convierte con un solo modo")
+    parser.add_argument("paths", nargs="*", help="(interno) obj y ply de --mode")
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, *args.paths)))
+    else:
+        run(args.side, args.relative)
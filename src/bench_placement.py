@@ -0,0 +1,83 @@
+import sys
+import time
+import numpy as np
+
+from placement import PlacementError, min_clearance, planogram_positions, poisson_disk_positions
+
+
+def kdtree_positions(num_objects, min_distance, bounds, max_attempts=100):
+    """Original approach: rebuild a KDTree for every candidate (needs scikit-learn)"""
+    from sklearn.neighbors import KDTree
+    positions = []
+    for _ in range(num_objects):
+        attempts = 0
+        while attempts < max_attempts:
+            new_pos = np.random.uniform(bounds[0], bounds[1], size=3)
+            new_pos[2] = 0
+            if len(positions) == 0:
+                positions.append(new_pos)
+                break
+            tree = KDTree(np.array(positions))
+            dist, _ = tree.query([new_pos], k=1)
+            if dist[0][0] >= min_distance:
+                positions.append(new_pos)
+                break
+            attempts += 1
+        if attempts >= max_attempts:
+            new_pos = np.random.uniform(bounds[0], bounds[1], size=3)
+            new_pos[2] = 0
+            positions.append(new_pos)
+    return np.array(positions)
+
+
+def half_side(n, radius, density=0.35):
+    """Half side of a square area where n discs cover `density` of the surface"""
+    return np.sqrt(n * np.pi * radius ** 2 / density) / 2
+
+
+def run(counts=(10, 100, 1000), radius=0.1):
+    rng = np.random.default_rng(0)
+    try:
+        import sklearn  # noqa: F401
+        has_sklearn = True
+    except ImportError:
+        has_sklearn = False
+        print("(scikit-learn no instalado: se omite la referencia KDTree)")
+
+    print(f"{'n':>6}{'kdtree':>12}{'overlaps':>10}{'poisson':>12}{'variable r':>13}{'clearance':>11}{'planogram':>12}")
+    for n in counts:
+        s = half_side(n, radius)
+        bounds = (-s, s, -s, s)
+
+        t_old, overlaps = float("nan"), "-"
+        if has_sklearn and n <= 1000:
+            start = time.perf_counter()
+            pos = kdtree_positions(n, 2 * radius, (-s, s))
+            t_old = time.perf_counter() - start
+            overlaps = int(min_clearance(pos, np.full(n, radius)) < 0)
+
+        start = time.perf_counter()
+        poisson_disk_positions(np.full(n, radius), bounds, rng=rng)
+        t_new = time.perf_counter() - start
+
+        radii = rng.uniform(0.5, 1.5, n) * radius
+        start = time.perf_counter()
+        try:
+            pos = poisson_disk_positions(radii, bounds, rng=rng)
+            clearance = f"{min_clearance(pos, radii):.4f}"
+        except PlacementError as e:
+            clearance = f"fail {e.placed.sum()}/{n}"
+        t_var = time.perf_counter() - start
+
+        widths = rng.uniform(0.08, 0.2, n)
+        start = time.perf_counter()
+        planogram_positions(widths, shelf_width=2.0, rows=[(0, 0.4 * r) for r in range(int(widths.sum() // 1.5) + 2)],
+                            gap=0.01, jitter=0.005, rng=rng)
+        t_plan = time.perf_counter() - start
+
+        print(f"{n:>6}{t_old * 1000:>10.1f}ms{overlaps:>10}{t_new * 1000:>10.1f}ms{t_var * 1000:>11.1f}ms"
+              f"{clearance:>11}{t_plan * 1000:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    run(tuple(int(a) for a in sys.argv[1:]) or (10, 100, 1000))
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# blenderproc run bench_render_presets.py        → real Blender
+# python bench_render_presets.py --fake          → FakeBproc, no Blender needed (only checks the plumbing)
+if "--fake" in sys.argv:
+    from fake_bproc import FakeBproc
+    bproc = FakeBproc()
+else:
+    import blenderproc as bproc
+
+from scene_pool import ScenePool
+from placement import poisson_disk_positions
+from render_plan import RENDER_PRESETS, configure_renderer, register_poses
+
+ply_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../ply")
+
+
+def make_material():
+    return bproc.material.create("bench_mat")
+
+
+def build_scene(seed=0, copies=3, n_frames=5):
+    """Fixed scene: every asset `copies` times on a Poisson-disk layout, cameras on a circle"""
+    rng = np.random.default_rng(seed)
+    plane = bproc.object.create_primitive("PLANE", scale=[5, 5, 1])
+    plane.set_location([0, 0, -3])
+    pool = ScenePool(bproc, ply_folder, material_factory=make_material).load()
+    jobs = [(i, name, c) for i, name in enumerate(pool.names) for c in range(copies)]
+    radii = [max(0.3, pool.footprint_radius(name, upright=False)) for _, name, _ in jobs]
+    positions = poisson_disk_positions(radii, bounds=(-3, 3, -3, 3), z=0, rng=rng)
+    for (i, name, c), position in zip(jobs, positions):
+        pool.place(name, position, rotation=rng.uniform(0, 2 * np.pi, 3), category_id=i + 1, copy_idx=c)
+    sun = pool.light(0, "SUN")
+    sun.set_location([4, -4, 4])
+    sun.set_energy(4)
+
+    poses = []
+    for k in range(n_frames):
+        angle = 2 * np.pi * k / n_frames
+        eye = np.array([6 * np.cos(angle), 6 * np.sin(angle), 3])
+        pose = np.eye(4)
+        pose[:3, :3] = np.asarray(bproc.camera.rotation_from_forward_vec(-eye))
+        pose[:3, 3] = eye
+        poses.append(pose)
+    return poses
+
+
+def run(presets, seed=0, copies=3, n_frames=5):
+    poses = build_scene(seed, copies, n_frames)
+    print(f"{'preset':<10}{'muestras':>9}{'ruido':>7}{'rebotes':>8}{'resolución':>12}{'s/frame':>9}{'ms/Mpx':>8}")
+    warm = True
+    for preset in presets:
+        settings = configure_renderer(bproc, preset=preset, map_by=["instance", "category_id"],
+                                      default_values={"category_id": 0})
+        register_poses(bproc, poses)
+        if warm:
+            # BVH build and kernel compilation are paid once, not by the first preset
+            bproc.renderer.render()
+            warm = False
+        start = time.perf_counter()
+        bproc.renderer.render()
+        per_frame = (time.perf_counter() - start) / len(poses)
+        w, h = settings["resolution"]
+        print(f"{preset:<10}{settings['samples']:>9}{settings['noise_threshold']:>7}{settings['max_bounces']:>8}"
+              f"{f'{w}x{h}':>12}{per_frame:>9.2f}{per_frame * 1000 / (w * h / 1e6):>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fake", action="store_true", help="usa FakeBproc en lugar de Blender")
+    parser.add_argument("--presets", nargs="+", choices=list(RENDER_PRESETS), default=list(RENDER_PRESETS))
+    parser.add_argument("--frames", type=int, default=5)
+    parser.add_argument("--copies", type=int, default=3, help="copias de cada SKU en la escena")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not args.fake:
+        bproc.init()
+    run(args.presets, args.seed, args.copies, args.frames)
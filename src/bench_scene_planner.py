@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from fake_bproc import FakeBproc
+from scene_pool import ScenePool
+from scene_planner import LAYOUTS, plan_scenes, asset_info, save_plan, ScenePlan, apply_scene
+from placement import poisson_disk_positions, PlacementError
+from visibility import box_corners, default_intrinsics
+from mesh_lod import select_lods
+from launcher import scene_seed
+
+ply_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../ply")
+
+
+def plan_one_by_one(scene_ids, names, bounds, num_angles=10):
+    """What the Blender process does per scene today (spaced layout): one pose, one matrix at a time"""
+    bproc = FakeBproc()
+    K = default_intrinsics()
+    radii = [max(0.6, 0.5 * float(np.linalg.norm(hi - lo))) for lo, hi in bounds]
+    for scene_idx in scene_ids:
+        np.random.seed(scene_seed(0, scene_idx))
+        try:
+            positions = poisson_disk_positions(radii, bounds=(-2, 2, -2, 2), z=0, dart_attempts=2000)
+        except PlacementError as e:
+            positions = np.nan_to_num(e.positions, nan=-100)
+        rotations = np.random.uniform(0, 2 * np.pi, size=(len(names), 3))
+        boxes = np.array([box_corners(bounds[i], positions[i], rotations[i]) for i in range(len(names))])
+        poses = []
+        for i in range(num_angles):
+            angle = 2 * np.pi * i / num_angles + np.random.uniform(-0.2, 0.2)
+            distance, height = 6 * np.random.uniform(0.9, 1.1), 3 * np.random.uniform(0.9, 1.1)
+            eye = np.array([distance * np.cos(angle), distance * np.sin(angle), height])
+            target = np.array([np.random.uniform(-0.3, 0.3), np.random.uniform(-0.3, 0.3), 0])
+            pose = np.eye(4)
+            pose[:3, :3] = bproc.camera.rotation_from_forward_vec(target - eye)
+            pose[:3, 3] = eye
+            poses.append(pose)
+        for pose in poses:
+            select_lods(boxes, [pose], K, (512, 512))
+        np.random.uniform(-1, 1, 4)
+
+
+def scaling(names, bounds, counts=(4, 8, 16, 50), n_scenes=500):
+    """plan_scenes time vs object count: the assets of the folder repeated up to each count.
+
+    Placement (spaced) is still one Poisson-disk run per scene, so this is
+    where the per-scene cost goes as the asset count grows; objects that do
+    not fit in the area are parked after dart_attempts tries each.
+    """
+    print(f"  escala con el número de objetos ({n_scenes} escenas):")
+    for n in counts:
+        idx = np.arange(n) % len(names)
+        for layout in LAYOUTS:
+            start = time.perf_counter()
+            plan = plan_scenes(range(n_scenes), [f"{names[i]}_{k}" for k, i in enumerate(idx)], bounds[idx], layout)
+            per_scene = (time.perf_counter() - start) / n_scenes
+            parked = json.loads(str(plan["meta"]))["parked_objects"] / n_scenes
+            print(f"    {n:4d} objetos {layout:<7} {per_scene * 1000:7.2f} ms/escena, "
+                  f"{parked:.1f} estacionados/escena")
+
+
+def run(n_scenes=10000, reference=1000, replay=200, counts=(4, 8, 16, 50)):
+    names, bounds = asset_info(ply_folder)
+    print(f"{len(names)} assets, {n_scenes} escenas")
+    start = time.perf_counter()
+    plan_one_by_one(range(reference), names, bounds)
+    per_scene = (time.perf_counter() - start) / reference
+    print(f"  una escena a la vez (como en Blender): {per_scene * 1000:.2f} ms/escena "
+          f"(~{per_scene * n_scenes:.1f}s para {n_scenes})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in LAYOUTS:
+            start = time.perf_counter()
+            plan = plan_scenes(range(n_scenes), names, bounds, layout)
+            t_plan = time.perf_counter() - start
+            path = save_plan(os.path.join(tmp, f"{layout}.npz"), plan)
+            start = time.perf_counter()
+            loaded = ScenePlan(path)
+            t_load = time.perf_counter() - start
+            print(f"  planner {layout:<7} {t_plan:6.2f}s ({t_plan / n_scenes * 1000:.2f} ms/escena), "
+                  f"{os.path.getsize(path) / 1e6:.1f} MB, carga {t_load * 1000:.0f} ms")
+
+        # Replay on the pooled objects: the only per-scene work left in the render process
+        bproc = FakeBproc()
+        pool = ScenePool(bproc, ply_folder).load()
+        start = time.perf_counter()
+        for scene_idx in range(replay):
+            pool.begin_scene()
+            apply_scene(pool, loaded, scene_idx)
+        print(f"  reproducir en el pool (FakeBproc): {(time.perf_counter() - start) / replay * 1000:.2f} ms/escena")
+
+    if counts:
+        scaling(names, bounds, counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, default=10000)
+    parser.add_argument("--reference", type=int, default=1000, help="escenas del camino una-a-una")
+    parser.add_argument("--objects", type=int, nargs="*", default=[4, 8, 16, 50],
+                        help="números de objetos para medir la escala del planner (vacío: no medir)")
+    args = parser.parse_args()
+    run(args.scenes, args.reference, counts=args.objects)
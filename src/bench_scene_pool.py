@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# blenderproc run bench_scene_pool.py        → real Blender
+# python bench_scene_pool.py --fake          → FakeBproc, no Blender needed
+if "--fake" in sys.argv:
+    from fake_bproc import FakeBproc
+    bproc = FakeBproc()
+else:
+    import blenderproc as bproc
+
+from scene_pool import ScenePool
+
+ply_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../ply")
+
+
+def make_material():
+    return bproc.material.create("bench_mat")
+
+
+def random_pose(rng):
+    return rng.uniform(-2, 2, size=3) * [1, 1, 0], rng.uniform(0, 2 * np.pi, size=3)
+
+
+def reload_scene(ply_files, copies, rng):
+    """Old behaviour: wipe the scene and load every asset (and every copy) again"""
+    bproc.clean_up()
+    plane = bproc.object.create_primitive("PLANE", scale=[5, 5, 1])
+    plane.set_location([0, 0, -3])
+    for i, fname in enumerate(ply_files):
+        for _ in range(copies):
+            for obj in bproc.loader.load_obj(os.path.join(ply_folder, fname)):
+                location, rotation = random_pose(rng)
+                obj.set_location(location)
+                obj.set_rotation_euler(rotation)
+                obj.add_material(make_material())
+                obj.set_cp("category_id", i + 1)
+
+
+def pooled_scene(pool, copies, rng):
+    """Scene-pool behaviour: hide, re-pose and show resident objects"""
+    pool.begin_scene()
+    for i, name in enumerate(pool.names):
+        for copy_idx in range(copies):
+            location, rotation = random_pose(rng)
+            pool.place(name, location, rotation, category_id=i + 1, copy_idx=copy_idx)
+
+
+def run(scenes=10, copies=3):
+    ply_files = sorted(f for f in os.listdir(ply_folder) if f.lower().endswith(".ply"))
+    rng = np.random.default_rng(0)
+
+    times = []
+    for _ in range(scenes):
+        start = time.perf_counter()
+        reload_scene(ply_files, copies, rng)
+        times.append(time.perf_counter() - start)
+    print(f"reload every scene : {np.mean(times) * 1000:8.1f} ms/scene  (first {times[0] * 1000:.1f} ms)")
+
+    bproc.clean_up()
+    start = time.perf_counter()
+    pool = ScenePool(bproc, ply_folder, material_factory=make_material).load()
+    load_time = time.perf_counter() - start
+    times = []
+    for _ in range(scenes):
+        start = time.perf_counter()
+        pooled_scene(pool, copies, rng)
+        times.append(time.perf_counter() - start)
+    print(f"scene pool         : {np.mean(times) * 1000:8.1f} ms/scene  (first {times[0] * 1000:.1f} ms, "
+          f"one-off load {load_time * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fake", action="store_true", help="usa FakeBproc en lugar de Blender")
+    parser.add_argument("--scenes", type=int, default=10)
+    parser.add_argument("--copies", type=int, default=3, help="copias de cada SKU por escena")
+    args = parser.parse_args()
+    if not args.fake:
+        bproc.init()
+    run(args.scenes, args.copies)
@@ -1,12 +1,61 @@
 import blenderproc as bproc
 import os
+import time
 import numpy as np
 from mathutils import Matrix, Euler
-from sklearn.neighbors import KDTree
+from scene_pool import ScenePool
+from mesh_store import load_objects
+from render_plan import configure_renderer, render_plan, write_frame_hdf5, timed_write, FrameTimings
+from launcher import generator_args, apply_thread_budget, seed_scene, scene_complete, write_scene_manifest
+from async_writer import AsyncWriter, WriterSettings, write_png
+from functools import partial
+from annotation import (colorize_segmentation, segmentation_to_gray, category_lut, frame_annotations,
+                        write_yolo, CocoWriter)
+from placement import poisson_disk_positions, PlacementError
+from color_stage import apply_color_mode
+from visibility import box_corners, sample_visible_poses, segmap_visible, CullingStats
+from mesh_lod import select_lods
+from material_registry import MaterialRegistry, roughness_bucket
+from scene_planner import ScenePlan, apply_scene, LAYOUTS, shelf_positions, sample_eyes, look_at
+from telemetry import configure_telemetry, telemetry_name, stage, timed, count, add_bytes, read_records, report
+
+# Load every PLY once and only re-pose it per scene (False: reload each scene)
+USE_SCENE_POOL = True
+
+# Object layout of the pooled scenes: "spaced" (Poisson disk) or "planogram" (shelf rows,
+# see scene_planner.LAYOUTS; needs USE_SCENE_POOL)
+LAYOUT = "spaced"
+
+# Encode PNG/HDF5 in background threads while the next scene renders
+ASYNC_WRITE = True
+WRITER_SETTINGS = WriterSettings(png_compression=3, hdf5_compression="gzip", hdf5_compression_opts=4)
+
+# Render quality/speed (see render_plan.RENDER_PRESETS); --preset overrides it
+RENDER_PRESET = "balanced"
+
+# Colour convention of rgb.png (see color_stage.COLOR_MODES); the HDF5 keeps the rendered colours
+COLOR_MODE = "raw"
+
+# Resample camera poses that see fewer than MIN_VISIBLE_PRODUCTS boxes (projected PLY bounds),
+# and drop rendered frames whose segmap shows fewer products with MIN_SEGMAP_PIXELS pixels
+CULLING = True
+MIN_VISIBLE_PRODUCTS = 3
+MIN_VISIBLE_AREA_PX = 400
+MIN_SEGMAP_PIXELS = 400
+
+# Simplified meshes (mesh_lod.py) for products that stay small on screen in every camera pose
+USE_LODS = True
+
+# Per scene, give every SKU a random roughness (snapped to material_registry.ROUGHNESS_BUCKETS)
+RANDOMIZE_ROUGHNESS = False
+
+# COCO (coco.json per shard) and YOLO (rgb.txt per frame) labels from the in-memory segmaps
+ANNOTATE = True
 
 def setup_scene(scene_idx):
     """Set up a scene with properly spaced random object positions"""
     bproc.clean_up()
+    materials.collect_garbage()
     
     # Create a base plane
     plane = bproc.object.create_primitive("PLANE", scale=[5, 5, 1])
@@ -17,11 +66,13 @@ def setup_scene(scene_idx):
     ply_files = [f for f in os.listdir(ply_folder) if f.lower().endswith(".ply")]
     
     # Generate random but spaced positions
-    positions = generate_spaced_positions(len(ply_files), min_distance=1.2)
+    with stage("placement"):
+        positions = generate_spaced_positions(len(ply_files), min_distance=1.2)
     
     for i, fname in enumerate(ply_files):
         path = os.path.join(ply_folder, fname)
-        objs = bproc.loader.load_obj(path)
+        with stage("asset_load"):
+            objs = load_objects(bproc, path)
         for obj in objs:
             # Set position with proper spacing
             obj.set_location(positions[i])
@@ -29,8 +80,8 @@ def setup_scene(scene_idx):
             # Random rotation (optional)
             obj.set_rotation_euler(Euler(np.random.uniform(0, 2*np.pi, size=3)))
             
-            material = create_vertex_color_material()
-            obj.set_material(0, material)
+            roughness = roughness_bucket(np.random.uniform(0.2, 0.8)) if RANDOMIZE_ROUGHNESS else None
+            obj.set_material(0, create_vertex_color_material(roughness))
             obj.set_cp("category_id", i+1)  # for segmentation
             objects.append(obj)
 
@@ -46,171 +97,303 @@ def setup_scene(scene_idx):
     
     return objects
 
-def generate_spaced_positions(num_objects, min_distance=1.0, max_attempts=100):
-    """Generate random positions with minimum spacing between objects"""
-    positions = []
-    bounds = [-2, 2]  # Area where objects can be placed
-    
-    for _ in range(num_objects):
-        attempts = 0
-        while attempts < max_attempts:
-            # Generate random position
-            new_pos = np.random.uniform(bounds[0], bounds[1], size=3)
-            new_pos[2] = 0  # Keep on ground plane
-            
-            # Check distance to existing positions
-            if len(positions) == 0:
-                positions.append(new_pos)
-                break
-                
-            tree = KDTree(np.array(positions))
-            dist, _ = tree.query([new_pos], k=1)
-            
-            if dist[0][0] >= min_distance:
-                positions.append(new_pos)
-                break
-                
-            attempts += 1
-        
-        if attempts >= max_attempts:
-            # Fallback if can't find good position
-            new_pos = np.random.uniform(bounds[0], bounds[1], size=3)
-            new_pos[2] = 0
-            positions.append(new_pos)
-    
-    return positions
+def setup_scene_pooled(pool, scene_idx, num_angles=10, culling=None):
+    """Re-pose the resident objects of the pool instead of reloading them.
+
+    Camera poses are sampled from the bounding boxes before the objects are
+    shown, so each object can get the LOD matching its size on screen.
+    Returns the objects, the (N, 8, 3) world corners of their bounding boxes
+    and the camera poses.
+    """
+    pool.begin_scene()
+    materials.collect_garbage()
+
+    names = pool.names
+    with stage("placement"):
+        scale = None
+        if LAYOUT == "planogram":
+            # Upright facings in shelf rows, facing the cameras
+            spec = LAYOUTS["planogram"]
+            scale = [spec["scale"]] * 3
+            positions, _ = shelf_positions(np.random, [pool.bounds(name) for name in names], spec)
+            rotations = np.zeros((len(names), 3))
+        else:
+            # Objects get a random 3-axis rotation, so use the rotation-safe footprint
+            radii = [max(0.6, pool.footprint_radius(name, upright=False)) for name in names]
+            positions = generate_spaced_positions(len(names), min_distance=1.2, radii=radii)
+            rotations = np.random.uniform(0, 2*np.pi, size=(len(names), 3))
+        boxes = np.array([box_corners(pool.bounds(name), positions[i], rotations[i], scale or 1.0)
+                          for i, name in enumerate(names)])
+
+    with stage("camera_poses"):
+        camera_poses = generate_camera_poses(num_angles, boxes, culling)
+        lods = np.zeros(len(names), dtype=int)
+        if USE_LODS:
+            lods = select_lods(boxes, camera_poses, *camera_intrinsics())
+
+    objects = []
+    with stage("pose_objects"):
+        for i, name in enumerate(names):
+            material = None
+            if RANDOMIZE_ROUGHNESS:
+                material = create_vertex_color_material(roughness_bucket(np.random.uniform(0.2, 0.8)))
+            objects.extend(pool.place(
+                name,
+                positions[i],
+                rotation=rotations[i],
+                scale=scale,
+                category_id=i+1,  # for segmentation
+                lod=lods[i],
+                material=material,
+            ))
+
+    # Same sun as setup_scene, but reused across scenes
+    sun = pool.light(0, "SUN")
+    sun.set_location([
+        4 + np.random.uniform(-1, 1),
+        -4 + np.random.uniform(-1, 1),
+        4 + np.random.uniform(-1, 1)
+    ])
+    sun.set_energy(4 + np.random.uniform(-1, 1))
+
+    return objects, boxes, camera_poses
+
+def setup_scene_planned(pool, plan, scene_idx):
+    """Replay a scene of a scene_planner.py plan: nothing is sampled in the Blender process.
 
-def generate_camera_poses(num_angles=10):
-    """Generate camera poses around the scene with slight variations"""
-    poses = []
+    Returns the objects and the planned camera poses.
+    """
+    pool.begin_scene()
+    materials.collect_garbage()
+    with stage("pose_objects"):
+        return apply_scene(pool, plan, scene_idx)
+
+def generate_spaced_positions(num_objects, min_distance=1.0, max_attempts=100, radii=None):
+    """Generate random positions with minimum spacing between objects.
+
+    Poisson-disk placement on a spatial hash; radii (one per object) default
+    to min_distance / 2. If the area is too small for all objects the ones
+    that fit keep their spacing and the rest are dropped below the floor
+    (z = -100) instead of overlapping.
+    """
+    bounds = (-2, 2, -2, 2)  # Area where objects can be placed
+    if radii is None:
+        radii = np.full(num_objects, min_distance / 2)
+    try:
+        return poisson_disk_positions(radii, bounds=bounds, z=0, dart_attempts=max_attempts * 20)
+    except PlacementError as e:
+        print(f"⚠️ {e}")
+        positions = e.positions
+        positions[~e.placed] = (0, 0, -100)
+        return positions
+
+def sample_camera_pose(i, num_angles=10):
+    """Camera pose for angle i of num_angles, with slight random variations"""
+    if LAYOUT == "planogram":
+        # In front of the shelf instead of orbiting it
+        return look_at(*sample_eyes(np.random, [i], num_angles, LAYOUTS["planogram"]))[0]
     base_distance = 6
     base_height = 3
+
+    # Evenly distribute angles with slight randomness
+    angle = 2 * np.pi * i / num_angles + np.random.uniform(-0.2, 0.2)
+    distance = base_distance * np.random.uniform(0.9, 1.1)
+    height = base_height * np.random.uniform(0.9, 1.1)
     
-    for i in range(num_angles):
-        # Evenly distribute angles with slight randomness
-        angle = 2 * np.pi * i / num_angles + np.random.uniform(-0.2, 0.2)
-        distance = base_distance * np.random.uniform(0.9, 1.1)
-        height = base_height * np.random.uniform(0.9, 1.1)
-        
-        # Calculate position
-        x = distance * np.cos(angle)
-        y = distance * np.sin(angle)
-        z = height
-        
-        # Point camera toward center with slight random offset
-        target = [np.random.uniform(-0.3, 0.3), np.random.uniform(-0.3, 0.3), 0]
-        
-        # Create camera pose
-        cam_location = [x, y, z]
-        cam_rot_matrix = bproc.camera.rotation_from_forward_vec(np.array(target) - np.array(cam_location))
-        pose = Matrix.Translation(cam_location) @ Matrix(cam_rot_matrix).to_4x4()
-        poses.append(pose)
-    
-    return poses
-
-def create_vertex_color_material():
-    """Create material with vertex colors"""
-    mat = bproc.material.create("vertex_color_mat")
-    mat_blender = mat.blender_obj
-    node_tree = mat_blender.node_tree
-
-    bsdf_node = None
-    for node in node_tree.nodes:
-        if node.type == "BSDF_PRINCIPLED":
-            bsdf_node = node
-            break
-    if bsdf_node is None:
-        raise RuntimeError("No se encontró el nodo Principled BSDF")
-
-    vc_node = node_tree.nodes.new(type="ShaderNodeVertexColor")
-    vc_node.layer_name = "Col"
-
-    node_tree.links.new(vc_node.outputs["Color"], bsdf_node.inputs["Base Color"])
-    return mat
-
-def render_scene(output_dir, scene_idx, angle_idx):
-    """Render and save outputs for one camera angle"""
-    # Configure render settings
-    bproc.renderer.set_output_format("PNG")
-    bproc.renderer.enable_segmentation_output(map_by="instance")
-    bproc.renderer.set_max_amount_of_samples(100)
-    bproc.renderer.set_light_bounces(diffuse_bounces=3, glossy_bounces=3)
-
-    # Render the scene
-    data = bproc.renderer.render()
-    
-    # Save all outputs
-    frame_dir = os.path.join(output_dir, f"frame_{angle_idx:02d}")
-    os.makedirs(frame_dir, exist_ok=True)
+    # Calculate position
+    x = distance * np.cos(angle)
+    y = distance * np.sin(angle)
+    z = height
     
-    bproc.writer.write_hdf5(frame_dir, data)
+    # Point camera toward center with slight random offset
+    target = [np.random.uniform(-0.3, 0.3), np.random.uniform(-0.3, 0.3), 0]
     
-    # Save RGB image
-    import cv2
-    img_bgr = (data["colors"][0]).astype(np.uint8)
-    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    cv2.imwrite(os.path.join(frame_dir, "rgb.png"), img_rgb)
+    # Create camera pose
+    cam_location = [x, y, z]
+    cam_rot_matrix = bproc.camera.rotation_from_forward_vec(np.array(target) - np.array(cam_location))
+    return Matrix.Translation(cam_location) @ Matrix(cam_rot_matrix).to_4x4()
+
+def camera_intrinsics():
+    """K matrix and (width, height) of the render camera"""
+    K = np.array(bproc.camera.get_intrinsics_as_K_matrix())
+    return K, (int(round(2 * K[0, 2])), int(round(2 * K[1, 2])))
+
+def generate_camera_poses(num_angles=10, boxes=None, stats=None):
+    """Generate camera poses around the scene with slight variations.
+
+    With boxes (world corners of the products) every angle is resampled
+    until the camera sees at least MIN_VISIBLE_PRODUCTS of them.
+    """
+    if boxes is None or not CULLING:
+        return [sample_camera_pose(i, num_angles) for i in range(num_angles)]
+    K, resolution = camera_intrinsics()
+    return sample_visible_poses(lambda i: sample_camera_pose(i, num_angles), num_angles, boxes, K, resolution,
+                                min_visible=MIN_VISIBLE_PRODUCTS, min_area=MIN_VISIBLE_AREA_PX, stats=stats)
+
+@timed("material")
+def create_vertex_color_material(roughness=None):
+    """Material with vertex colors, built once per process and shared (see material_registry.py)"""
+    return materials.vertex_color(roughness=roughness)
+
+def annotate_frame(frame_dir, frame, coco, output_dir, scene=None):
+    """Bounding boxes, areas and RLE masks of every visible instance of one frame"""
+    with stage("annotate", scene):
+        seg = frame["instance_segmaps"]
+        cats = category_lut(seg, frame.get("instance_attribute_maps"), frame.get("category_id_segmaps"))
+        annotations = frame_annotations(seg, cats)
+        h, w = seg.shape
+        write_yolo(os.path.join(frame_dir, "rgb.txt"), annotations, w, h)
+        coco.add_frame(os.path.relpath(os.path.join(frame_dir, "rgb.png"), output_dir), w, h, annotations)
+
+def save_frame(frame_dir, frame, settings=WRITER_SETTINGS, coco=None, output_dir=None, scene=None):
+    """Save HDF5, RGB and segmentation outputs of one rendered frame"""
+    with stage("write_hdf5", scene):
+        write_frame_hdf5(frame_dir, frame, version=getattr(bproc, "__version__", None), **settings.hdf5_kwargs())
     
-    # Save segmentation maps
-    seg = data["instance_segmaps"][0]
-    seg_vis = (seg.astype(np.float32) / seg.max() * 255).astype(np.uint8)
-    cv2.imwrite(os.path.join(frame_dir, "segmentation.png"), seg_vis)
+    # Save RGB image (labels-only runs have no colours)
+    if "colors" in frame:
+        with stage("write_rgb", scene):
+            img_bgr = apply_color_mode(frame["colors"], COLOR_MODE, bgr=True)
+            write_png(os.path.join(frame_dir, "rgb.png"), img_bgr, settings)
     
-    # Create colored segmentation visualization
-    seg_colored = np.zeros((*seg.shape, 3), dtype=np.uint8)
-    for instance_id in np.unique(seg):
-        if instance_id == 0:
-            continue  # 0 is background
-        color = COLORMAP[instance_id % len(COLORMAP)]
-        seg_colored[seg == instance_id] = color
-    cv2.imwrite(os.path.join(frame_dir, "segmentation_colored.png"), seg_colored)
+    with stage("write_segmentation", scene):
+        # Save segmentation maps
+        seg = frame["instance_segmaps"]
+        write_png(os.path.join(frame_dir, "segmentation.png"), segmentation_to_gray(seg), settings)
+        
+        # Colored segmentation visualization (0 is background)
+        write_png(os.path.join(frame_dir, "segmentation_colored.png"), colorize_segmentation(seg), settings)
+
+    if coco is not None:
+        annotate_frame(frame_dir, frame, coco, output_dir, scene)
+    count("frames", 1, scene)
+    add_bytes([os.path.join(frame_dir, f) for f in os.listdir(frame_dir)], scene)
 
 # Main execution
 if __name__ == "__main__":
+    # --scenes / --master-seed / --threads / --output-dir (see launcher.py)
+    args = generator_args(default_scenes="0-9", default_output="output_scenes")
+    if LAYOUT == "planogram" and not USE_SCENE_POOL:
+        raise SystemExit("LAYOUT = 'planogram' necesita USE_SCENE_POOL = True")
+
     # Initialize BlenderProc
     bproc.init()
+    apply_thread_budget(bproc, args.threads)
+    materials = MaterialRegistry(bproc)
     
     # Path to .ply folder
     ply_folder = os.path.join(os.path.dirname(__file__), "../ply")
     
-    # COLORMAP for segmentation visualization
-    COLORMAP = np.array([
-        [230, 25, 75], [60, 180, 75], [255, 225, 25], [0, 130, 200], [245, 130, 48],
-        [145, 30, 180], [70, 240, 240], [240, 50, 230], [210, 245, 60], [250, 190, 190],
-        [0, 128, 128], [230, 190, 255], [170, 110, 40], [255, 250, 200], [128, 0, 0],
-        [170, 255, 195], [128, 128, 0], [255, 215, 180], [0, 0, 128], [128, 128, 128]
-    ], dtype=np.uint8)
-
-    # Create 10 different scenes
-    for scene_idx in range(10):
-        print(f"\nGenerating scene {scene_idx + 1}/10")
+    # Render settings are applied once for the whole run
+    # category_id segmaps give the class of every instance (0 for the plane)
+    render_settings = configure_renderer(bproc, preset=args.preset or RENDER_PRESET,
+                                         map_by=["instance", "category_id"], default_values={"category_id": 0})
+    drop_keys = ("colors",) if render_settings["labels_only"] else ()
+    os.makedirs(args.output_dir, exist_ok=True)
+    timings_name = "timings.csv" if args.shard_id is None else f"timings_shard{args.shard_id:03d}.csv"
+    timings = FrameTimings(os.path.join(args.output_dir, timings_name))
+    # Per-scene stage times, frames, bytes and peak RSS (summary: python telemetry.py <output_dir>)
+    telemetry = configure_telemetry(os.path.join(args.output_dir, telemetry_name(args.shard_id)), args.shard_id,
+                                    args.profile)
+
+    writer = AsyncWriter(max_pending=16, workers=4) if ASYNC_WRITE else None
+    coco = None
+    if ANNOTATE:
+        coco_name = "coco.json" if args.shard_id is None else f"coco_shard{args.shard_id:03d}.json"
+        coco = CocoWriter(os.path.join(args.output_dir, coco_name))
+    save = partial(save_frame, coco=coco, output_dir=args.output_dir)
+    culling = CullingStats()
+    # Precomputed layouts (python scene_planner.py plan.npz --layout spaced); they carry their own seeds
+    plan = ScenePlan(args.plan) if args.plan else None
+    if plan is not None:
+        args.master_seed = plan.meta["master_seed"]
+
+    if USE_SCENE_POOL or plan is not None:
+        # Base plane and assets live for the whole run
+        plane = bproc.object.create_primitive("PLANE", scale=[5, 5, 1])
+        plane.set_location([0, 0, -3])
+        with stage("asset_load"):
+            pool = ScenePool(bproc, ply_folder, material_factory=create_vertex_color_material).load()
+
+    # Create the requested scenes (0-9 by default)
+    for n, scene_idx in enumerate(args.scenes):
+        scene_dir = os.path.join(args.output_dir, f"scene_{scene_idx:02d}")
+        if scene_complete(scene_dir):
+            print(f"\nScene {scene_idx} already complete, skipping")
+            continue
+        print(f"\nGenerating scene {scene_idx} ({n + 1}/{len(args.scenes)})")
+        scene_start = time.perf_counter()
+        
+        # Own seed per scene: any scene can be regenerated on its own
+        seed = seed_scene(args.master_seed, scene_idx)
+        telemetry.begin_scene(scene_idx, seed=seed)
         
         # Reset the scene
         bproc.utility.reset_keyframes()
         
         # Set up scene with properly spaced objects
-        objects = setup_scene(scene_idx)
-        
-        # Generate 10 camera angles
-        camera_poses = generate_camera_poses(10)
+        # and 10 camera angles (resampled until enough products are in view)
+        if plan is not None:
+            (objects, camera_poses), boxes = setup_scene_planned(pool, plan, scene_idx), None
+        elif USE_SCENE_POOL:
+            objects, boxes, camera_poses = setup_scene_pooled(pool, scene_idx, 10, culling)
+        else:
+            objects, boxes = setup_scene(scene_idx), None
+            camera_poses = generate_camera_poses(10)
+        min_products = min(MIN_VISIBLE_PRODUCTS, len(boxes) if boxes is not None else len(objects))
+
+        def keep_frame(frame):
+            # Second check on the rendered segmap: enough products with enough visible pixels
+            seg = frame["instance_segmaps"]
+            cats = category_lut(seg, frame.get("instance_attribute_maps"), frame.get("category_id_segmaps"))
+            keep = segmap_visible(seg, MIN_SEGMAP_PIXELS, cats) >= min_products
+            culling.dropped += not keep
+            return keep
         
         # Create output directory for this scene
-        scene_dir = os.path.join("output_scenes", f"scene_{scene_idx:02d}")
         os.makedirs(scene_dir, exist_ok=True)
         
-        # Render from each camera angle
-        for angle_idx, pose in enumerate(camera_poses):
-            print(f"  Rendering angle {angle_idx + 1}/10")
-            
-            # Clear previous camera poses
-            bproc.utility.reset_keyframes()
-            
-            # Add new camera pose
-            bproc.camera.add_camera_pose(pose)
-            
-            # Render and save
-            render_scene(scene_dir, scene_idx, angle_idx)
+        # All angles as keyframes of a single render, split into frame_YY folders
+        print(f"  Rendering {len(camera_poses)} angles")
+        scene_futures = []
+        if writer is not None:
+            # Frames are only queued here; the manifest follows once they are on disk
+            def write_frame(frame_dir, frame, scene_futures=scene_futures, scene_idx=scene_idx):
+                # Timed in the worker: FrameTimings records the write, not the enqueue
+                future = writer.submit(timed_write, save, frame_dir, frame, scene=scene_idx)
+                scene_futures.append(future)
+                return future
+        else:
+            write_frame = partial(save, scene=scene_idx)
+        render_start = time.perf_counter()
+        dropped_before = culling.dropped
+        render_plan(bproc, camera_poses, scene_dir, write_frame, timings=timings,
+                    scene_idx=scene_idx, setup_s=time.perf_counter() - scene_start,
+                    keep_frame=keep_frame if CULLING else None, drop_keys=drop_keys)
+        culling.add_render(len(camera_poses), time.perf_counter() - render_start)
+        kept_frames = len(camera_poses) - (culling.dropped - dropped_before)
+        telemetry.end_profile(scene_idx)
+
+        def finish_scene(scene_dir=scene_dir, scene_idx=scene_idx, seed=seed, n_poses=len(camera_poses),
+                         kept_frames=kept_frames):
+            # kept_frames 0 (every frame culled) is still a finished scene with no files
+            write_scene_manifest(scene_dir, scene_idx, seed, extra={"kept_frames": kept_frames})
+            telemetry.end_scene(scene_idx, poses=n_poses)
+        if writer is not None:
+            writer.after(scene_futures, finish_scene, label=f"manifiesto de la escena {scene_idx} (se volverá a generar)")
+        else:
+            finish_scene()
 
+    if writer is not None:
+        writer.close()
+    if coco is not None and coco.close():
+        print(f"Anotaciones COCO: {coco.path}")
+    telemetry.close()
+    print(f"\n{timings.summary()}")
+    print(materials.summary())
+    print(report(read_records([telemetry.path])))
+    if CULLING:
+        print(culling.summary())
     print("\nAll scenes generated successfully!")
 
 
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from image_metrics import flag_images
+
+# Category → folder, as in create_output_folders of EDA.ipynb
+CATEGORY_FOLDERS = {
+    "good": "potentially_good_images",
+    "blurred": "potentially_blurred_images",
+    "dark": "potentially_dark_images",
+    "bright": "potentially_bright_images",
+    "low_entropy": "potentially_low_entropy_images",
+    "other_issues": "other_potential_issues",
+}
+
+# manifest: no files at all; link: reflink, else hardlink, else copy
+MODES = ["manifest", "link", "reflink", "hardlink", "symlink", "copy"]
+
+FICLONE = 0x40049409    # Linux ioctl behind `cp --reflink`
+
+
+def category_folders(base_dir):
+    return {cat: os.path.join(base_dir, folder) for cat, folder in CATEGORY_FOLDERS.items()}
+
+
+def reflink(src, dst):
+    """Copy-on-write clone (Btrfs, XFS, …); raises OSError where unsupported"""
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflink solo disponible en Linux")
+    import fcntl
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        try:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        except OSError:
+            fd.close()
+            os.remove(dst)
+            raise
+
+
+def place_file(src, dst, mode):
+    """Make dst point to (or contain) src; returns the method actually used"""
+    if os.path.lexists(dst):
+        if mode != "symlink" and os.path.exists(dst) and os.path.samefile(src, dst):
+            return "existente"
+        os.remove(dst)
+    if mode == "symlink":
+        os.symlink(os.path.abspath(src), dst)
+        return "symlink"
+    if mode in ("link", "reflink"):
+        try:
+            reflink(src, dst)
+            return "reflink"
+        except OSError:
+            pass
+    if mode in ("link", "hardlink"):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass    # other filesystem / no link support: fall back to copying
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def categorize(df, **thresholds):
+    """df with one boolean column per category appended (vectorized threshold rules)"""
+    return df.join(flag_images(df, **thresholds))
+
+
+def write_manifests(flagged, output_folders, fmt="csv"):
+    """One manifest per category listing its images and their metrics"""
+    paths = {}
+    metric_cols = [c for c in flagged.columns if c not in output_folders]
+    for cat, folder in output_folders.items():
+        os.makedirs(folder, exist_ok=True)
+        rows = flagged.loc[flagged[cat], metric_cols]
+        path = os.path.join(folder, f"manifest.{fmt}")
+        if fmt == "jsonl":
+            rows.to_json(path, orient="records", lines=True, force_ascii=False)
+        else:
+            rows.to_csv(path, index=False)
+        paths[cat] = path
+    return paths
+
+
+def save_categorized_images(df, output_folders, mode="link", manifest_format="csv", workers=8, **thresholds):
+    """Replacement for save_categorized_images of EDA.ipynb.
+
+    Writes a manifest per category; unless mode="manifest", every image is
+    also linked (or, as a last resort, copied in parallel) into the folder
+    of each category it falls into. Returns {category: count}.
+    """
+    if df is None or df.empty:
+        print("No hay datos para categorizar/guardar.")
+        return {}
+    if mode not in MODES:
+        raise ValueError(f"Modo desconocido: {mode} (opciones: {', '.join(MODES)})")
+
+    print(f"\nCategorizando imágenes (modo: {mode})...")
+    flagged = categorize(df, **thresholds)
+    write_manifests(flagged, output_folders, manifest_format)
+    counts = {cat: int(flagged[cat].sum()) for cat in output_folders}
+
+    if mode != "manifest":
+        exists = flagged["path"].map(os.path.exists)
+        for src in flagged.loc[~exists, "path"]:
+            print(f"ADVERTENCIA: Origen no existe: {src}")
+        jobs = [(src, os.path.join(output_folders[cat], name))
+                for cat in output_folders
+                for src, name in flagged.loc[flagged[cat] & exists, ["path", "filename"]].itertuples(index=False)]
+        methods = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(src, dst, pool.submit(place_file, src, dst, mode)) for src, dst in jobs]
+            for src, dst, future in futures:
+                try:
+                    method = future.result()
+                    methods[method] = methods.get(method, 0) + 1
+                except Exception as e:
+                    print(f"Error guardando {os.path.basename(src)} en {os.path.dirname(dst)}: {e}")
+        print("  Archivos: " + ", ".join(f"{m} {n}" for m, n in sorted(methods.items())))
+
+    for cat, count in counts.items():
+        print(f"  Imágenes en '{cat}': {count}")
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clasifica imágenes por calidad a partir del CSV de métricas")
+    parser.add_argument("metrics", help="CSV/Parquet de image_metrics.py")
+    parser.add_argument("output_dir")
+    parser.add_argument("--mode", choices=MODES, default="link")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("-j", "--workers", type=int, default=8)
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python categorize.py output_image_analysis_bimbo/image_metadata_analysis.csv output_image_analysis_bimbo --mode link
+
+if __name__ == "__main__":
+    from image_metrics import read_metrics
+
+    args = parse_args()
+    save_categorized_images(read_metrics(args.metrics), category_folders(args.output_dir), args.mode,
+                            args.format, args.workers)
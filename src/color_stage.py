@@ -0,0 +1,126 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+# Transfer functions on colours normalised to [0, 1] (float32, applied in place)
+COLOR_MODES = {
+    # As rendered: bproc's PNG output is already display-referred
+    "raw": lambda x: x,
+    # Extra 1/2.2 gamma of Dataset_Generator.py
+    "gamma22": lambda x: np.power(x, 1 / 2.2, out=x),
+    # Piecewise sRGB encoding, for linear (EXR-like) colours
+    "srgb": lambda x: np.where(x <= 0.0031308, 12.92 * x, 1.055 * np.power(x, 1 / 2.4) - 0.055),
+}
+
+_luts = {}
+
+
+def color_lut(mode):
+    """256-entry uint8 table of a mode for 8-bit input; computed once (float64, truncating like astype)"""
+    if mode not in _luts:
+        x = np.arange(256, dtype=np.float64) / 255
+        _luts[mode] = (np.clip(COLOR_MODES[mode](x), 0, 1) * 255).astype(np.uint8)
+    return _luts[mode]
+
+
+def apply_color_mode(colors, mode="raw", bgr=False, input_scale=1.0):
+    """Display-ready uint8 colours of a frame (H, W, 3) or a whole stack (N, H, W, 3).
+
+    8-bit input goes through one LUT lookup; other integer types are
+    normalised by their maximum and floats by input_scale (1.0: colours in
+    [0, 1]), then processed in float32 in place. bgr=True also swaps the
+    channels for cv2.imwrite.
+    """
+    if mode not in COLOR_MODES:
+        raise ValueError(f"Modo de color desconocido: {mode} (opciones: {', '.join(COLOR_MODES)})")
+    colors = np.asarray(colors)
+    if colors.dtype == np.uint8 and colors.ndim >= 3 and colors.shape[-1] == 3:
+        # cv2.LUT / cvtColor see the stack as one tall (N*H, W, 3) image
+        flat = np.ascontiguousarray(colors).reshape(-1, *colors.shape[-2:])
+        if mode != "raw":
+            flat = cv2.LUT(flat, color_lut(mode))
+        if bgr:
+            flat = cv2.cvtColor(flat, cv2.COLOR_RGB2BGR)
+        elif mode == "raw":
+            flat = flat.copy()
+        return flat.reshape(colors.shape)
+    if bgr:
+        colors = colors[..., ::-1]
+    if colors.dtype == np.uint8:
+        return np.take(color_lut(mode), colors)
+    scale = np.iinfo(colors.dtype).max if np.issubdtype(colors.dtype, np.integer) else input_scale
+    x = colors.astype(np.float32)
+    if scale != 1:
+        x *= np.float32(1 / scale)
+    np.clip(x, 0, 1, out=x)
+    x = COLOR_MODES[mode](x)
+    x *= 255
+    return x.astype(np.uint8)
+
+
+# === Offline re-processing of rendered HDF5 files ===
+
+def find_hdf5(root, name="0.hdf5"):
+    found = []
+    for folder, _, files in os.walk(root):
+        found.extend(os.path.join(folder, f) for f in files if f == name)
+    return sorted(found)
+
+
+def reprocess_file(hdf5_path, mode, png_name="rgb.png", png_compression=3):
+    """Re-encode the colours stored in one HDF5 frame as png_name next to it"""
+    import h5py
+
+    with h5py.File(hdf5_path, "r") as f:
+        colors = f["colors"][()]
+    frames = colors if colors.ndim == 4 else colors[None]
+    out = apply_color_mode(frames, mode, bgr=True)
+    folder = os.path.dirname(hdf5_path)
+    paths = []
+    for i, img in enumerate(out):
+        name = png_name if len(out) == 1 else f"{os.path.splitext(png_name)[0]}_{i:04d}.png"
+        path = os.path.join(folder, name)
+        if not cv2.imwrite(path, img, [cv2.IMWRITE_PNG_COMPRESSION, png_compression]):
+            raise IOError(f"No se pudo escribir {path}")
+        paths.append(path)
+    return paths
+
+
+def reprocess_outputs(root, mode, png_name="rgb.png", workers=None, hdf5_name="0.hdf5"):
+    """Re-apply a colour mode to every rendered frame under root, in parallel, without re-rendering"""
+    files = find_hdf5(root, hdf5_name)
+    start = time.perf_counter()
+    written = errors = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(path, pool.submit(reprocess_file, path, mode, png_name)) for path in files]
+        for path, future in futures:
+            try:
+                written += len(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"❌ {path}: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(files)} HDF5 → {written} PNG ({mode}) en {elapsed:.2f}s, errores: {errors}")
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-aplica un modo de color a las salidas HDF5 ya renderizadas")
+    parser.add_argument("root", nargs="?", default="output_scenes")
+    parser.add_argument("--mode", choices=list(COLOR_MODES), default="raw")
+    parser.add_argument("--png-name", default="rgb.png", help="nombre del PNG escrito junto a cada HDF5")
+    parser.add_argument("--hdf5-name", default="0.hdf5")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python color_stage.py output_scenes --mode gamma22 --png-name rgb_gamma.png -j 8
+
+if __name__ == "__main__":
+    args = parse_args()
+    reprocess_outputs(args.root, args.mode, args.png_name, args.workers, args.hdf5_name)
@@ -0,0 +1,288 @@
+import os
+import argparse
+from itertools import combinations
+
+import cv2
+import numpy as np
+
+# Side of the grayscale thumbnail both hashes are computed from
+HASH_THUMB = 32
+
+# pHash keeps the lowest HASH_SIDE x HASH_SIDE DCT coefficients, dHash compares
+# HASH_SIDE x (HASH_SIDE + 1) cells: 64-bit hashes either way
+HASH_SIDE = 8
+HASH_BITS = HASH_SIDE * HASH_SIDE
+
+HASHES = ["phash", "dhash"]
+
+# Hamming distance (bits of pHash) up to which two photos count as the same shot
+DUPLICATE_DISTANCE = 8
+
+# Substrings of the hash indexed by HammingIndex (16 bits each)
+INDEX_CHUNKS = 4
+
+# Columns added to the metrics file by add_duplicate_columns
+DUPLICATE_COLUMNS = ["dup_cluster", "dup_size", "dup_keep"]
+
+
+# === Perceptual hashes ===
+
+def hash_thumbnail(gray):
+    """HASH_THUMB x HASH_THUMB float32 thumbnail of a grayscale image (area average)"""
+    return cv2.resize(gray, (HASH_THUMB, HASH_THUMB), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II matrix: dct(x) = D @ x"""
+    k, i = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    d = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    d[0] /= np.sqrt(2.0)
+    return d.astype(np.float32)
+
+
+def _area_matrix(n_in, n_out):
+    """(n_out, n_in) weights of an area-average resize along one axis"""
+    edges = np.linspace(0, n_in, n_out + 1)
+    lo, hi = edges[:-1, None], edges[1:, None]
+    pixel = np.arange(n_in)[None, :]
+    overlap = np.clip(np.minimum(hi, pixel + 1) - np.maximum(lo, pixel), 0, None)
+    return (overlap / overlap.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+_DCT = _dct_matrix(HASH_THUMB)[:HASH_SIDE]
+_ROWS = _area_matrix(HASH_THUMB, HASH_SIDE)
+_COLS = _area_matrix(HASH_THUMB, HASH_SIDE + 1)
+
+
+def _pack(bits):
+    """(N, 64) booleans → (N,) uint64, first bit most significant"""
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def phash_batch(thumbs):
+    """DCT perceptual hash of a (N, HASH_THUMB, HASH_THUMB) stack: low frequencies above their median"""
+    coeffs = (_DCT @ np.asarray(thumbs, dtype=np.float32) @ _DCT.T).reshape(len(thumbs), -1)
+    # The DC term only carries the mean brightness
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)
+    return _pack(coeffs > median)
+
+
+def dhash_batch(thumbs):
+    """Difference hash of a thumbnail stack: is each cell brighter than its left neighbour"""
+    cells = _ROWS @ np.asarray(thumbs, dtype=np.float32) @ _COLS.T
+    return _pack((cells[:, :, 1:] > cells[:, :, :-1]).reshape(len(thumbs), -1))
+
+
+def hash_hex(values):
+    return [f"{int(v):016x}" for v in values]
+
+
+def parse_hashes(column):
+    """Hex strings (as stored in the metrics file) → (uint64 hashes, valid mask)"""
+    valid = np.array([isinstance(v, str) and len(v) == HASH_BITS // 4 for v in column], dtype=bool)
+    hashes = np.zeros(len(valid), dtype=np.uint64)
+    hashes[valid] = np.array([int(v, 16) for v, ok in zip(column, valid) if ok], dtype=np.uint64)
+    return hashes, valid
+
+
+def popcount(values):
+    """Set bits of each uint64 (np.bitwise_count on NumPy >= 2)"""
+    values = np.asarray(values, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    return np.unpackbits(values[..., None].view(np.uint8), axis=-1).sum(axis=-1).astype(np.int64)
+
+
+# === Hamming index ===
+
+class HammingIndex:
+    """Multi-index hashing: every pair of hashes within a Hamming radius without comparing all pairs.
+
+    The 64 bits are cut into INDEX_CHUNKS substrings. Two hashes at most r
+    bits apart differ in at most r // chunks bits in one of the substrings
+    (pigeonhole), so candidates are the hashes whose substring is one of
+    those few flips away; a table per substring finds them in O(1) and
+    only the candidates are checked on the full hash.
+    """
+
+    def __init__(self, hashes, chunks=INDEX_CHUNKS):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.chunks = chunks
+        self.bits = HASH_BITS // chunks
+        size = 1 << self.bits
+        self._subs, self._orders, self._starts, self._counts = [], [], [], []
+        for k in range(chunks):
+            sub = ((self.hashes >> np.uint64(k * self.bits)) & np.uint64(size - 1)).astype(np.int64)
+            counts = np.bincount(sub, minlength=size)
+            self._subs.append(sub)
+            self._orders.append(np.argsort(sub, kind="stable"))
+            self._starts.append(np.cumsum(counts) - counts)
+            self._counts.append(counts)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _flips(self, radius):
+        """Every substring XOR pattern with at most `radius` bits set"""
+        flips = [0]
+        for r in range(1, radius + 1):
+            flips.extend(sum(1 << b for b in bits) for bits in combinations(range(self.bits), r))
+        return np.array(flips, dtype=np.int64)
+
+    def _candidates(self, k, sub, flip):
+        """(query position, index position) of hashes whose substring k equals sub ^ flip"""
+        target = sub ^ flip
+        counts = self._counts[k][target]
+        total = int(counts.sum())
+        if total == 0:
+            return None
+        offsets = np.cumsum(counts) - counts
+        q = np.repeat(np.arange(len(sub)), counts)
+        pos = np.repeat(self._starts[k][target], counts) + np.arange(total) - np.repeat(offsets, counts)
+        return q, self._orders[k][pos]
+
+    def pairs(self, radius=DUPLICATE_DISTANCE):
+        """(i, j, distance) arrays of every pair i < j at most `radius` bits apart"""
+        found_i, found_j = [], []
+        flips = self._flips(radius // self.chunks)
+        for k in range(self.chunks):
+            for flip in flips:
+                hit = self._candidates(k, self._subs[k], flip)
+                if hit is None:
+                    continue
+                i, j = hit
+                keep = i < j
+                i, j = i[keep], j[keep]
+                keep = popcount(self.hashes[i] ^ self.hashes[j]) <= radius
+                found_i.append(i[keep])
+                found_j.append(j[keep])
+        if not found_i:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        # A pair close in several substrings is found once per substring
+        key = np.unique(np.concatenate(found_i) * len(self) + np.concatenate(found_j))
+        i, j = key // len(self), key % len(self)
+        return i, j, popcount(self.hashes[i] ^ self.hashes[j])
+
+    def query(self, value, radius=DUPLICATE_DISTANCE):
+        """Indices of the hashes at most `radius` bits from value"""
+        value = np.uint64(value)
+        found = []
+        for k in range(self.chunks):
+            sub = np.array([(int(value) >> (k * self.bits)) & ((1 << self.bits) - 1)], dtype=np.int64)
+            for flip in self._flips(radius // self.chunks):
+                hit = self._candidates(k, sub, flip)
+                if hit is not None:
+                    found.append(hit[1])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        idx = np.unique(np.concatenate(found))
+        return idx[popcount(self.hashes[idx] ^ value) <= radius]
+
+
+# === Clusters ===
+
+def connected_components(n, i, j):
+    """Component label (smallest member index) of each of n nodes joined by the edges (i, j)"""
+    labels = np.arange(n)
+    while True:
+        low = np.minimum(labels[i], labels[j])
+        new = labels.copy()
+        np.minimum.at(new, i, low)
+        np.minimum.at(new, j, low)
+        # Pointer jumping: follow labels of labels until they settle
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def find_duplicates(df, radius=DUPLICATE_DISTANCE, hash_column="phash", chunks=INDEX_CHUNKS):
+    """Duplicate clusters of a metrics DataFrame; returns a DataFrame with DUPLICATE_COLUMNS.
+
+    dup_cluster numbers the clusters of near-identical photos (-1: no
+    duplicate), dup_size is the size of the cluster and dup_keep marks the
+    photo kept from each cluster (the sharpest, by laplacian_variance) and
+    every photo without duplicates. Rows without a hash are kept alone.
+    """
+    import pandas as pd
+
+    hashes, valid = parse_hashes(df[hash_column].tolist())
+    rows = np.flatnonzero(valid)
+    i, j, _ = HammingIndex(hashes[rows], chunks).pairs(radius)
+    labels = np.arange(len(df))
+    labels[rows] = rows[connected_components(len(rows), i, j)]
+
+    _, cluster, size = np.unique(labels, return_inverse=True, return_counts=True)
+    size = size[cluster]
+    in_cluster = size > 1
+    # Clusters numbered 0, 1, ... in order of their first photo
+    _, dup_cluster = np.unique(labels[in_cluster], return_inverse=True)
+    out = pd.DataFrame({"dup_cluster": -1, "dup_size": size, "dup_keep": True}, index=df.index)
+    out.loc[in_cluster, "dup_cluster"] = dup_cluster
+    if in_cluster.any():
+        sharpness = df.get("laplacian_variance", pd.Series(0.0, index=df.index)).fillna(-np.inf).to_numpy()
+        ranked = pd.DataFrame({"label": labels, "sharpness": sharpness})[in_cluster]
+        best = ranked.sort_values("sharpness", ascending=False, kind="stable").groupby("label").head(1).index
+        keep = np.zeros(len(df), dtype=bool)
+        keep[best] = True
+        out["dup_keep"] = ~in_cluster | keep
+    return out
+
+
+def add_duplicate_columns(df, radius=DUPLICATE_DISTANCE, hash_column="phash"):
+    """df with the DUPLICATE_COLUMNS (replaced if already there)"""
+    return df.drop(columns=[c for c in DUPLICATE_COLUMNS if c in df]).join(
+        find_duplicates(df.reset_index(drop=True), radius, hash_column).set_index(df.index))
+
+
+def write_keep_manifest(df, path):
+    """Manifest of the photos to keep (one per duplicate cluster plus every unique photo)"""
+    kept = df.loc[df["dup_keep"], ["filename", "path", "dup_cluster", "dup_size"]]
+    if path.lower().endswith(".jsonl"):
+        kept.to_json(path, orient="records", lines=True, force_ascii=False)
+    else:
+        kept.to_csv(path, index=False)
+    return len(kept)
+
+
+def summary(df):
+    clustered = df["dup_cluster"] >= 0
+    n_clusters = df.loc[clustered, "dup_cluster"].nunique()
+    return (f"Duplicados: {n_clusters} grupos con {int(clustered.sum())} fotos; "
+            f"se conservan {int(df['dup_keep'].sum())} de {len(df)}")
+
+
+def dedup_metrics_file(metrics_path, radius=DUPLICATE_DISTANCE, hash_column="phash", keep_manifest=None):
+    """Add the duplicate clusters to a metrics CSV/Parquet in place (through a temp file)"""
+    from image_metrics import read_metrics
+
+    df = add_duplicate_columns(read_metrics(metrics_path), radius, hash_column)
+    tmp_path = metrics_path + ".tmp"
+    if metrics_path.lower().endswith(".parquet"):
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, metrics_path)
+    print(summary(df))
+    if keep_manifest:
+        print(f"Manifiesto ({write_keep_manifest(df, keep_manifest)} fotos): {keep_manifest}")
+    return df
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Agrupa fotos casi idénticas (ráfagas) a partir de los hashes "
+                                                 "perceptuales del archivo de métricas")
+    parser.add_argument("metrics", help="CSV/Parquet de image_metrics.py (columnas phash/dhash)")
+    parser.add_argument("--radius", type=int, default=DUPLICATE_DISTANCE, help="distancia de Hamming máxima (bits)")
+    parser.add_argument("--hash", choices=HASHES, default="phash")
+    parser.add_argument("--keep-manifest", default=None, help=".csv o .jsonl con una foto por grupo")
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python dedup.py output_image_analysis_bimbo/image_metadata_analysis.csv --keep-manifest keep.csv
+
+if __name__ == "__main__":
+    args = parse_args()
+    dedup_metrics_file(args.metrics, args.radius, args.hash, args.keep_manifest)
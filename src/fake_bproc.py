@@ -0,0 +1,224 @@
+"""Minimal stand-in for the parts of the BlenderProc API used by the generators.
+
+Lets scene logic (pooling, placement, render plans, ...) run and be timed
+without Blender: `bproc = FakeBproc()` then pass it where `blenderproc` is expected.
+"""
+from types import SimpleNamespace
+from collections import defaultdict
+import numpy as np
+
+from mesh_store import load_mesh
+from visibility import default_intrinsics
+
+
+class FakeNode:
+    def __init__(self, node_type):
+        self.type = node_type
+        self.inputs = defaultdict(SimpleNamespace)
+        self.outputs = defaultdict(SimpleNamespace)
+
+
+class FakeMaterial:
+    def __init__(self, name):
+        self.name = name
+        self.values = {}
+        self.nodes = [FakeNode("BsdfPrincipled"), FakeNode("OutputMaterial")]
+        self.links = []
+
+    def set_principled_shader_value(self, key, value):
+        self.values[key] = value
+
+    def new_node(self, node_type):
+        node = FakeNode(node_type)
+        self.nodes.append(node)
+        return node
+
+    def get_the_one_node_with_type(self, node_type):
+        return next(n for n in self.nodes if node_type in n.type)
+
+    def link(self, source_socket, dest_socket):
+        self.links.append((source_socket, dest_socket))
+
+
+class FakeEntity:
+    def __init__(self, scene, name, mesh=None):
+        self.scene = scene
+        self.name = name
+        self.mesh = mesh            # shared between linked duplicates
+        self.location = np.zeros(3)
+        self.rotation = np.zeros(3)
+        self.scale = np.ones(3)
+        self.hidden = False
+        self.cps = {}
+        self.materials = []
+        scene.entities.append(self)
+
+    def set_location(self, location):
+        self.location = np.array(location, dtype=float)
+
+    def get_location(self):
+        return self.location.copy()
+
+    def set_rotation_euler(self, rotation):
+        self.rotation = np.array(rotation, dtype=float)
+
+    def get_rotation_euler(self):
+        return self.rotation.copy()
+
+    def set_scale(self, scale):
+        self.scale = np.array(scale, dtype=float)
+
+    def get_scale(self):
+        return self.scale.copy()
+
+    def hide(self, hide_object=True):
+        self.hidden = hide_object
+
+    def is_hidden(self):
+        return self.hidden
+
+    def set_cp(self, key, value, frame=None):
+        self.cps[key] = value
+
+    def get_cp(self, key, frame=None):
+        return self.cps[key]
+
+    def get_materials(self):
+        return list(self.materials)
+
+    def set_material(self, index, material):
+        self.materials[index] = material
+
+    def add_material(self, material):
+        self.materials.append(material)
+
+    def new_material(self, name):
+        material = FakeMaterial(name)
+        self.materials.append(material)
+        return material
+
+    def clear_materials(self):
+        self.materials = []
+
+    def duplicate(self, duplicate_children=True, linked=False):
+        mesh = self.mesh if linked else (None if self.mesh is None else dict(self.mesh))
+        dup = FakeEntity(self.scene, self.name + ".001", mesh)
+        dup.location, dup.rotation, dup.scale = self.location.copy(), self.rotation.copy(), self.scale.copy()
+        dup.hidden, dup.cps, dup.materials = self.hidden, dict(self.cps), list(self.materials)
+        self.scene.stats["duplicates"] += 1
+        return dup
+
+    def delete(self, remove_all_offspring=False):
+        if self in self.scene.entities:
+            self.scene.entities.remove(self)
+
+
+class FakeLight(FakeEntity):
+    def __init__(self, scene, light_type="POINT", name="light"):
+        super().__init__(scene, name)
+        self.type = light_type
+        self.energy = 10.0
+        self.color = [1, 1, 1]
+
+    def set_type(self, light_type):
+        self.type = light_type
+
+    def set_energy(self, energy):
+        self.energy = energy
+
+    def set_color(self, color):
+        self.color = color
+
+
+class FakeBproc:
+    """Namespace mimicking `import blenderproc as bproc`"""
+
+    def __init__(self):
+        self.entities = []
+        self.camera_poses = []
+        self.render_settings = {}
+        self.stats = {"load_obj": 0, "duplicates": 0, "clean_up": 0, "render": 0}
+
+        self.loader = SimpleNamespace(load_obj=self._load_obj)
+        self.object = SimpleNamespace(create_primitive=self._create_primitive)
+        self.material = SimpleNamespace(create=FakeMaterial)
+        self.types = SimpleNamespace(Light=lambda light_type="POINT", name="light": FakeLight(self, light_type, name))
+        self.utility = SimpleNamespace(reset_keyframes=self._reset_keyframes)
+        self.camera = SimpleNamespace(add_camera_pose=self._add_camera_pose,
+                                      rotation_from_forward_vec=_rotation_from_forward_vec,
+                                      get_intrinsics_as_K_matrix=lambda: default_intrinsics(self.resolution),
+                                      set_resolution=self._set_resolution)
+        self.renderer = SimpleNamespace(
+            set_output_format=lambda *a, **k: self._setting("output_format", a, k),
+            enable_segmentation_output=lambda *a, **k: self._setting("segmentation", a, k),
+            set_max_amount_of_samples=lambda *a, **k: self._setting("samples", a, k),
+            set_light_bounces=lambda *a, **k: self._setting("light_bounces", a, k),
+            set_noise_threshold=lambda *a, **k: self._setting("noise_threshold", a, k),
+            set_denoiser=lambda *a, **k: self._setting("denoiser", a, k),
+            render=self._render,
+        )
+        self.resolution = (512, 512)   # (width, height)
+
+    def init(self):
+        pass
+
+    def clean_up(self, clean_up_camera=False):
+        self.entities = []
+        self.camera_poses = []
+        self.stats["clean_up"] += 1
+
+    def _load_obj(self, path, **kwargs):
+        # Same mesh cache as load_objects in Blender: only the first load of a file pays the parse
+        mesh = load_mesh(path)
+        self.stats["load_obj"] += 1
+        return [FakeEntity(self, path, {"vertices": mesh.vertices, "faces": mesh.faces})]
+
+    def _create_primitive(self, shape, **kwargs):
+        entity = FakeEntity(self, shape)
+        if "scale" in kwargs:
+            entity.set_scale(kwargs["scale"])
+        return entity
+
+    def _reset_keyframes(self):
+        self.camera_poses = []
+
+    def _add_camera_pose(self, cam2world_matrix, frame=None):
+        self.camera_poses.append(np.array(cam2world_matrix, dtype=float))
+        return len(self.camera_poses) - 1
+
+    def _render(self):
+        """One frame per registered camera pose; each visible object is drawn as a square"""
+        self.stats["render"] += 1
+        w, h = self.resolution
+        n = max(len(self.camera_poses), 1)
+        seg = np.zeros((h, w), dtype=np.int64)
+        visible = [e for e in self.entities if e.mesh is not None and not e.hidden]
+        for inst, entity in enumerate(visible, start=1):
+            cx = int((entity.location[0] + 3) / 6 * w) % w
+            cy = int((entity.location[1] + 3) / 6 * h) % h
+            seg[max(cy - 20, 0):cy + 20, max(cx - 20, 0):cx + 20] = inst
+        colors = np.stack([seg * 40 % 256] * 3, axis=-1).astype(np.uint8)
+        return {
+            "colors": [colors.copy() for _ in range(n)],
+            "instance_segmaps": [seg.copy() for _ in range(n)],
+            "instance_attribute_maps": [[] for _ in range(n)],
+        }
+
+    def _set_resolution(self, image_width=None, image_height=None):
+        self.resolution = (image_width, image_height)
+
+    def _setting(self, name, args, kwargs):
+        self.render_settings[name] = (args, kwargs)
+
+
+def _rotation_from_forward_vec(forward_vec, up_axis="Y", inplane_rot=None):
+    """Same convention as bproc.camera.rotation_from_forward_vec (camera looks down -Z, up is +Y)"""
+    forward = np.asarray(forward_vec, dtype=float)
+    forward = forward / np.linalg.norm(forward)
+    up = np.array([0.0, 0.0, 1.0])
+    right = np.cross(forward, up)
+    if np.linalg.norm(right) < 1e-8:
+        right = np.array([1.0, 0.0, 0.0])
+    right /= np.linalg.norm(right)
+    true_up = np.cross(right, forward)
+    return np.stack([right, true_up, -forward], axis=1)
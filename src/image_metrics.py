@@ -0,0 +1,461 @@
+import os
+import io
+import csv
+import time
+import random
+import argparse
+from glob import glob
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import cv2
+import numpy as np
+
+from dedup import hash_thumbnail, phash_batch, dhash_batch, hash_hex, DUPLICATE_DISTANCE
+
+# Same columns (and order) as the DataFrame built by analyze_images in EDA.ipynb,
+# plus the perceptual hashes (16 hex digits) dedup.py groups near-duplicates by
+# and the JPEG scale (1, 2, 4, 8) the pixel metrics were computed at
+COLUMNS = ["filename", "path", "width", "height", "channels", "mode", "aspect_ratio", "file_size_kb",
+           "brightness", "contrast", "laplacian_variance", "shannon_entropy", "phash", "dhash", "decode_scale"]
+
+IMAGE_EXTENSIONS = ["*.jpg", "*.jpeg", "*.png", "*.bmp", "*.gif"]
+
+# Quality thresholds of the EDA notebook
+BLUR_THRESHOLD_LAPLACIAN = 100.0
+DARK_THRESHOLD_BRIGHTNESS = 70.0
+BRIGHT_THRESHOLD_BRIGHTNESS = 185.0
+LOW_ENTROPY_THRESHOLD = 4.0
+
+# Approximate mode: JPEGs decoded by libjpeg at 1/2, 1/4 or 1/8 scale, straight to grayscale
+REDUCED_FLAGS = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+# Smallest side left after reducing; smaller photos use the next lower scale
+MIN_REDUCED_SIDE = 256
+# Downscaling averages sensor noise and fine texture away but packs edges into fewer
+# pixels, so the Laplacian variance of a reduced decode is larger than at full
+# resolution. The blur threshold at scale s is BLUR_THRESHOLD_LAPLACIAN * BLUR_SCALE[s].
+# PROVISIONAL: fitted with calibrate_blur_scale on the synthetic photos of
+# bench_eda_reduced.py and only checked on more photos of the same generator, never on
+# real shelf photos. Refit on a sample of real photos (image_metrics.py --reduce S
+# --agreement N prints the fitted factor) before trusting the blurred flag of --reduce.
+BLUR_SCALE = {1: 1.0, 2: 2.5, 4: 8.0, 8: 16.0}
+
+
+def get_image_paths(image_dir, extensions=IMAGE_EXTENSIONS):
+    image_paths = []
+    for ext in extensions:
+        image_paths.extend(glob(os.path.join(image_dir, ext)))
+    print(f"Se encontraron {len(image_paths)} imágenes en '{image_dir}'.")
+    if not image_paths:
+        print("ADVERTENCIA: No se encontraron imágenes. Verifica la ruta y las extensiones.")
+    return image_paths
+
+
+# === Metrics ===
+
+def to_gray(image):
+    """Single grayscale buffer shared by every metric; None for unsupported layouts"""
+    if image is None:
+        return None
+    if image.ndim == 2:
+        return image
+    if image.ndim == 3 and image.shape[2] == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    try:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    except cv2.error:
+        return None
+
+
+def shannon_entropy(gray):
+    """Base-2 entropy of the pixel values (same result as skimage.measure.shannon_entropy)"""
+    if gray.dtype in (np.uint8, np.uint16):
+        counts = np.bincount(gray.ravel(), minlength=256 if gray.dtype == np.uint8 else 0)
+        counts = counts[counts > 0]
+    else:
+        _, counts = np.unique(gray, return_counts=True)
+    p = counts / gray.size
+    return float(-np.sum(p * np.log2(p)))
+
+
+def gray_metrics(gray):
+    """brightness, contrast, laplacian_variance and shannon_entropy of one grayscale image"""
+    if gray is None or gray.size == 0:
+        return {"brightness": None, "contrast": None, "laplacian_variance": None, "shannon_entropy": None}
+    mean, std = cv2.meanStdDev(gray)
+    _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_64F))
+    return {
+        "brightness": float(mean[0, 0]),
+        "contrast": float(std[0, 0]),
+        "laplacian_variance": float(lap_std[0, 0]) ** 2,
+        "shannon_entropy": shannon_entropy(gray),
+    }
+
+
+def add_hashes(rows):
+    """Fill phash/dhash of rows from the thumbnails analyze_image left in them, one batch for all"""
+    with_thumb = [row for row in rows if row.get("thumbnail") is not None]
+    if with_thumb:
+        thumbs = np.stack([row["thumbnail"] for row in with_thumb])
+        for row, phash, dhash in zip(with_thumb, hash_hex(phash_batch(thumbs)), hash_hex(dhash_batch(thumbs))):
+            row["phash"], row["dhash"] = phash, dhash
+    for row in rows:
+        row.pop("thumbnail", None)
+    return rows
+
+
+def decode_scale(width, height, reduce):
+    """Largest JPEG scale up to `reduce` that keeps MIN_REDUCED_SIDE pixels on the short side"""
+    for scale in sorted(REDUCED_FLAGS, reverse=True):
+        if scale <= reduce and min(width, height) // scale >= MIN_REDUCED_SIDE:
+            return scale
+    return 1
+
+
+def analyze_image(img_path, reduce=1):
+    """Metrics of one image: one disk read, one decode.
+
+    Size and mode come from the PIL header parsed from the same bytes
+    (PIL only decodes lazily), pixels from a single cv2.imdecode. The
+    grayscale thumbnail of the perceptual hashes is left in
+    row["thumbnail"]; add_hashes turns a chunk of them into hashes.
+
+    reduce=2/4/8 is the approximate mode: JPEGs are decoded at that scale
+    (see decode_scale) straight to grayscale, other formats at full size.
+    The scale used is row["decode_scale"]; flag_images rescales the blur
+    threshold with it (by BLUR_SCALE, still provisional: see its comment).
+    """
+    from PIL import Image
+
+    with open(img_path, "rb") as f:
+        data = f.read()
+    with Image.open(io.BytesIO(data)) as img_pil:
+        width, height = img_pil.size
+        mode = img_pil.mode
+        channels = len(img_pil.getbands())
+        scale = decode_scale(width, height, reduce) if img_pil.format == "JPEG" else 1
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if scale > 1:
+        # Reduced decodes apply EXIF orientation by default; the full one does not
+        gray = cv2.imdecode(buffer, REDUCED_FLAGS[scale] | cv2.IMREAD_IGNORE_ORIENTATION)
+    else:
+        gray = to_gray(cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED))
+    row = {"filename": os.path.basename(img_path), "path": img_path, "width": width, "height": height,
+           "channels": channels, "mode": mode, "aspect_ratio": width / height if height > 0 else 0,
+           "file_size_kb": len(data) / 1024}
+    row.update(gray_metrics(gray))
+    row.update(phash=None, dhash=None, thumbnail=hash_thumbnail(gray) if gray is not None and gray.size else None,
+               decode_scale=scale)
+    return row
+
+
+def analyze_chunk(paths, reduce=1):
+    """Worker job: (rows, errors) of a list of paths; errors are (path, message)"""
+    rows, errors = [], []
+    for path in paths:
+        try:
+            rows.append(analyze_image(path, reduce))
+        except Exception as e:
+            errors.append((path, str(e)))
+    return add_hashes(rows), errors
+
+
+def iter_metrics(image_paths, workers=None, chunk_size=32, max_pending=None, job=analyze_chunk):
+    """Yield (rows, errors) per chunk as workers finish, with a bounded number of chunks in flight.
+
+    workers=0 runs in this process (handy in notebooks or for debugging).
+    job(paths) -> (rows, errors) must be importable by the worker processes.
+    """
+    chunks = (image_paths[i:i + chunk_size] for i in range(0, len(image_paths), chunk_size))
+    if workers == 0:
+        for chunk in chunks:
+            yield job(chunk)
+        return
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(job, chunk))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def flag_images(df, blur_threshold=BLUR_THRESHOLD_LAPLACIAN, dark_threshold=DARK_THRESHOLD_BRIGHTNESS,
+                bright_threshold=BRIGHT_THRESHOLD_BRIGHTNESS, low_entropy_threshold=LOW_ENTROPY_THRESHOLD,
+                blur_scale=BLUR_SCALE):
+    """Boolean quality flags per row, computed from the metric columns only (no image I/O).
+
+    Same rules as save_categorized_images: missing metrics go to other_issues,
+    an image is good when no other flag is set. Rows analyzed in approximate
+    mode are compared against blur_threshold * blur_scale[decode_scale].
+    """
+    import pandas as pd
+
+    lap, bright, entropy = df["laplacian_variance"], df["brightness"], df["shannon_entropy"]
+    if "decode_scale" in df:
+        scale = df["decode_scale"].fillna(1).astype(int).map(blur_scale)
+    else:
+        scale = 1.0
+    flags = pd.DataFrame({
+        "other_issues": lap.isna() | bright.isna() | entropy.isna(),
+        "blurred": lap < blur_threshold * scale,
+        "dark": bright < dark_threshold,
+        "bright": bright > bright_threshold,
+        "low_entropy": entropy < low_entropy_threshold,
+    }, index=df.index)
+    flags.insert(0, "good", ~flags.any(axis=1))
+    return flags
+
+
+def calibrate_blur_scale(full_lap, reduced_lap, blur_threshold=BLUR_THRESHOLD_LAPLACIAN):
+    """Factor k for which reduced_lap < k * blur_threshold best matches full_lap < blur_threshold.
+
+    full_lap and reduced_lap are the Laplacian variances of the same photos
+    at full resolution and at one reduced scale.
+    """
+    full, reduced = np.asarray(full_lap, dtype=float), np.asarray(reduced_lap, dtype=float)
+    valid = ~(np.isnan(full) | np.isnan(reduced))
+    order = np.argsort(reduced[valid])
+    values, blurred = reduced[valid][order], (full[valid] < blur_threshold)[order]
+    if not len(values):
+        return 1.0
+    # Cutting just above values[i] flags rows 0..i: sharp ones among them plus blurred ones above are wrong
+    wrong = np.cumsum(~blurred) + blurred.sum() - np.cumsum(blurred)
+    best = int(np.argmin(wrong))
+    if blurred.sum() <= wrong[best]:
+        return values[0] / blur_threshold       # flagging nothing does at least as well
+    cut = (values[best] + values[best + 1]) / 2 if best + 1 < len(values) else values[best] * 1.01
+    return float(cut / blur_threshold)
+
+
+def primary_category(flags):
+    """One category per row: the first flag set, in the order of flag_images, good last"""
+    categories = [c for c in flags.columns if c != "good"] + ["good"]
+    return flags[categories].idxmax(axis=1)
+
+
+def agreement_report(exact, approx, **thresholds):
+    """Agreement of the quality flags of two analyses of the same photos.
+
+    Returns (matrix, agreement): confusion matrix of the primary category
+    (rows exact, columns approximate) and, per flag, the fraction of photos
+    on which both analyses agree.
+    """
+    import pandas as pd
+
+    approx = approx.set_index("path").loc[exact["path"]].reset_index()
+    exact_flags, approx_flags = flag_images(exact, **thresholds), flag_images(approx, **thresholds)
+    matrix = pd.crosstab(primary_category(exact_flags).rename("completa"),
+                         primary_category(approx_flags).rename("reducida"))
+    agreement = (exact_flags.to_numpy() == approx_flags.to_numpy()).mean(axis=0)
+    return matrix, pd.Series(agreement, index=exact_flags.columns)
+
+
+# === Sinks ===
+
+class MetricsSink:
+    """Appends metric rows to a CSV or Parquet file in batches.
+
+    The format follows the extension (.parquet needs pyarrow). Memory is
+    bounded by batch_size, whatever the number of images.
+    """
+
+    def __init__(self, path, batch_size=1000, append=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.parquet = path.lower().endswith(".parquet")
+        self.rows = []
+        self.written = 0
+        self._writer = None
+        self._file = None
+        self._append = append
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.parquet:
+            self._write_parquet(self.rows)
+        else:
+            self._write_csv(self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+
+    def _write_csv(self, rows):
+        if self._file is None:
+            new_file = not (self._append and os.path.exists(self.path))
+            self._file = open(self.path, "w" if new_file else "a", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS, extrasaction="ignore")
+            if new_file:
+                self._writer.writeheader()
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _write_parquet(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._schema = pa.schema([
+                ("filename", pa.string()), ("path", pa.string()), ("width", pa.int64()),
+                ("height", pa.int64()), ("channels", pa.int64()), ("mode", pa.string()),
+                ("aspect_ratio", pa.float64()), ("file_size_kb", pa.float64()),
+                ("brightness", pa.float64()), ("contrast", pa.float64()),
+                ("laplacian_variance", pa.float64()), ("shannon_entropy", pa.float64()),
+                ("phash", pa.string()), ("dhash", pa.string()), ("decode_scale", pa.int64()),
+            ])
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        table = pa.Table.from_pydict({c: [r.get(c) for r in rows] for c in COLUMNS}, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self.flush()
+        if self.parquet and self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+        self._writer = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_metrics(path):
+    """Load a metrics file written by MetricsSink as a DataFrame"""
+    import pandas as pd
+    if path.lower().endswith(".parquet"):
+        return pd.read_parquet(path)
+    # Hashes stay hex strings (an all-digit one would otherwise be read as a number)
+    return pd.read_csv(path, dtype={"phash": str, "dhash": str})
+
+
+# === Driver ===
+
+def analyze_images(image_paths, num_to_process=None, output_path=None, workers=None, chunk_size=32,
+                   return_df=True, reduce=1):
+    """Drop-in replacement for analyze_images of EDA.ipynb.
+
+    With output_path the rows are streamed to a CSV/Parquet file as they
+    are computed; return_df=False then keeps nothing in memory and only
+    the file is produced (returns the number of rows written).
+    reduce=2/4/8 selects the approximate mode of analyze_image.
+    """
+    paths_to_analyze = list(image_paths)
+    if num_to_process and num_to_process < len(paths_to_analyze):
+        paths_to_analyze = random.sample(paths_to_analyze, num_to_process)
+        print(f"Analizando una muestra de {num_to_process} imágenes.")
+
+    start = time.perf_counter()
+    data = []
+    processed_count = error_count = 0
+    next_report = 100
+    sink = MetricsSink(output_path) if output_path else None
+    try:
+        job = partial(analyze_chunk, reduce=reduce) if reduce > 1 else analyze_chunk
+        for rows, errors in iter_metrics(paths_to_analyze, workers, chunk_size, job=job):
+            for path, message in errors:
+                print(f"ERROR procesando {path}: {message}")
+            error_count += len(errors)
+            processed_count += len(rows)
+            if sink is not None:
+                sink.write(rows)
+            if return_df:
+                data.extend(rows)
+            done = processed_count + error_count
+            if done >= next_report:
+                elapsed = time.perf_counter() - start
+                print(f"Procesando imagen {done}/{len(paths_to_analyze)}... ({done / elapsed:.1f} img/s)")
+                next_report = (done // 100 + 1) * 100
+    finally:
+        if sink is not None:
+            sink.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Análisis completado. Procesadas: {processed_count}. Errores: {error_count}. "
+          f"({elapsed:.1f}s, {processed_count / max(elapsed, 1e-9):.1f} img/s)")
+    if sink is not None:
+        print(f"Métricas guardadas en: {output_path}")
+    if not return_df:
+        return processed_count
+    import pandas as pd
+    return pd.DataFrame(data, columns=COLUMNS) if data else None
+
+
+def print_agreement(image_paths, reduce, sample=None, workers=None):
+    """Time and categories of the approximate mode against full resolution on a sample of photos"""
+    paths = list(image_paths)
+    if sample and sample < len(paths):
+        paths = random.sample(paths, sample)
+    start = time.perf_counter()
+    exact = analyze_images(paths, workers=workers)
+    t_exact = time.perf_counter() - start
+    approx = analyze_images(paths, workers=workers, reduce=reduce)
+    t_approx = time.perf_counter() - start - t_exact
+    if exact is None or approx is None:
+        return
+    matrix, agreement = agreement_report(exact, approx)
+    print(f"\nResolución completa {t_exact:.1f}s, reducida 1/{reduce} {t_approx:.1f}s (x{t_exact / t_approx:.1f})")
+    print("Categoría principal (filas: completa, columnas: reducida):")
+    print(matrix.to_string())
+    print("Coincidencia por categoría: " + ", ".join(f"{c} {v:.1%}" for c, v in agreement.items()))
+    approx = approx.set_index("path").loc[exact["path"]]
+    for scale in sorted(set(approx["decode_scale"].dropna().astype(int)) - {1}):
+        rows = (approx["decode_scale"] == scale).to_numpy()
+        fitted = calibrate_blur_scale(exact["laplacian_variance"][rows], approx["laplacian_variance"][rows])
+        print(f"BLUR_SCALE[{scale}] = {BLUR_SCALE[scale]:.2f}; ajustado a esta muestra: {fitted:.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Métricas de calidad (brillo, contraste, nitidez, entropía) por imagen")
+    parser.add_argument("image_dir")
+    parser.add_argument("-o", "--output", default="image_metadata_analysis.csv", help=".csv o .parquet")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="procesos en paralelo (por defecto: núcleos disponibles, 0: sin procesos)")
+    parser.add_argument("-n", "--num-images", type=int, default=None, help="analiza solo una muestra")
+    parser.add_argument("--chunk-size", type=int, default=32)
+    parser.add_argument("--reduce", type=int, choices=[1, *REDUCED_FLAGS], default=1,
+                        help="modo aproximado: decodifica los JPEG a 1/2, 1/4 o 1/8 de resolución "
+                             "(umbral de desenfoque provisional, verifícalo con --agreement)")
+    parser.add_argument("--agreement", type=int, default=None, metavar="N",
+                        help="solo compara las categorías de --reduce contra resolución completa en N imágenes")
+    parser.add_argument("--dedup", action="store_true",
+                        help="agrega al archivo los grupos de fotos casi idénticas (dedup.py)")
+    parser.add_argument("--radius", type=int, default=DUPLICATE_DISTANCE, help="bits de pHash para --dedup")
+    parser.add_argument("--keep-manifest", default=None, help="con --dedup: .csv/.jsonl con una foto por grupo")
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python image_metrics.py "Complete_Bimbo/Fotos Chambita 1364" -o metrics.parquet -j 8
+# python image_metrics.py "Complete_Bimbo/Fotos Chambita 1364" -o metrics.csv -j 8 --dedup --keep-manifest keep.csv
+# python image_metrics.py "Complete_Bimbo/Fotos Chambita 1364" -o metrics.csv -j 8 --reduce 4
+# python image_metrics.py "Complete_Bimbo/Fotos Chambita 1364" --reduce 4 --agreement 300
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.agreement:
+        print_agreement(get_image_paths(args.image_dir), args.reduce, args.agreement, args.workers)
+        raise SystemExit
+    if args.reduce > 1:
+        print(f"⚠️ BLUR_SCALE[{args.reduce}] es provisional (ajustado en fotos sintéticas); "
+              f"compruébalo con --agreement en una muestra de estas fotos")
+    analyze_images(get_image_paths(args.image_dir), args.num_images, args.output, args.workers,
+                   args.chunk_size, return_df=False, reduce=args.reduce)
+    if args.dedup:
+        from dedup import dedup_metrics_file
+        dedup_metrics_file(args.output, args.radius, keep_manifest=args.keep_manifest)
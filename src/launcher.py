@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import subprocess
+import numpy as np
+
+from render_plan import RENDER_PRESETS
+from telemetry import PROFILERS
+
+MANIFEST_NAME = "manifest.json"
+
+# Libraries that size their own thread pools from these variables
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS"]
+
+
+# === Seeds ===
+
+def scene_seed(master_seed, scene_idx):
+    """32-bit seed of one scene, derived from the master seed and the scene index only"""
+    return int(np.random.SeedSequence(master_seed, spawn_key=(scene_idx,)).generate_state(1)[0])
+
+
+def seed_scene(master_seed, scene_idx):
+    """Seed every RNG a scene uses so it can be regenerated bit-exactly on its own.
+
+    The generators and bproc.sampler draw from the global np.random state,
+    so that state is re-seeded at the start of every scene.
+    """
+    seed = scene_seed(master_seed, scene_idx)
+    np.random.seed(seed)
+    random.seed(seed)
+    try:
+        import bpy
+        bpy.context.scene.cycles.seed = seed % (2 ** 31)
+    except ImportError:
+        pass
+    return seed
+
+
+# === Scene lists ===
+
+def parse_scene_list(text):
+    """'0-9,20,30-31' → [0, 1, ..., 9, 20, 30, 31]"""
+    scenes = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            scenes.extend(range(int(start), int(end) + 1))
+        else:
+            scenes.append(int(part))
+    return scenes
+
+
+def format_scene_list(scenes):
+    """Inverse of parse_scene_list, collapsing consecutive runs"""
+    parts = []
+    scenes = sorted(scenes)
+    i = 0
+    while i < len(scenes):
+        j = i
+        while j + 1 < len(scenes) and scenes[j + 1] == scenes[j] + 1:
+            j += 1
+        parts.append(str(scenes[i]) if i == j else f"{scenes[i]}-{scenes[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+def split_shards(scenes, n_shards):
+    """Split scene indices into at most n_shards contiguous, evenly sized shards"""
+    n_shards = max(1, min(n_shards, len(scenes)))
+    return [chunk.tolist() for chunk in np.array_split(np.asarray(scenes, dtype=int), n_shards) if len(chunk)]
+
+
+# === Manifests ===
+
+def write_scene_manifest(scene_dir, scene_idx, seed, extra=None):
+    """Record every output file of a finished scene; written last, atomically"""
+    files = {}
+    for root, _, names in os.walk(scene_dir):
+        for name in names:
+            if name == MANIFEST_NAME or name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, scene_dir)] = os.path.getsize(path)
+    manifest = {"scene": scene_idx, "seed": seed, "files": files, "time": time.time()}
+    if extra:
+        manifest.update(extra)
+    tmp_path = os.path.join(scene_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(scene_dir, MANIFEST_NAME))
+    return manifest
+
+
+def scene_complete(scene_dir):
+    """True if the scene has a manifest and every file it lists is present with its size.
+
+    The manifest is written last, so one listing no files (every frame
+    culled, kept_frames 0) is a finished scene too.
+    """
+    path = os.path.join(scene_dir, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    for rel, size in manifest.get("files", {}).items():
+        full = os.path.join(scene_dir, rel)
+        if not os.path.exists(full) or os.path.getsize(full) != size:
+            return False
+    return True
+
+
+# === Generator side ===
+
+def generator_args(default_scenes="0-9", default_output="output_scenes", argv=None):
+    """Arguments shared by every generator script (unknown ones are ignored)"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", default=default_scenes, help="índices de escena, p.ej. 0-99,120")
+    parser.add_argument("--master-seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=0, help="hilos de render (0: todos)")
+    parser.add_argument("--output-dir", default=default_output)
+    parser.add_argument("--shard-id", type=int, default=None)
+    parser.add_argument("--preset", choices=list(RENDER_PRESETS), default=None,
+                        help="calidad/velocidad del render (por defecto: el del generador)")
+    parser.add_argument("--profile", choices=PROFILERS, default=None,
+                        help="perfil por escena en <output-dir>/profiles")
+    parser.add_argument("--plan", default=None,
+                        help="reproduce poses, cámaras y luces de un plan de scene_planner.py")
+    args, _ = parser.parse_known_args(argv)
+    args.scenes = parse_scene_list(args.scenes)
+    return args
+
+
+def apply_thread_budget(bproc, threads):
+    """Limit Blender and OpenCV to this worker's share of the cores"""
+    if not threads:
+        return
+    bproc.renderer.set_cpu_threads(threads)
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+
+
+# === Launcher ===
+
+def pending_scenes(scenes, output_dir, scene_dir_format):
+    return [s for s in scenes if not scene_complete(os.path.join(output_dir, scene_dir_format.format(s)))]
+
+
+def launch(script, scenes, output_dir, workers=None, threads_per_worker=None, master_seed=0,
+           scene_dir_format="scene_{:02d}", runner=None, extra_args=()):
+    """Run `script` in one process per shard and wait for all of them.
+
+    Scenes whose manifest is already complete are skipped, so re-running
+    the same command resumes a crashed job.
+    """
+    cores = os.cpu_count() or 1
+    workers = workers or cores
+    threads_per_worker = threads_per_worker or max(1, cores // workers)
+    runner = runner or [shutil.which("blenderproc") or "blenderproc", "run"]
+
+    todo = pending_scenes(scenes, output_dir, scene_dir_format)
+    print(f"Escenas: {len(scenes)}  completas: {len(scenes) - len(todo)}  pendientes: {len(todo)}")
+    if not todo:
+        return 0
+
+    log_dir = os.path.join(output_dir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    env = dict(os.environ)
+    for var in THREAD_ENV_VARS:
+        env[var] = str(threads_per_worker)
+
+    start = time.perf_counter()
+    procs = []
+    for shard_id, shard in enumerate(split_shards(todo, workers)):
+        cmd = runner + [script, "--scenes", format_scene_list(shard), "--master-seed", str(master_seed),
+                        "--threads", str(threads_per_worker), "--output-dir", output_dir,
+                        "--shard-id", str(shard_id)] + list(extra_args)
+        log = open(os.path.join(log_dir, f"shard_{shard_id:03d}.log"), "w")
+        procs.append((shard_id, shard, subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env), log))
+        print(f"  shard {shard_id}: {len(shard)} escenas ({format_scene_list(shard)})")
+
+    failed = 0
+    for shard_id, shard, proc, log in procs:
+        code = proc.wait()
+        log.close()
+        if code != 0:
+            failed += 1
+            print(f"❌ shard {shard_id} terminó con código {code} (ver logs/shard_{shard_id:03d}.log)")
+
+    elapsed = time.perf_counter() - start
+    done = len(todo) - len(pending_scenes(todo, output_dir, scene_dir_format))
+    print(f"{done}/{len(todo)} escenas en {elapsed:.1f}s ({done / max(elapsed, 1e-9):.2f} escenas/s)")
+    return failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera escenas en paralelo, un proceso por shard")
+    parser.add_argument("script", help="generador, p.ej. bproc_test.py")
+    parser.add_argument("--scenes", default="0-9")
+    parser.add_argument("--output-dir", default="output_scenes")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--master-seed", type=int, default=0)
+    parser.add_argument("--scene-dir-format", default="scene_{:02d}",
+                        help="nombre de carpeta por escena del generador")
+    parser.add_argument("--runner", default=None, help="comando que ejecuta el script (por defecto 'blenderproc run')")
+    return parser.parse_known_args(argv)
+
+
+# === USO ===
+# python launcher.py bproc_test.py --scenes 0-9999 -j 8 --master-seed 42
+# python launcher.py bproc_test.py --scenes 0-9999 -j 8 --plan plan.npz     (plan de scene_planner.py)
+
+if __name__ == "__main__":
+    args, extra = parse_args()
+    runner = args.runner.split() if args.runner else None
+    failed = launch(args.script, parse_scene_list(args.scenes), args.output_dir, args.workers,
+                    args.threads_per_worker, args.master_seed, args.scene_dir_format, runner, extra)
+    sys.exit(1 if failed else 0)
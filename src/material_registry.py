@@ -0,0 +1,137 @@
+import numpy as np
+
+# Roughness values materials are snapped to, so random roughness gives few distinct materials
+ROUGHNESS_BUCKETS = (0.2, 0.35, 0.5, 0.65, 0.8)
+
+# Vertex colour layer written by bproc's PLY loader
+VERTEX_COLOR_LAYER = "Col"
+
+# bpy.data collections counted by collect_garbage (orphans_purge covers every type)
+GC_COLLECTIONS = ("meshes", "materials", "images", "textures", "node_groups")
+
+
+def roughness_bucket(value, buckets=ROUGHNESS_BUCKETS):
+    """Bucket closest to value"""
+    buckets = np.asarray(buckets, dtype=float)
+    return float(buckets[np.abs(buckets - value).argmin()])
+
+
+def build_vertex_color_material(bproc, name, roughness=None, metallic=None, sku=None):
+    """Principled BSDF whose base colour comes from the mesh vertex colours.
+
+    sku only names the variant; it lets a SKU get its own datablock.
+    """
+    mat = bproc.material.create(name)
+    bsdf = mat.get_the_one_node_with_type("BsdfPrincipled")
+    vc_node = mat.new_node("ShaderNodeVertexColor")
+    vc_node.layer_name = VERTEX_COLOR_LAYER
+    mat.link(vc_node.outputs["Color"], bsdf.inputs["Base Color"])
+    if roughness is not None:
+        mat.set_principled_shader_value("Roughness", roughness)
+    if metallic is not None:
+        mat.set_principled_shader_value("Metallic", metallic)
+    return mat
+
+
+def build_flat_material(bproc, name, base_color=(1.0, 1.0, 1.0, 1.0), roughness=None, metallic=None):
+    """Principled BSDF with a single base colour"""
+    mat = bproc.material.create(name)
+    mat.set_principled_shader_value("Base Color", list(base_color))
+    if roughness is not None:
+        mat.set_principled_shader_value("Roughness", roughness)
+    if metallic is not None:
+        mat.set_principled_shader_value("Metallic", metallic)
+    return mat
+
+
+def _alive(material):
+    """False once Blender has freed the datablock (e.g. by bproc.clean_up)"""
+    blender_obj = getattr(material, "blender_obj", None)
+    if blender_obj is None:
+        return True
+    try:
+        blender_obj.name
+        return True
+    except ReferenceError:
+        return False
+
+
+def collect_garbage():
+    """Remove datablocks nothing uses any more (meshes, materials, images, ... of deleted objects).
+
+    Returns how many were removed; 0 outside Blender.
+    """
+    try:
+        import bpy
+    except ImportError:
+        return 0
+    collections = [getattr(bpy.data, name) for name in GC_COLLECTIONS]
+    before = sum(len(c) for c in collections)
+    if hasattr(bpy.data, "orphans_purge"):
+        bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+    else:
+        for collection in collections:
+            for block in [b for b in collection if b.users == 0]:
+                collection.remove(block)
+    return before - sum(len(c) for c in collections)
+
+
+class MaterialRegistry:
+    """Builds each distinct material once per process and hands out the same datablock afterwards.
+
+    A material is identified by its kind and parameters, e.g.
+    get("vertex_color", roughness=0.35) or get("vertex_color", sku="takis").
+    Cached materials get a fake user so collect_garbage() never frees them;
+    if something else does (bproc.clean_up), the next get() rebuilds them.
+    """
+
+    def __init__(self, bproc):
+        self.bproc = bproc
+        self.builders = {"vertex_color": build_vertex_color_material, "flat": build_flat_material}
+        self._materials = {}
+        self.hits = 0
+        self.builds = 0
+        self.collected = 0
+
+    def register(self, kind, builder):
+        """builder(bproc, name, **params) → material"""
+        self.builders[kind] = builder
+
+    def get(self, kind, **params):
+        key = (kind, tuple(sorted(params.items())))
+        material = self._materials.get(key)
+        if material is not None and _alive(material):
+            self.hits += 1
+            return material
+        name = kind if not params else f"{kind}[{','.join(f'{k}={v}' for k, v in key[1])}]"
+        material = self.builders[kind](self.bproc, name, **params)
+        blender_obj = getattr(material, "blender_obj", None)
+        if blender_obj is not None:
+            blender_obj.use_fake_user = True
+        self._materials[key] = material
+        self.builds += 1
+        return material
+
+    def vertex_color(self, roughness=None, metallic=None, sku=None):
+        """Vertex-colour material (pass random roughness through roughness_bucket first)"""
+        params = {}
+        if roughness is not None:
+            params["roughness"] = float(roughness)
+        if metallic is not None:
+            params["metallic"] = metallic
+        if sku is not None:
+            params["sku"] = sku
+        return self.get("vertex_color", **params)
+
+    def collect_garbage(self):
+        """Free datablocks leaked by the previous scene; call on scene reset"""
+        removed = collect_garbage()
+        self.collected += removed
+        return removed
+
+    def __len__(self):
+        return len(self._materials)
+
+    def summary(self):
+        return (f"Materiales: {len(self)} distintos, {self.builds} construidos, {self.hits} reutilizados, "
+                f"{self.collected} datablocks liberados")
@@ -0,0 +1,263 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from obj_converter import VERTEX_DTYPE, write_ply
+from mesh_store import read_ply
+from visibility import project_boxes
+
+# Face budgets of LOD1, LOD2, ... (LOD0 is the original PLY)
+LOD_BUDGETS = (20000, 5000, 1200)
+
+# LODs live in a subfolder so ScenePool.load does not take them for assets
+LOD_FOLDER = "lod"
+LOD_MANIFEST_NAME = ".lod_manifest.json"
+
+# Projected size (px, longest side of the screen box) from which each LOD is still used:
+# >= 256 px → LOD0, >= 96 px → LOD1, >= 32 px → LOD2, smaller → LOD3
+LOD_SCREEN_PX = (256, 96, 32)
+
+# Largest grid tried by the budget search (cells along the longest side of the mesh)
+MAX_GRID = 1024
+
+
+def lod_path(ply_path, level):
+    """Path of LOD `level` of a PLY (level 0 is the PLY itself)"""
+    if level == 0:
+        return ply_path
+    folder, fname = os.path.split(ply_path)
+    return os.path.join(folder, LOD_FOLDER, f"{os.path.splitext(fname)[0]}_lod{level}.ply")
+
+
+def lod_paths(ply_path):
+    """[LOD0, LOD1, ...] paths of a PLY, up to the first missing level"""
+    paths = [ply_path]
+    while os.path.exists(lod_path(ply_path, len(paths))):
+        paths.append(lod_path(ply_path, len(paths)))
+    return paths
+
+
+# === Vertex clustering ===
+
+def _face_quadrics(positions, faces):
+    """Area-weighted plane quadric (10 unique terms of [n, d][n, d]^T) of every triangle"""
+    p0, p1, p2 = (positions[faces[:, k]] for k in range(3))
+    normal = np.cross(p1 - p0, p2 - p0)
+    area = np.linalg.norm(normal, axis=1)
+    n = normal / np.maximum(area, 1e-12)[:, None]
+    d = -(n * p0).sum(axis=1)
+    a, b, c = n.T
+    # Weighting by area keeps big flat faces in place; the 1/2 of the area does not matter
+    terms = np.stack([a * a, a * b, a * c, a * d, b * b, b * c, b * d, c * c, c * d, d * d], axis=1)
+    return terms * area[:, None]
+
+
+def _cluster_ids(positions, lo, cell):
+    cells = np.floor((positions - lo) / cell).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, inverse = np.unique(keys, return_inverse=True)
+    return inverse.ravel()
+
+
+def _collapse(faces, ids):
+    """Triangles left after merging vertices by cluster: degenerate and repeated ones are dropped"""
+    tris = ids[faces]
+    keep = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])
+    tris = tris[keep]
+    if len(tris) == 0:
+        return tris
+    # Same three vertices in any order (or winding) count once; keep the first one's winding
+    _, first = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+    return tris[np.sort(first)]
+
+
+def _representatives(positions, colors, faces, ids, n_clusters):
+    """Position minimising the summed face quadrics of each cluster (mean if singular) and mean colour"""
+    counts = np.bincount(ids, minlength=n_clusters).astype(np.float64)
+    mean = np.stack([np.bincount(ids, positions[:, k], n_clusters) for k in range(3)], axis=1) / counts[:, None]
+    color = np.stack([np.bincount(ids, colors[:, k], n_clusters) for k in range(3)], axis=1) / counts[:, None]
+
+    face_q = _face_quadrics(positions, faces)
+    q = np.zeros((n_clusters, 10))
+    for k in range(3):
+        # Every triangle adds its quadric to the clusters of its three corners
+        for j in range(10):
+            q[:, j] += np.bincount(ids[faces[:, k]], face_q[:, j], n_clusters)
+    aa, ab, ac, ad, bb, bc, bd, cc, cd, _ = q.T
+    A = np.stack([aa, ab, ac, ab, bb, bc, ac, bc, cc], axis=1).reshape(-1, 3, 3)
+    rhs = -np.stack([ad, bd, cd], axis=1)
+    # Flat or line-like clusters have no unique minimum: stay at the mean there
+    scale = np.maximum(np.abs(A).max(axis=(1, 2)), 1e-30)
+    solvable = np.abs(np.linalg.det(A / scale[:, None, None])) > 1e-3
+    best = mean.copy()
+    if solvable.any():
+        best[solvable] = np.linalg.solve(A[solvable], rhs[solvable][..., None])[..., 0]
+    return best, mean, color
+
+
+def cluster_decimate(positions, colors, faces, grid):
+    """Vertex clustering on a grid of `grid` cells along the longest side of the mesh.
+
+    Returns (positions, colors, faces) of the simplified mesh; each cluster
+    is placed at the quadric-optimal point of its faces, clamped to its cell.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    lo, hi = positions.min(axis=0), positions.max(axis=0)
+    cell = max(float((hi - lo).max()), 1e-12) / grid
+    ids = _cluster_ids(positions, lo, cell)
+    n_clusters = int(ids.max()) + 1
+    new_faces = _collapse(faces, ids)
+    new_pos, mean, new_col = _representatives(positions, np.asarray(colors, dtype=np.float64), faces, ids,
+                                              n_clusters)
+    # A vertex never leaves its cell, so far-off solutions of ill-conditioned quadrics are cut back
+    cell_lo = lo + np.floor((mean - lo) / cell) * cell
+    new_pos = np.clip(new_pos, cell_lo, cell_lo + cell)
+
+    # Clusters no triangle refers to any more are dropped and the rest renumbered
+    used = np.zeros(n_clusters, dtype=bool)
+    used[new_faces.ravel()] = True
+    remap = np.cumsum(used) - 1
+    return new_pos[used], np.clip(np.rint(new_col[used]), 0, 255).astype(np.uint8), remap[new_faces]
+
+
+def decimate(positions, colors, faces, max_faces):
+    """Simplify a mesh to at most max_faces triangles, keeping as many as the budget allows.
+
+    Binary search on the clustering grid; a mesh already within budget is
+    returned unchanged. Returns (positions, colors, faces, grid), grid None
+    when nothing was done.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    if len(faces) <= max_faces:
+        return np.asarray(positions), np.asarray(colors), faces, None
+    lo_grid, hi_grid = 1, MAX_GRID
+    best = cluster_decimate(positions, colors, faces, 1) + (1,)
+    while lo_grid < hi_grid:
+        grid = (lo_grid + hi_grid + 1) // 2
+        result = cluster_decimate(positions, colors, faces, grid)
+        if len(result[2]) <= max_faces:
+            best, lo_grid = result + (grid,), grid
+        else:
+            hi_grid = grid - 1
+    return best
+
+
+def decimate_mesh(mesh, max_faces):
+    """(VERTEX_DTYPE vertices, faces, grid) of a mesh_store.Mesh reduced to max_faces triangles"""
+    pos, col, faces, grid = decimate(mesh.positions(), mesh.colors(), mesh.faces, max_faces)
+    vertices = np.zeros(len(pos), dtype=VERTEX_DTYPE)
+    vertices["x"], vertices["y"], vertices["z"] = np.asarray(pos, dtype=np.float32).T
+    vertices["red"], vertices["green"], vertices["blue"] = np.asarray(col, dtype=np.uint8).T
+    return vertices, faces, grid
+
+
+# === LOD files ===
+
+def build_lods(ply_path, budgets=LOD_BUDGETS, binary=True):
+    """Write the LODs of one PLY; stops at the first budget the mesh already fits in.
+
+    Each level is simplified from the original, not from the previous level.
+    Returns [(level, vertices, faces, seconds), ...] of the files written.
+    """
+    mesh = read_ply(ply_path, mmap=False)
+    os.makedirs(os.path.dirname(lod_path(ply_path, 1)), exist_ok=True)
+    written = []
+    for level, budget in enumerate(budgets, start=1):
+        if len(mesh.faces) <= budget:
+            break
+        start = time.perf_counter()
+        vertices, faces, _ = decimate_mesh(mesh, budget)
+        path = lod_path(ply_path, level)
+        tmp_path = path + ".tmp"
+        write_ply(tmp_path, vertices, faces, binary=binary)
+        os.replace(tmp_path, path)
+        written.append((level, len(vertices), len(faces), time.perf_counter() - start))
+    # Levels left over from a previous run with more budgets would be picked up by lod_paths
+    level = len(written) + 1
+    while os.path.exists(lod_path(ply_path, level)):
+        os.remove(lod_path(ply_path, level))
+        level += 1
+    return written
+
+
+def build_all_lods(ply_folder, budgets=LOD_BUDGETS, workers=None, force=False):
+    """LODs of every PLY in a folder (one process per file), skipping those already up to date"""
+    from batch_obj_to_ply import load_manifest, save_manifest
+
+    lod_folder = os.path.join(ply_folder, LOD_FOLDER)
+    os.makedirs(lod_folder, exist_ok=True)
+    manifest = load_manifest(lod_folder, LOD_MANIFEST_NAME)
+    jobs = []
+    for fname in sorted(os.listdir(ply_folder)):
+        if not fname.lower().endswith(".ply"):
+            continue
+        st = os.stat(os.path.join(ply_folder, fname))
+        stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "budgets": list(budgets)}
+        entry = manifest.get(fname, {})
+        if force or any(entry.get(k) != v for k, v in stamp.items()):
+            jobs.append((fname, stamp))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(fname, stamp, pool.submit(build_lods, os.path.join(ply_folder, fname), budgets))
+                   for fname, stamp in jobs]
+        for fname, stamp, future in futures:
+            try:
+                written = future.result()
+            except Exception as e:
+                print(f"❌ {fname}: {e}")
+                continue
+            manifest[fname] = stamp
+            levels = ", ".join(f"LOD{lvl} {f} f ({s:.2f}s)" for lvl, _, f, s in written) or "sin LODs (ya cabe)"
+            print(f"✅ {fname}: {levels}")
+    save_manifest(lod_folder, manifest, LOD_MANIFEST_NAME)
+    print(f"LODs: {len(jobs)} archivos en {time.perf_counter() - start:.2f}s, "
+          f"{len(manifest) - len(jobs)} sin cambios")
+    return manifest
+
+
+# === LOD selection ===
+
+def screen_sizes(corners, camera_poses, K, resolution):
+    """Largest projected size (px, longest side of the screen box) of each box over all poses.
+
+    Also batched: (..., M, 8, 3) corners with (..., P, 4, 4) poses give (..., M) sizes.
+    """
+    corners = np.asarray(corners, dtype=float)
+    poses = np.asarray(camera_poses, dtype=float)
+    rects, _ = project_boxes(corners[..., None, :, :, :], poses, K, resolution)
+    return np.maximum(rects[..., 2] - rects[..., 0], rects[..., 3] - rects[..., 1]).max(axis=-2)
+
+
+def choose_lods(sizes, thresholds=LOD_SCREEN_PX):
+    """LOD level for each projected size: the first level whose threshold it reaches (size >= threshold)"""
+    thresholds = -np.asarray(thresholds, dtype=float)
+    # Negated, the thresholds ascend; "left" keeps a size equal to a threshold on the finer level
+    return np.searchsorted(thresholds, -np.asarray(sizes, dtype=float), side="left")
+
+
+def select_lods(corners, camera_poses, K, resolution, thresholds=LOD_SCREEN_PX):
+    """LOD level of each object from the biggest it gets on screen in any of the poses"""
+    return choose_lods(screen_sizes(corners, camera_poses, K, resolution), thresholds)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera versiones simplificadas (LOD) de los PLY")
+    parser.add_argument("ply_folder", nargs="?", default="../ply")
+    parser.add_argument("--budgets", type=int, nargs="+", default=list(LOD_BUDGETS),
+                        help="caras máximas de LOD1, LOD2, ...")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true")
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python mesh_lod.py ../ply --budgets 20000 5000 1200 -j 4
+
+if __name__ == "__main__":
+    args = parse_args()
+    build_all_lods(args.ply_folder, tuple(args.budgets), args.workers, args.force)
@@ -0,0 +1,345 @@
+import os
+from collections import OrderedDict
+import numpy as np
+
+from obj_converter import triangulate
+
+# PLY scalar type names → NumPy type codes (byte order added per file)
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class PlyHeader:
+    """Parsed PLY header: format, element counts and property layout"""
+
+    def __init__(self, fmt, elements, size):
+        self.format = fmt          # "ascii", "binary_little_endian" or "binary_big_endian"
+        self.elements = elements   # [(name, count, [(prop_name, type, list_count_type), ...]), ...]
+        self.size = size           # header length in bytes (data starts here)
+
+    def element(self, name):
+        for elem in self.elements:
+            if elem[0] == name:
+                return elem
+        return None
+
+    def byte_order(self):
+        return ">" if self.format == "binary_big_endian" else "<"
+
+
+def read_ply_header(f):
+    """Read the header of an open binary file object"""
+    first = f.readline()
+    if first.strip() != b"ply":
+        raise ValueError("No es un archivo PLY")
+    fmt = None
+    elements = []
+    size = len(first)
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("Encabezado PLY incompleto")
+        size += len(line)
+        parts = line.decode("ascii").split()
+        if not parts or parts[0] in ("comment", "obj_info"):
+            continue
+        if parts[0] == "end_header":
+            break
+        if parts[0] == "format":
+            fmt = parts[1]
+        elif parts[0] == "element":
+            elements.append((parts[1], int(parts[2]), []))
+        elif parts[0] == "property":
+            if parts[1] == "list":
+                elements[-1][2].append((parts[4], PLY_TYPES[parts[3]], PLY_TYPES[parts[2]]))
+            else:
+                elements[-1][2].append((parts[2], PLY_TYPES[parts[1]], None))
+    return PlyHeader(fmt, elements, size)
+
+
+class Mesh:
+    """Vertex / triangle arrays of one PLY asset (possibly views on a memory map)"""
+
+    def __init__(self, path, vertices, faces, mtime_ns=None):
+        self.path = path
+        self.vertices = vertices   # structured array with at least x, y, z
+        self.faces = faces         # (N, 3) integer triangle indices
+        self.mtime_ns = mtime_ns
+        self._bounds = None
+
+    @property
+    def nbytes(self):
+        return self.vertices.nbytes + self.faces.nbytes
+
+    @property
+    def is_mapped(self):
+        return isinstance(self.vertices, np.memmap) or isinstance(self.vertices.base, np.memmap)
+
+    def positions(self):
+        """(N, 3) float32 copy of the vertex coordinates"""
+        return np.stack([self.vertices["x"], self.vertices["y"], self.vertices["z"]], axis=1).astype(np.float32)
+
+    def colors(self):
+        """(N, 3) uint8 vertex colours, white when the file has none"""
+        names = self.vertices.dtype.names
+        if not all(c in names for c in ("red", "green", "blue")):
+            return np.full((len(self.vertices), 3), 255, dtype=np.uint8)
+        return np.stack([self.vertices["red"], self.vertices["green"], self.vertices["blue"]], axis=1)
+
+    def bounds(self):
+        """Axis-aligned bounding box as (min_xyz, max_xyz), computed once"""
+        if self._bounds is None:
+            pos = self.positions()
+            if len(pos) == 0:
+                self._bounds = np.zeros(3, dtype=np.float32), np.zeros(3, dtype=np.float32)
+            else:
+                self._bounds = pos.min(axis=0), pos.max(axis=0)
+        return self._bounds
+
+
+def _scalar_dtype(props, order):
+    return np.dtype([(name, order + typ) for name, typ, list_type in props])
+
+
+def _read_binary(path, header):
+    order = header.byte_order()
+    _, n_vertices, vprops = header.element("vertex")
+    face = header.element("face")
+    if any(list_type for _, _, list_type in vprops):
+        raise ValueError("Propiedades de lista en vértices no soportadas")
+    vdtype = _scalar_dtype(vprops, order)
+    vertices = np.memmap(path, dtype=vdtype, mode="r", offset=header.size, shape=(n_vertices,))
+
+    if face is None or face[1] == 0:
+        return vertices, np.zeros((0, 3), dtype=np.int32)
+    _, n_faces, fprops = face
+    list_props = [p for p in fprops if p[2]]
+    if len(fprops) != 1 or len(list_props) != 1:
+        raise ValueError("Se esperaba una sola propiedad de lista en 'face'")
+    _, index_type, count_type = list_props[0]
+    face_offset = header.size + vertices.nbytes
+
+    # Fast path: all triangles → fixed-size records, map them directly
+    tri_dtype = np.dtype([("count", order + count_type), ("indices", order + index_type, (3,))])
+    if os.path.getsize(path) - face_offset >= n_faces * tri_dtype.itemsize:
+        tris = np.memmap(path, dtype=tri_dtype, mode="r", offset=face_offset, shape=(n_faces,))
+        if np.all(tris["count"] == 3):
+            return vertices, tris["indices"]
+
+    # Mixed polygon sizes: find where every record starts, then triangulate
+    raw = np.fromfile(path, dtype=np.uint8, offset=face_offset)
+    counts, indices = _read_polygons(raw, n_faces, np.dtype(order + count_type), np.dtype(order + index_type))
+    return vertices, triangulate(indices, np.cumsum(counts) - counts, counts)
+
+
+def _read_polygons(raw, n_faces, count_dt, index_dt, max_walk=1 << 16):
+    """(counts, flat int64 indices) of a binary face list with mixed polygon sizes.
+
+    A record starting at byte p ends at next(p) = p + count_size + count(p) * index_size,
+    computed for every byte offset at once. Doubling it (next^2, next^4, ...)
+    until at most max_walk hops are left, the start of every 2^k-th face is
+    walked and the faces in between are filled in with one gather per step,
+    over all blocks at once.
+    """
+    size = len(raw)
+    cs, isz = count_dt.itemsize, index_dt.itemsize
+    if n_faces == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # Count field read at every byte offset (garbage where no record starts, never followed)
+    at = np.zeros(size + 1, dtype=np.int64 if cs > 2 else np.int32)
+    if size >= cs:
+        windows = np.lib.stride_tricks.sliding_window_view(raw, cs)
+        at[:size - cs + 1] = np.ascontiguousarray(windows).view(count_dt).ravel()
+    offset_dt = np.int32 if size < np.iinfo(np.int32).max // 2 else np.int64
+    step = np.clip(at, 0, size).astype(offset_dt)
+    step *= isz
+    step += cs
+    step += np.arange(size + 1, dtype=offset_dt)
+    np.minimum(step, size, out=step)
+    jump, far = step, step
+    levels = 0
+    while (n_faces - 1) >> levels > max_walk:
+        far = far[far]
+        levels += 1
+    block = 1 << levels
+    n_blocks = (n_faces + block - 1) // block
+    starts = np.empty((n_blocks, block), dtype=offset_dt)
+    pos = 0
+    for b in range(n_blocks):
+        starts[b, 0] = pos
+        pos = far[pos]
+    for k in range(1, block):
+        starts[:, k] = jump[starts[:, k - 1]]
+    starts = starts.ravel()[:n_faces].astype(np.int64)
+    if starts[-1] >= size:
+        raise ValueError("Lista de caras truncada")
+    counts = at[starts].astype(np.int64)
+    # Byte offsets of every index, then one view of the gathered bytes
+    corner = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    offsets = np.repeat(starts + cs, counts) + corner * isz
+    if offsets.size and offsets[-1] + isz > size:
+        raise ValueError("Lista de caras truncada")
+    index_bytes = raw[offsets[:, None] + np.arange(isz)]
+    return counts, np.ascontiguousarray(index_bytes).view(index_dt).ravel().astype(np.int64)
+
+
+def _line_token_counts(lines):
+    """Whitespace-separated fields of every line, without splitting them in Python"""
+    text = np.frombuffer(b"\n".join(lines) + b"\n", dtype=np.uint8)
+    blank = (text == ord(" ")) | (text == ord("\t")) | (text == ord("\r")) | (text == ord("\n"))
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    line_of = np.cumsum(text == ord("\n")) - (text == ord("\n"))
+    return np.bincount(line_of[starts], minlength=len(lines))[:len(lines)]
+
+
+def _read_ascii(path, header):
+    _, n_vertices, vprops = header.element("vertex")
+    face = header.element("face")
+    with open(path, "rb") as f:
+        f.seek(header.size)
+        lines = f.read().split(b"\n")
+
+    vdtype = _scalar_dtype(vprops, "<")
+    vertices = np.zeros(n_vertices, dtype=vdtype)
+    if n_vertices:
+        table = np.fromstring(b" ".join(lines[:n_vertices]), dtype=np.float64, sep=" ")
+        table = table.reshape(n_vertices, len(vprops))
+        for i, name in enumerate(vdtype.names):
+            vertices[name] = table[:, i]
+
+    n_faces = face[1] if face else 0
+    if not n_faces:
+        return vertices, np.zeros((0, 3), dtype=np.int32)
+    face_lines = lines[n_vertices:n_vertices + n_faces]
+    values = np.fromstring(b" ".join(face_lines), dtype=np.int64, sep=" ")
+    if values.size == 4 * n_faces and np.all(values[::4] == 3):
+        return vertices, values.reshape(n_faces, 4)[:, 1:].astype(np.int32)
+    counts = _line_token_counts(face_lines).astype(np.int64) - 1
+    # Each record is "<n> i0 i1 ...": skip the leading count of every line
+    starts = np.cumsum(counts + 1) - counts
+    keep = np.ones(values.size, dtype=bool)
+    keep[starts - 1] = False
+    flat = values[keep]
+    return vertices, triangulate(flat, np.cumsum(counts) - counts, counts)
+
+
+def read_ply(path, mmap=True):
+    """Read a PLY file into a Mesh.
+
+    Binary files are memory-mapped (zero-copy views) unless mmap is False,
+    ASCII files are parsed in bulk.
+    """
+    with open(path, "rb") as f:
+        header = read_ply_header(f)
+    if header.element("vertex") is None:
+        raise ValueError(f"{path}: sin elemento 'vertex'")
+
+    if header.format == "ascii":
+        vertices, faces = _read_ascii(path, header)
+    else:
+        vertices, faces = _read_binary(path, header)
+        if not mmap:
+            vertices, faces = np.array(vertices), np.array(faces)
+    return Mesh(path, vertices, faces, os.stat(path).st_mtime_ns)
+
+
+class MeshCache:
+    """Per-process LRU cache of parsed meshes keyed by path and mtime, bounded in bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, mmap=True):
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        self._meshes = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, path):
+        path = os.path.abspath(path)
+        return path, os.stat(path).st_mtime_ns
+
+    def get(self, path):
+        key = self._key(path)
+        mesh = self._meshes.get(key)
+        if mesh is not None:
+            self.hits += 1
+            self._meshes.move_to_end(key)
+            return mesh
+
+        self.misses += 1
+        # Drop stale versions of the same file before adding the new one
+        for old_key in [k for k in self._meshes if k[0] == key[0]]:
+            self._evict(old_key)
+        mesh = read_ply(key[0], mmap=self.mmap)
+        self._meshes[key] = mesh
+        self.total_bytes += mesh.nbytes
+        while self.total_bytes > self.max_bytes and len(self._meshes) > 1:
+            self._evict(next(iter(self._meshes)))
+        return mesh
+
+    def _evict(self, key):
+        mesh = self._meshes.pop(key)
+        self.total_bytes -= mesh.nbytes
+
+    def clear(self):
+        self._meshes.clear()
+        self.total_bytes = 0
+
+    def __contains__(self, path):
+        return self._key(path) in self._meshes
+
+    def __len__(self):
+        return len(self._meshes)
+
+
+_default_cache = MeshCache()
+
+
+def load_mesh(path):
+    """Load a PLY through the process-wide mesh cache"""
+    return _default_cache.get(path)
+
+
+def default_cache():
+    return _default_cache
+
+
+def load_objects(bproc, path, cache=None):
+    """Objects for one PLY built from the cached mesh instead of re-importing the file.
+
+    Drop-in for bproc.loader.load_obj: the arrays come from `cache` (the
+    process-wide MeshCache by default) and go into Blender with foreach_set,
+    vertex colours in the same "Col" layer the PLY importer writes. Without
+    bpy (FakeBproc) the call is forwarded to the loader.
+    """
+    mesh = (cache or _default_cache).get(path)
+    try:
+        import bpy
+    except ImportError:
+        return bproc.loader.load_obj(path)
+    from material_registry import VERTEX_COLOR_LAYER
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    faces = np.ascontiguousarray(mesh.faces, dtype=np.int32)
+    data = bpy.data.meshes.new(name)
+    data.vertices.add(len(mesh.vertices))
+    data.vertices.foreach_set("co", mesh.positions().ravel())
+    data.loops.add(faces.size)
+    data.loops.foreach_set("vertex_index", faces.ravel())
+    data.polygons.add(len(faces))
+    data.polygons.foreach_set("loop_start", np.arange(0, faces.size, 3, dtype=np.int32))
+    if not data.polygons.bl_rna.properties["loop_total"].is_readonly:   # read-only since Blender 4.0
+        data.polygons.foreach_set("loop_total", np.full(len(faces), 3, dtype=np.int32))
+    colors = np.ones((len(mesh.vertices), 4), dtype=np.float32)
+    colors[:, :3] = mesh.colors() / 255.0
+    layer = data.color_attributes.new(VERTEX_COLOR_LAYER, "BYTE_COLOR", "POINT")
+    layer.data.foreach_set("color_srgb", colors.ravel())
+    data.update()
+    return [bproc.object.create_from_blender_mesh(data, name)]
@@ -0,0 +1,240 @@
+import os
+import time
+import random
+import hashlib
+import sqlite3
+import argparse
+
+from image_metrics import (COLUMNS, analyze_image, add_hashes, iter_metrics, flag_images, get_image_paths,
+                           BLUR_THRESHOLD_LAPLACIAN, DARK_THRESHOLD_BRIGHTNESS, BRIGHT_THRESHOLD_BRIGHTNESS,
+                           LOW_ENTROPY_THRESHOLD)
+from dedup import add_duplicate_columns, summary as dedup_summary, DUPLICATE_DISTANCE
+
+# Bump when the metric definitions change: older rows are then recomputed
+METRICS_VERSION = 2
+
+# Head and tail sampled by fast_digest
+DIGEST_BLOCK = 1 << 16
+
+
+def fast_digest(path, size=None, block=DIGEST_BLOCK):
+    """BLAKE2b of the size plus the first and last `block` bytes.
+
+    Reads at most 128 KB per photo; enough to tell a re-saved or replaced
+    JPEG from a file that was only touched or copied.
+    """
+    size = os.path.getsize(path) if size is None else size
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(block))
+        if size > 2 * block:
+            f.seek(-block, os.SEEK_END)
+            h.update(f.read(block))
+        elif size > block:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def analyze_stamped_chunk(paths):
+    """Worker job: metrics plus the size / mtime / digest stamp the cache is keyed by"""
+    rows, errors = [], []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            row = analyze_image(path)
+            row.update(size=st.st_size, mtime_ns=st.st_mtime_ns, digest=fast_digest(path, st.st_size))
+            rows.append(row)
+        except Exception as e:
+            errors.append((path, str(e)))
+    return add_hashes(rows), errors
+
+
+class MetricsCache:
+    """SQLite store of per-image metrics keyed by path, size, mtime and content digest.
+
+    lookup() only stats the files (and reads 128 KB of those whose mtime
+    changed), so a re-run decodes new or modified images only. Paths are
+    stored absolute, so runs from another working directory still hit.
+    """
+
+    STAMP = ["size", "mtime_ns", "digest", "version", "analyzed_at"]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS metrics (path TEXT PRIMARY KEY, "
+                          f"{', '.join(c for c in self.STAMP + COLUMNS if c != 'path')})")
+        # Columns added by newer versions of image_metrics
+        existing = {r[1] for r in self.conn.execute("PRAGMA table_info(metrics)")}
+        for column in self.STAMP + COLUMNS:
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE metrics ADD COLUMN {column}")
+        self.conn.commit()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+
+    def _stamps(self):
+        return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in self.conn.execute(
+            "SELECT path, size, mtime_ns, digest FROM metrics WHERE version = ?", (METRICS_VERSION,))}
+
+    def lookup(self, image_paths):
+        """Split paths into (cached, stale): cached ones need no decoding"""
+        stamps = self._stamps()
+        cached, stale, touched = [], [], []
+        for path in image_paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append(path)      # reported as an error by the analysis
+                continue
+            stamp = stamps.get(os.path.abspath(path))
+            if stamp is None or stamp[0] != st.st_size:
+                stale.append(path)
+            elif stamp[1] == st.st_mtime_ns:
+                cached.append(path)
+            elif stamp[2] == fast_digest(path, st.st_size):
+                # Touched (copy, sync, checkout) but same content
+                touched.append((st.st_mtime_ns, os.path.abspath(path)))
+                cached.append(path)
+            else:
+                stale.append(path)
+        if touched:
+            self.conn.executemany("UPDATE metrics SET mtime_ns = ? WHERE path = ?", touched)
+            self.conn.commit()
+        self.hits += len(cached)
+        self.misses += len(stale)
+        return cached, stale
+
+    def put(self, rows):
+        """Insert or replace stamped rows (from analyze_stamped_chunk)"""
+        columns = ["path"] + [c for c in self.STAMP + COLUMNS if c != "path"]
+        now = time.time()
+        values = [tuple({**row, "path": os.path.abspath(row["path"]), "version": METRICS_VERSION,
+                         "analyzed_at": now}.get(c) for c in columns)
+                  for row in rows]
+        self.conn.executemany(f"INSERT OR REPLACE INTO metrics ({', '.join(columns)}) "
+                              f"VALUES ({', '.join('?' * len(columns))})", values)
+        self.conn.commit()
+
+    def load(self, image_paths=None):
+        """Cached metrics as a DataFrame with the COLUMNS of analyze_images, in the order of image_paths.
+
+        The path column holds image_paths as given (absolute paths without them).
+        """
+        import pandas as pd
+
+        df = pd.read_sql_query(f"SELECT {', '.join(COLUMNS)} FROM metrics WHERE version = ?",
+                               self.conn, params=(METRICS_VERSION,))
+        if image_paths is None:
+            return df
+        given = {os.path.abspath(path): path for path in image_paths}
+        position = {key: i for i, key in enumerate(given)}
+        df = df[df["path"].isin(position)]
+        df = df.iloc[df["path"].map(position).argsort().values].reset_index(drop=True)
+        df["path"] = df["path"].map(given)
+        return df
+
+    def prune(self, keep_paths):
+        """Forget images that are no longer in keep_paths; returns how many rows were removed"""
+        keep = {os.path.abspath(path) for path in keep_paths}
+        gone = [(p,) for (p,) in self.conn.execute("SELECT path FROM metrics") if p not in keep]
+        self.conn.executemany("DELETE FROM metrics WHERE path = ?", gone)
+        self.conn.commit()
+        return len(gone)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def analyze_images_cached(image_paths, cache_path, num_to_process=None, workers=None, chunk_size=32,
+                          dedup_radius=None):
+    """analyze_images that only decodes images missing from (or changed since) the cache.
+
+    Results are committed chunk by chunk, so an interrupted run keeps its
+    progress. Returns the DataFrame of analyze_images (None if empty).
+    With dedup_radius the near-duplicate columns of dedup.py are added,
+    grouped from the cached hashes (no image is read for that).
+    """
+    paths = list(image_paths)
+    if num_to_process and num_to_process < len(paths):
+        paths = random.sample(paths, num_to_process)
+        print(f"Analizando una muestra de {num_to_process} imágenes.")
+
+    start = time.perf_counter()
+    with MetricsCache(cache_path) as cache:
+        cached, stale = cache.lookup(paths)
+        print(f"Caché de métricas: {len(cached)} sin cambios, {len(stale)} por analizar ({cache_path})")
+        processed_count = error_count = 0
+        for rows, errors in iter_metrics(stale, workers, chunk_size, job=analyze_stamped_chunk):
+            for path, message in errors:
+                print(f"ERROR procesando {path}: {message}")
+            error_count += len(errors)
+            processed_count += len(rows)
+            cache.put(rows)
+            if processed_count and processed_count % 100 < len(rows):
+                print(f"Procesando imagen {processed_count + error_count}/{len(stale)}...")
+        df = cache.load(paths)
+
+    elapsed = time.perf_counter() - start
+    print(f"Análisis completado. Desde caché: {len(cached)}. Procesadas: {processed_count}. "
+          f"Errores: {error_count}. ({elapsed:.1f}s)")
+    if not len(df):
+        return None
+    if dedup_radius is not None:
+        df = add_duplicate_columns(df, dedup_radius)
+        print(dedup_summary(df))
+    return df
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Métricas de calidad con caché incremental; "
+                                                 "sin image_dir solo re-aplica los umbrales a la caché")
+    parser.add_argument("cache", help="archivo SQLite de la caché, p.ej. metrics_cache.sqlite")
+    parser.add_argument("image_dir", nargs="?", default=None)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--prune", action="store_true", help="olvida imágenes que ya no están en image_dir")
+    parser.add_argument("--blur", type=float, default=BLUR_THRESHOLD_LAPLACIAN)
+    parser.add_argument("--dark", type=float, default=DARK_THRESHOLD_BRIGHTNESS)
+    parser.add_argument("--bright", type=float, default=BRIGHT_THRESHOLD_BRIGHTNESS)
+    parser.add_argument("--low-entropy", type=float, default=LOW_ENTROPY_THRESHOLD)
+    parser.add_argument("--dedup", action="store_true", help="agrupa fotos casi idénticas (dedup.py)")
+    parser.add_argument("--radius", type=int, default=DUPLICATE_DISTANCE, help="bits de pHash para --dedup")
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python metrics_cache.py metrics_cache.sqlite "Complete_Bimbo/Fotos Chambita 1364" -j 8
+# python metrics_cache.py metrics_cache.sqlite --blur 80     (sin leer ninguna imagen)
+# python metrics_cache.py metrics_cache.sqlite --dedup       (duplicados desde los hashes guardados)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.image_dir:
+        paths = get_image_paths(args.image_dir)
+        df = analyze_images_cached(paths, args.cache, workers=args.workers,
+                                   dedup_radius=args.radius if args.dedup else None)
+        if args.prune:
+            with MetricsCache(args.cache) as cache:
+                print(f"Eliminadas de la caché: {cache.prune(paths)}")
+    else:
+        with MetricsCache(args.cache) as cache:
+            df = cache.load()
+        if args.dedup and len(df):
+            df = add_duplicate_columns(df, args.radius)
+            print(dedup_summary(df))
+    if df is not None and len(df):
+        flags = flag_images(df, args.blur, args.dark, args.bright, args.low_entropy)
+        for category, count in flags.sum().items():
+            print(f"  Imágenes en '{category}': {count}")
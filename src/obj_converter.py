@@ -0,0 +1,334 @@
+import os
+import re
+import time
+import shutil
+import tempfile
+import warnings
+import numpy as np
+
+# PLY vertex layout shared by every converter / reader in the project
+VERTEX_DTYPE = np.dtype([
+    ("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+    ("red", "u1"), ("green", "u1"), ("blue", "u1"),
+])
+
+# One triangle as stored in a binary PLY: uchar count followed by 3 int indices
+FACE_DTYPE = np.dtype([("count", "u1"), ("indices", "<i4", (3,))])
+
+# Colour for "v x y z" lines that carry no vertex colour
+DEFAULT_COLOR = (255, 255, 255)
+
+# Bytes of OBJ text parsed at a time (whole lines). Parsing needs ~15x the block in
+# temporaries (line lists, joined payloads, float64 values), so blocks stay small
+CHUNK_SIZE = 1 << 20
+
+# Rows encoded per write call, so writing a PLY needs little memory beyond the arrays
+WRITE_ROWS = 1 << 16
+
+# Capacity factor of GrowableArray when it runs out of room
+GROWTH = 1.5
+
+# Seconds between two progress lines of a long conversion
+PROGRESS_INTERVAL = 2.0
+
+_FACE_SUFFIX = re.compile(rb"/\S*")
+
+
+class GrowableArray:
+    """Append-only NumPy buffer that grows by GROWTH when full.
+
+    Holds at most GROWTH x the rows appended (plus the old buffer while
+    growing), instead of one Python tuple per row.
+    """
+
+    def __init__(self, dtype, shape=(), capacity=1 << 16):
+        self._data = np.empty((capacity,) + tuple(shape), dtype=dtype)
+        self.size = 0
+
+    def append(self, rows):
+        n = len(rows)
+        if self.size + n > len(self._data):
+            capacity = max(self.size + n, int(len(self._data) * GROWTH))
+            data = np.empty((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+            data[:self.size] = self._data[:self.size]
+            self._data = data
+        self._data[self.size:self.size + n] = rows
+        self.size += n
+
+    def view(self):
+        return self._data[:self.size]
+
+    def __len__(self):
+        return self.size
+
+
+def _split_records(lines, prefix):
+    """Return the payload (without the keyword) of every line starting with prefix"""
+    n = len(prefix)
+    return [line[n:] for line in lines if line.startswith(prefix)]
+
+
+def _field_counts(records):
+    """Number of whitespace separated fields in each record"""
+    return np.fromiter((len(r.split()) for r in records), dtype=np.int64, count=len(records))
+
+
+def _fromstring(text, dtype):
+    """np.fromstring(sep=" ") or None when a token cannot be read (it would stop there)"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            return np.fromstring(text, dtype=dtype, sep=" ")
+    except (ValueError, DeprecationWarning):
+        return None
+
+
+def _parse_numbers(records, counts, dtype, keyword):
+    """All fields of the records as one flat array; ValueError naming the first malformed record"""
+    values = _fromstring(b" ".join(records), dtype)
+    if values is None or values.size != counts.sum():
+        bad = next(r for r, n in zip(records, counts) if (v := _fromstring(r, dtype)) is None or v.size != n)
+        raise ValueError(f"Línea '{keyword}' mal formada: {keyword} {bad.decode(errors='replace').strip()}")
+    return values
+
+
+def _parse_vertices(records, default_color=DEFAULT_COLOR):
+    """Parse 'v' payloads into a structured VERTEX_DTYPE array"""
+    vertices = np.zeros(len(records), dtype=VERTEX_DTYPE)
+    if not records:
+        return vertices
+
+    counts = _field_counts(records)
+    if counts.min() < 3:
+        bad = records[int(np.argmax(counts < 3))]
+        raise ValueError(f"Línea 'v' mal formada: v {bad.decode(errors='replace').strip()}")
+    values = _parse_numbers(records, counts, np.float64, "v")
+    starts = np.cumsum(counts) - counts
+
+    xyz = values[starts[:, None] + np.arange(3)]
+    vertices["x"], vertices["y"], vertices["z"] = xyz.T
+
+    # Colours in the 0–1 range (trimesh / MeshLab export), missing → default
+    rgb = np.empty((len(records), 3), dtype=np.uint8)
+    rgb[:] = default_color
+    has_color = counts >= 6
+    if has_color.any():
+        col = values[starts[has_color, None] + 3 + np.arange(3)]
+        rgb[has_color] = (np.clip(col, 0, 1) * 255).astype(np.uint8)
+    vertices["red"], vertices["green"], vertices["blue"] = rgb.T
+    return vertices
+
+
+def _parse_faces(records, n_vertices=0):
+    """Parse 'f' payloads into an (N, 3) int32 array of 0-based triangles.
+
+    Negative (relative) indices count back from n_vertices, the number of
+    vertices defined before the face: a scalar or one value per record.
+    """
+    if not records:
+        return np.zeros((0, 3), dtype=np.int32)
+
+    # Drop texture / normal references ("12/4/7" → "12")
+    records = [_FACE_SUFFIX.sub(b"", r) for r in records]
+    counts = _field_counts(records)
+    values = _parse_numbers(records, counts, np.int64, "f")
+    short = int((counts < 3).sum())
+    if short:
+        warnings.warn(f"{short} caras con menos de 3 vértices descartadas", stacklevel=2)
+    relative = values < 0
+    if relative.any():
+        # -1 is the last vertex defined before the face
+        before = np.repeat(np.broadcast_to(n_vertices, counts.shape), counts)
+        values = np.where(relative, values + before, values - 1)
+    else:
+        values -= 1
+    starts = np.cumsum(counts) - counts
+    return triangulate(values, starts, counts)
+
+
+def triangulate(indices, starts, counts):
+    """Fan-triangulate flat polygon indices; returns an (N, 3) int32 array"""
+    valid = counts >= 3
+    starts, counts = starts[valid], counts[valid]
+    n_tris = counts - 2
+    first = np.repeat(starts, n_tris)
+    # k-th triangle of a polygon uses corners (0, k + 1, k + 2)
+    k = np.arange(n_tris.sum()) - np.repeat(np.cumsum(n_tris) - n_tris, n_tris)
+    tris = np.stack([indices[first], indices[first + k + 1], indices[first + k + 2]], axis=1)
+    return tris.astype(np.int32)
+
+
+def _parse_block(block, n_vertices, default_color=DEFAULT_COLOR):
+    """(vertices, faces) of a block of whole OBJ lines; n_vertices were defined in earlier blocks"""
+    lines = block.splitlines()
+    if b"#" in block:
+        # Trailing comments ("f 1 2 3 # lid") would stop the bulk number parsing
+        lines = [line.split(b"#", 1)[0] for line in lines]
+    vertices = _parse_vertices(_split_records(lines, b"v "), default_color)
+    face_records = _split_records(lines, b"f ")
+    before = n_vertices
+    if any(b"-" in r for r in face_records):
+        # Relative indices need the vertex count at each face line, not at the end of the block
+        v_lines = [i for i, line in enumerate(lines) if line.startswith(b"v ")]
+        f_lines = [i for i, line in enumerate(lines) if line.startswith(b"f ")]
+        before = n_vertices + np.searchsorted(v_lines, f_lines)
+    return vertices, _parse_faces(face_records, before)
+
+
+def _blocks(f, chunk_size):
+    """chunk_size-ish pieces of a binary file, cut after the last newline"""
+    rest = b""
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            if rest:
+                yield rest
+            return
+        block = rest + block
+        cut = block.rfind(b"\n") + 1
+        rest = block[cut:]
+        if cut:
+            yield block[:cut]
+
+
+def print_progress(name, done, total, n_vertices, n_faces, seconds):
+    print(f"   {name}: {100 * done / max(total, 1):5.1f}%  {done / 1e6:.0f}/{total / 1e6:.0f} MB  "
+          f"{done / 1e6 / max(seconds, 1e-9):.1f} MB/s  {n_vertices:,} v  {n_faces:,} f", flush=True)
+
+
+def iter_obj_chunks(obj_path, chunk_size=CHUNK_SIZE, default_color=DEFAULT_COLOR, progress=None):
+    """Parse an OBJ one block at a time; yields (vertices, faces) per block.
+
+    Face indices are absolute and 0-based. progress=True prints progress
+    and throughput every PROGRESS_INTERVAL seconds; a callable gets the
+    print_progress arguments instead.
+    """
+    if progress is True:
+        progress = print_progress
+    name = os.path.basename(obj_path)
+    total = os.path.getsize(obj_path)
+    start = last = time.perf_counter()
+    n_vertices = n_faces = 0
+    with open(obj_path, "rb") as f:
+        for block in _blocks(f, chunk_size):
+            vertices, faces = _parse_block(block, n_vertices, default_color)
+            n_vertices += len(vertices)
+            n_faces += len(faces)
+            yield vertices, faces
+            now = time.perf_counter()
+            if progress and now - last >= PROGRESS_INTERVAL:
+                progress(name, f.tell(), total, n_vertices, n_faces, now - start)
+                last = now
+    if progress:
+        progress(name, total, total, n_vertices, n_faces, time.perf_counter() - start)
+
+
+def read_obj(obj_path, default_color=DEFAULT_COLOR, chunk_size=CHUNK_SIZE, progress=None):
+    """Read an OBJ with optional per-vertex colours into (vertices, faces) arrays"""
+    vertices = GrowableArray(VERTEX_DTYPE)
+    faces = GrowableArray(np.int32, (3,))
+    for v, fc in iter_obj_chunks(obj_path, chunk_size, default_color, progress):
+        vertices.append(v)
+        faces.append(fc)
+    return vertices.view(), faces.view()
+
+
+def ply_header(n_vertices, n_faces, binary=True):
+    """Build the PLY header used by every file written by the project"""
+    fmt = "binary_little_endian" if binary else "ascii"
+    return (
+        "ply\n"
+        f"format {fmt} 1.0\n"
+        f"element vertex {n_vertices}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        "property uchar red\n"
+        "property uchar green\n"
+        "property uchar blue\n"
+        f"element face {n_faces}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    ).encode("ascii")
+
+
+def encode_vertices(vertices, binary=True):
+    """Bytes of the PLY vertex section for these rows"""
+    if binary:
+        return vertices.tobytes()
+    # One %-format over the whole table is much faster than np.savetxt
+    table = np.empty((len(vertices), 6), dtype=np.float64)
+    for i, name in enumerate(VERTEX_DTYPE.names):
+        table[:, i] = vertices[name]
+    return (("%.8g %.8g %.8g %d %d %d\n" * len(table)) % tuple(table.ravel())).encode("ascii")
+
+
+def encode_faces(faces, binary=True):
+    """Bytes of the PLY face section for these triangles"""
+    if binary:
+        packed = np.empty(len(faces), dtype=FACE_DTYPE)
+        packed["count"] = 3
+        packed["indices"] = faces
+        return packed.tobytes()
+    return (("3 %d %d %d\n" * len(faces)) % tuple(faces.ravel().tolist())).encode("ascii")
+
+
+def write_ply(ply_path, vertices, faces, binary=True):
+    """Write vertices (VERTEX_DTYPE) and triangles to a PLY file, WRITE_ROWS rows at a time.
+
+    Extra vertex properties (e.g. alpha of a read_ply mesh) are dropped.
+    """
+    vertices = np.asarray(vertices)
+    if vertices.dtype.names:
+        vertices = vertices[list(VERTEX_DTYPE.names)]
+    vertices = vertices.astype(VERTEX_DTYPE, copy=False)
+    faces = np.asarray(faces, dtype=np.int32).reshape(-1, 3)
+
+    with open(ply_path, "wb") as f:
+        f.write(ply_header(len(vertices), len(faces), binary))
+        for i in range(0, len(vertices), WRITE_ROWS):
+            f.write(encode_vertices(vertices[i:i + WRITE_ROWS], binary))
+        for i in range(0, len(faces), WRITE_ROWS):
+            f.write(encode_faces(faces[i:i + WRITE_ROWS], binary))
+
+
+def stream_obj_to_ply(obj_path, ply_path, binary=True, chunk_size=CHUNK_SIZE, progress=None):
+    """Convert through temp files instead of in-memory arrays: memory stays around chunk_size.
+
+    First pass: every block is encoded straight into a vertex and a face
+    spill file next to ply_path. Second pass: the header with the final
+    counts, then both spill files copied behind it.
+    """
+    out_dir = os.path.dirname(os.path.abspath(ply_path))
+    n_vertices = n_faces = 0
+    with tempfile.TemporaryFile(dir=out_dir) as v_spill, tempfile.TemporaryFile(dir=out_dir) as f_spill:
+        for vertices, faces in iter_obj_chunks(obj_path, chunk_size, progress=progress):
+            v_spill.write(encode_vertices(vertices, binary))
+            f_spill.write(encode_faces(faces, binary))
+            n_vertices += len(vertices)
+            n_faces += len(faces)
+        with open(ply_path, "wb") as f:
+            f.write(ply_header(n_vertices, n_faces, binary))
+            for spill in (v_spill, f_spill):
+                spill.seek(0)
+                shutil.copyfileobj(spill, f, chunk_size)
+    return n_vertices, n_faces
+
+
+def convert_obj_with_vertex_colors_to_ply(obj_path, ply_path, binary=True, verbose=True, spill=False,
+                                          chunk_size=CHUNK_SIZE, progress=None):
+    """Convert an OBJ with vertex colours to PLY (binary_little_endian by default).
+
+    The OBJ is parsed in blocks of chunk_size bytes into NumPy buffers
+    (peak memory about twice the output size); spill=True goes through
+    temp files instead (see stream_obj_to_ply) for scans that do not fit.
+    """
+    if spill:
+        n_vertices, n_faces = stream_obj_to_ply(obj_path, ply_path, binary, chunk_size, progress)
+    else:
+        vertices, faces = read_obj(obj_path, chunk_size=chunk_size, progress=progress)
+        write_ply(ply_path, vertices, faces, binary=binary)
+        n_vertices, n_faces = len(vertices), len(faces)
+    if verbose:
+        print(f"✅ {os.path.basename(obj_path)} → {os.path.basename(ply_path)}")
+    return n_vertices, n_faces
@@ -0,0 +1,209 @@
+import numpy as np
+
+# Below this many candidate/object pairs SpatialHash.first_free skips the cell lookup
+BRUTE_FORCE_PAIRS = 1 << 16
+
+
+class PlacementError(RuntimeError):
+    """Not every object could be placed without overlap"""
+
+    def __init__(self, message, positions=None, placed=None):
+        super().__init__(message)
+        self.positions = positions    # (N, 3) array, rows of unplaced objects are NaN
+        self.placed = placed          # (N,) bool mask
+
+
+def footprint_radius(mesh, scale=1.0, upright=True):
+    """Radius of the circle that contains the object seen from above.
+
+    upright=True uses the XY extent of the bounding box (object only rotates
+    around Z); otherwise the full 3D half-diagonal, valid for any rotation.
+    mesh may also be the (lo, hi) corners of the box itself.
+    """
+    lo, hi = mesh.bounds() if hasattr(mesh, "bounds") else mesh
+    extent = (np.asarray(hi, dtype=float) - np.asarray(lo, dtype=float)) * np.asarray(scale, dtype=float)
+    if upright:
+        extent = extent[:2]
+    return 0.5 * float(np.linalg.norm(extent))
+
+
+class SpatialHash:
+    """Uniform grid over the XY plane for incremental neighbour queries.
+
+    With a cell size of at least 2 * max_radius + gap, every object that can
+    collide with a new one lies in the 3x3 cells around it.
+    """
+
+    def __init__(self, cell_size, capacity):
+        self.cell_size = float(cell_size)
+        self.points = np.empty((capacity, 2))
+        self.radii = np.empty(capacity)
+        self.count = 0
+        self.cells = {}
+
+    def _cell(self, p):
+        return int(np.floor(p[0] / self.cell_size)), int(np.floor(p[1] / self.cell_size))
+
+    def insert(self, p, r):
+        idx = self.count
+        self.points[idx] = p[:2]
+        self.radii[idx] = r
+        self.count += 1
+        self.cells.setdefault(self._cell(p), []).append(idx)
+        return idx
+
+    def neighbours(self, p):
+        cx, cy = self._cell(p)
+        found = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                found.extend(self.cells.get((cx + dx, cy + dy), ()))
+        return found
+
+    def first_free(self, candidates, r, gap=0.0):
+        """Index of the first candidate (K, 2) that overlaps nothing, or -1"""
+        if len(candidates) == 0:
+            return -1
+        if self.count * len(candidates) <= BRUTE_FORCE_PAIRS:
+            # Few objects placed: testing against all of them beats gathering cells
+            d2 = np.sum((candidates[:, None, :] - self.points[:self.count][None]) ** 2, axis=2)
+            free = np.all(d2 >= (self.radii[:self.count] + r + gap) ** 2, axis=1)
+            return int(np.argmax(free)) if free.any() else -1
+        # Neighbours of all candidates at once, then one (K, M) distance test
+        cells = np.floor(candidates / self.cell_size).astype(np.int64)
+        keys = {(cx + dx, cy + dy) for cx, cy in set(map(tuple, cells.tolist()))
+                for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+        idx = [i for key in keys for i in self.cells.get(key, ())]
+        if not idx:
+            return 0
+        d2 = np.sum((candidates[:, None, :] - self.points[idx][None]) ** 2, axis=2)
+        free = np.all(d2 >= (self.radii[idx] + r + gap) ** 2, axis=1)
+        return int(np.argmax(free)) if free.any() else -1
+
+
+def _uniform(rng, low, high, size):
+    return (rng or np.random).uniform(low, high, size=size)
+
+
+def poisson_disk_positions(radii, bounds=(-2, 2, -2, 2), z=0.0, gap=0.0, k=30, dart_attempts=2000,
+                           rng=None, strict=True):
+    """Bridson Poisson-disk placement of discs with per-object radii.
+
+    Centers stay inside bounds = (xmin, xmax, ymin, ymax). Objects are
+    placed largest first; when the active list runs dry the remaining ones
+    are dart-thrown. Two discs never overlap: if an object cannot be
+    placed a PlacementError is raised (or, with strict=False, its row is NaN).
+    rng defaults to the global np.random state (seeded per scene).
+    """
+    radii = np.asarray(radii, dtype=float).reshape(-1)
+    n = len(radii)
+    positions = np.full((n, 3), np.nan)
+    placed = np.zeros(n, dtype=bool)
+    if n == 0:
+        return positions
+    xmin, xmax, ymin, ymax = bounds
+    lo, hi = np.array([xmin, ymin]), np.array([xmax, ymax])
+
+    grid = SpatialHash(2 * radii.max() + gap, n)
+    order = np.argsort(-radii, kind="stable")
+    active = []
+    queue = list(order)
+
+    # Seed point
+    first = queue.pop(0)
+    p = _uniform(rng, lo, hi, 2)
+    grid.insert(p, radii[first])
+    positions[first, :2], placed[first] = p, True
+    active.append(first)
+
+    while queue and active:
+        j = queue[0]
+        a = active[int(_uniform(rng, 0, len(active), None))]
+        # K candidates in the annulus [d, 2d] around the active object
+        d = radii[a] + radii[j] + gap
+        rho = np.sqrt(_uniform(rng, d * d, 4 * d * d, k))
+        theta = _uniform(rng, 0, 2 * np.pi, k)
+        cand = positions[a, :2] + np.stack([rho * np.cos(theta), rho * np.sin(theta)], axis=1)
+        cand = cand[np.all((cand >= lo) & (cand <= hi), axis=1)]
+        hit = grid.first_free(cand, radii[j], gap)
+        if hit < 0:
+            active.remove(a)
+            continue
+        queue.pop(0)
+        grid.insert(cand[hit], radii[j])
+        positions[j, :2], placed[j] = cand[hit], True
+        active.append(j)
+
+    # Leftovers (small objects in gaps the annulus walk did not reach)
+    for j in queue:
+        batch = 256
+        for _ in range(0, dart_attempts, batch):
+            cand = _uniform(rng, lo, hi, (batch, 2))
+            hit = grid.first_free(cand, radii[j], gap)
+            if hit >= 0:
+                grid.insert(cand[hit], radii[j])
+                positions[j, :2], placed[j] = cand[hit], True
+                break
+
+    positions[placed, 2] = z
+    if strict and not placed.all():
+        raise PlacementError(f"Solo se colocaron {placed.sum()}/{n} objetos sin traslape",
+                             positions, placed)
+    return positions
+
+
+def planogram_positions(widths, shelf_width, rows, gap=0.0, jitter=0.0, rng=None, align="left"):
+    """Shelf-row layout: facings left to right, wrapping to the next row when full.
+
+    widths are the X extents of the facings, rows a list of (y, z) per shelf
+    row. Positions never overlap by construction (jitter is capped at gap / 2);
+    raises PlacementError when the facings do not fit on the rows.
+    """
+    widths = np.asarray(widths, dtype=float).reshape(-1)
+    n = len(widths)
+    positions = np.full((n, 3), np.nan)
+    placed = np.zeros(n, dtype=bool)
+    row, cursor = 0, 0.0
+    row_start = 0
+    rows = list(rows)
+
+    def finish_row(start, stop, used):
+        # Center (or keep left-aligned) the facings of a completed row
+        if align == "center" and stop > start:
+            positions[start:stop, 0] += (shelf_width - used) / 2
+
+    for i, w in enumerate(widths):
+        if w > shelf_width:
+            break
+        if cursor + w > shelf_width + 1e-9:
+            finish_row(row_start, i, cursor - gap)
+            row, cursor, row_start = row + 1, 0.0, i
+        if row >= len(rows):
+            break
+        y, z = rows[row]
+        positions[i] = (-shelf_width / 2 + cursor + w / 2, y, z)
+        placed[i] = True
+        cursor += w + gap
+    else:
+        finish_row(row_start, n, cursor - gap)
+
+    if not placed.all():
+        raise PlacementError(f"Solo caben {placed.sum()}/{n} frentes en {len(rows)} filas",
+                             positions, placed)
+    if jitter and gap > 0:
+        amount = min(jitter, gap / 2)
+        # Kept on the shelf: an end facing moved outwards is clipped back, never past its neighbour
+        half = (shelf_width - widths) / 2
+        positions[:, 0] = np.clip(positions[:, 0] + _uniform(rng, -amount, amount, n), -half, half)
+    return positions
+
+
+def min_clearance(positions, radii):
+    """Smallest (distance - r_i - r_j) over all pairs; >= 0 means no overlap"""
+    p = np.asarray(positions, dtype=float)[:, :2]
+    r = np.asarray(radii, dtype=float)
+    if len(p) < 2:
+        return np.inf
+    d = np.sqrt(((p[:, None] - p[None]) ** 2).sum(-1)) - (r[:, None] + r[None])
+    np.fill_diagonal(d, np.inf)
+    return float(d.min())
@@ -3,14 +3,62 @@ import os
 import numpy as np
 from mathutils import Matrix, Euler
 import cv2
+import time
+from scene_pool import ScenePool
+from mesh_store import load_objects
+from render_plan import configure_renderer, split_frames, write_frame_hdf5
+from async_writer import AsyncWriter, WriterSettings, write_png
+from functools import partial
+from annotation import (colorize_segmentation, segmentation_to_gray, category_lut, frame_annotations,
+                        write_yolo, CocoWriter)
+from color_stage import apply_color_mode
+from visibility import box_corners, sample_visible_poses, segmap_visible, CullingStats
+from mesh_lod import select_lods
+from material_registry import MaterialRegistry
+from scene_planner import ScenePlan, apply_scene, LAYOUTS, shelf_positions, sample_eyes, look_at
+from telemetry import configure_telemetry, telemetry_name, stage, timed, count, add_bytes, read_records, report
+from launcher import generator_args, apply_thread_budget, seed_scene, scene_complete, write_scene_manifest
+
+# --scenes / --master-seed / --threads / --output-dir (see launcher.py)
+args = generator_args(default_scenes="0-9", default_output="output_ply_scenes")
 
 # Initialize BlenderProc
 bproc.init()
+apply_thread_budget(bproc, args.threads)
+materials = MaterialRegistry(bproc)
 
 # Configuration
 ply_folder = os.path.join(os.path.dirname(__file__), "../ply")
-output_base_dir = "output_ply_scenes"
+output_base_dir = args.output_dir
+# Load every PLY once and only re-pose it per scene (False: reload each scene)
+USE_SCENE_POOL = True
+# Object layout: "grid" (3 columns) or "planogram" (shelf rows, see scene_planner.LAYOUTS; needs USE_SCENE_POOL)
+LAYOUT = "grid"
+if LAYOUT == "planogram" and not USE_SCENE_POOL:
+    raise SystemExit("LAYOUT = 'planogram' necesita USE_SCENE_POOL = True")
+# Encode PNG/HDF5 in background threads while the next scene renders
+ASYNC_WRITE = True
+WRITER_SETTINGS = WriterSettings(png_compression=3, hdf5_compression="gzip", hdf5_compression_opts=4)
+# Render quality/speed (see render_plan.RENDER_PRESETS); --preset overrides it
+RENDER_PRESET = "balanced"
+# Colour convention of the RGB PNGs (see color_stage.COLOR_MODES)
+COLOR_MODE = "raw"
+# Resample camera poses that see fewer than MIN_VISIBLE_PRODUCTS boxes (projected PLY bounds),
+# and drop rendered frames whose segmap shows fewer products with MIN_SEGMAP_PIXELS pixels
+CULLING = True
+MIN_VISIBLE_PRODUCTS = 3
+MIN_VISIBLE_AREA_PX = 400
+MIN_SEGMAP_PIXELS = 400
+# Simplified meshes (mesh_lod.py) for products that stay small on screen in every camera pose
+USE_LODS = True
+# COCO (coco.json per shard) and YOLO (rgb_XXX.txt per frame) labels from the in-memory segmaps
+ANNOTATE = True
+coco_name = "coco.json" if args.shard_id is None else f"coco_shard{args.shard_id:03d}.json"
+coco = CocoWriter(os.path.join(output_base_dir, coco_name)) if ANNOTATE else None
 os.makedirs(output_base_dir, exist_ok=True)
+# Per-scene stage times, frames, bytes and peak RSS (summary: python telemetry.py <output_dir>)
+telemetry = configure_telemetry(os.path.join(output_base_dir, telemetry_name(args.shard_id)), args.shard_id,
+                                args.profile)
 
 # Create base plane (corrected implementation)
 def create_plane():
@@ -22,30 +70,10 @@ def create_plane():
     plane.enable_rigidbody(False)  # Ensure it doesn't interfere physically
     return plane
 
-# Vertex color material (verified working)
-def create_vertex_color_material(name="vertex_color_mat"):
-    mat = bproc.material.create(name)
-    nodes = mat.blender_obj.node_tree.nodes
-    links = mat.blender_obj.node_tree.links
-    
-    # Clear default nodes
-    for node in nodes:
-        nodes.remove(node)
-    
-    # Create essential nodes
-    output = nodes.new(type='ShaderNodeOutputMaterial')
-    bsdf = nodes.new(type='ShaderNodeBsdfPrincipled')
-    vcol = nodes.new(type='ShaderNodeVertexColor')
-    vcol.layer_name = "Col"  # Standard PLY color layer
-    
-    # Connect nodes
-    links.new(vcol.outputs['Color'], bsdf.inputs['Base Color'])
-    links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
-    
-    # Optimized material settings
-    bsdf.inputs['Roughness'].default_value = 0.4
-    bsdf.inputs['Metallic'].default_value = 0.0
-    return mat
+# Vertex color material, built once and shared by every object and scene
+@timed("material")
+def create_vertex_color_material():
+    return materials.vertex_color(roughness=0.4, metallic=0.0)
 
 # Load PLY objects with proper spacing
 def load_ply_objects():
@@ -55,7 +83,8 @@ def load_ply_objects():
     
     for idx, fname in enumerate(ply_files):
         path = os.path.join(ply_folder, fname)
-        objs = bproc.loader.load_obj(path)
+        with stage("asset_load"):
+            objs = load_objects(bproc, path)
         
         for obj in objs:
             # Grid positioning (3 columns)
@@ -82,6 +111,50 @@ def load_ply_objects():
     
     return objects
 
+# Pooled variant of load_ply_objects: same layout, no reloading
+# The cameras are sampled from the bounding boxes of the layout (resampled until enough products
+# are in view) and give each object the LOD matching its size on screen
+def pose_ply_objects(pool, num_angles=5, culling=None):
+    names = pool.names
+    with stage("placement"):
+        if LAYOUT == "planogram":
+            # Upright facings in shelf rows, facing the cameras
+            spec = LAYOUTS["planogram"]
+            scale = [spec["scale"]] * 3
+            locations, _ = shelf_positions(np.random, [pool.bounds(name) for name in names], spec)
+            rotations = np.zeros((len(names), 3))
+        else:
+            scale = [0.7, 0.7, 0.7]
+            locations, rotations = [], []
+            for idx in range(len(names)):
+                # Grid positioning (3 columns)
+                row = idx // 3
+                col = idx % 3
+                base_pos = np.array([col * 2.5 - 2.5, row * 2.5 - 2.5, 0])
+                locations.append(base_pos + np.random.uniform(-0.3, 0.3, 3))
+                rotations.append(np.random.uniform(0, 2*np.pi, 3))
+        boxes = np.array([box_corners(pool.bounds(name), locations[i], rotations[i], scale)
+                          for i, name in enumerate(names)])
+
+    with stage("camera_poses"):
+        camera_poses = sample_cameras(num_angles, boxes, culling)
+        lods = np.zeros(len(names), dtype=int)
+        if USE_LODS:
+            lods = select_lods(boxes, camera_poses, *camera_intrinsics())
+
+    objects = []
+    with stage("pose_objects"):
+        for idx, name in enumerate(names):
+            objects.extend(pool.place(
+                name,
+                locations[idx],
+                rotation=rotations[idx],
+                scale=scale,
+                category_id=idx + 1,
+                lod=lods[idx],
+            ))
+    return objects, boxes, camera_poses
+
 # Lighting setup
 def setup_lights():
     # Key light
@@ -97,73 +170,186 @@ def setup_lights():
     point.set_energy(2)
 
 # Camera setup
-def setup_cameras():
-    for _ in range(5):
-        location = bproc.sampler.sphere([0, 0, 0], radius=8, mode="SURFACE")
-        rotation = bproc.camera.rotation_from_forward_vec(-np.array(location))
-        bproc.camera.add_camera_pose(Matrix.Translation(location) @ Matrix(rotation).to_4x4())
+def camera_intrinsics():
+    # K matrix and (width, height) of the render camera
+    K = np.array(bproc.camera.get_intrinsics_as_K_matrix())
+    return K, (int(round(2 * K[0, 2])), int(round(2 * K[1, 2])))
+
+def sample_camera(i, num_angles=5):
+    if LAYOUT == "planogram":
+        # In front of the shelf instead of all around it
+        return look_at(*sample_eyes(np.random, [i], num_angles, LAYOUTS["planogram"]))[0]
+    location = bproc.sampler.sphere([0, 0, 0], radius=8, mode="SURFACE")
+    rotation = bproc.camera.rotation_from_forward_vec(-np.array(location))
+    return Matrix.Translation(location) @ Matrix(rotation).to_4x4()
+
+# With boxes (world corners of the products) every pose is resampled until it sees
+# at least MIN_VISIBLE_PRODUCTS of them
+def sample_cameras(num_angles=5, boxes=None, stats=None):
+    if boxes is None or not CULLING:
+        return [sample_camera(i, num_angles) for i in range(num_angles)]
+    K, resolution = camera_intrinsics()
+    return sample_visible_poses(lambda i: sample_camera(i, num_angles), num_angles, boxes, K, resolution,
+                                min_visible=MIN_VISIBLE_PRODUCTS, min_area=MIN_VISIBLE_AREA_PX, stats=stats)
+
+def setup_cameras(camera_poses):
+    for pose in camera_poses:
+        bproc.camera.add_camera_pose(pose)
 
 # Render settings
 def configure_render():
-    bproc.renderer.set_output_format("PNG")
-    bproc.renderer.enable_segmentation_output(map_by="instance")
-    bproc.renderer.set_max_amount_of_samples(100)
-    bproc.renderer.set_light_bounces(diffuse_bounces=3, glossy_bounces=3)
-
-# Save outputs
-def save_outputs(data, output_dir):
-    # HDF5
-    bproc.writer.write_hdf5(output_dir, data)
+    # Applied once; later calls with the same settings are no-ops
+    # category_id segmaps give the class of every instance (0 for the plane)
+    return configure_renderer(bproc, preset=args.preset or RENDER_PRESET,
+                              map_by=["instance", "category_id"], default_values={"category_id": 0})
+
+# Save the outputs of one frame (runs in the background writer)
+def save_frame_outputs(output_dir, i, frame, settings=WRITER_SETTINGS, scene=None):
+    # HDF5, same {i}.hdf5 naming as bproc.writer.write_hdf5
+    with stage("write_hdf5", scene):
+        write_frame_hdf5(output_dir, frame, version=getattr(bproc, "__version__", None),
+                         filename=f"{i}.hdf5", **settings.hdf5_kwargs())
     
-    # RGB images
-    for i, img in enumerate(data["colors"]):
-        img_8bit = (np.clip(img, 0, 1) * 255).astype(np.uint8)
-        img_bgr = cv2.cvtColor(img_8bit, cv2.COLOR_RGB2BGR)
-        cv2.imwrite(os.path.join(output_dir, f"rgb_{i:03d}.png"), img_bgr)
+    # RGB image (labels-only runs have no colours)
+    if "colors" in frame:
+        with stage("write_rgb", scene):
+            img_bgr = apply_color_mode(frame["colors"], COLOR_MODE, bgr=True)
+            write_png(os.path.join(output_dir, f"rgb_{i:03d}.png"), img_bgr, settings)
     
     # Segmentation maps
-    for i, seg in enumerate(data["instance_segmaps"]):
+    seg = frame["instance_segmaps"]
+    with stage("write_segmentation", scene):
         # Grayscale
-        seg_vis = (seg.astype(np.float32) / seg.max() * 255).astype(np.uint8)
-        cv2.imwrite(os.path.join(output_dir, f"segmentation_{i:03d}.png"), seg_vis)
+        write_png(os.path.join(output_dir, f"segmentation_{i:03d}.png"), segmentation_to_gray(seg), settings)
         
         # Colored
-        COLORMAP = np.array([
-            [230, 25, 75], [60, 180, 75], [255, 225, 25], [0, 130, 200], [245, 130, 48],
-            [145, 30, 180], [70, 240, 240], [240, 50, 230], [210, 245, 60], [250, 190, 190],
-            [0, 128, 128], [230, 190, 255], [170, 110, 40], [255, 250, 200], [128, 0, 0],
-            [170, 255, 195], [128, 128, 0], [255, 215, 180], [0, 0, 128], [128, 128, 128]
-        ], dtype=np.uint8)
-        
-        seg_colored = np.zeros((*seg.shape, 3), dtype=np.uint8)
-        for instance_id in np.unique(seg):
-            if instance_id == 0:
-                continue
-            seg_colored[seg == instance_id] = COLORMAP[instance_id % len(COLORMAP)]
-        cv2.imwrite(os.path.join(output_dir, f"segmentation_colored_{i:03d}.png"), seg_colored)
+        write_png(os.path.join(output_dir, f"segmentation_colored_{i:03d}.png"), colorize_segmentation(seg),
+                  settings)
+
+    # Detection labels
+    if coco is not None:
+        with stage("annotate", scene):
+            cats = category_lut(seg, frame.get("instance_attribute_maps"), frame.get("category_id_segmaps"))
+            annotations = frame_annotations(seg, cats)
+            h, w = seg.shape
+            write_yolo(os.path.join(output_dir, f"rgb_{i:03d}.txt"), annotations, w, h)
+            coco.add_frame(os.path.relpath(os.path.join(output_dir, f"rgb_{i:03d}.png"), output_base_dir),
+                           w, h, annotations)
+    count("frames", 1, scene)
+    add_bytes([os.path.join(output_dir, name) for name in (f"{i}.hdf5", f"rgb_{i:03d}.png", f"rgb_{i:03d}.txt",
+               f"segmentation_{i:03d}.png", f"segmentation_colored_{i:03d}.png")], scene)
+
+# Save outputs: queue one job per frame, returns the futures (or None when synchronous)
+# Frames for which keep_frame(frame) is False are not written; the others keep their camera index
+def save_outputs(data, output_dir, writer=None, scene=None, keep_frame=None):
+    frames = []
+    for i, frame in enumerate(split_frames(data, len(data["instance_segmaps"]))):
+        if labels_only:
+            frame.pop("colors", None)
+        if keep_frame is None or keep_frame(frame):
+            frames.append((i, frame))
+    if writer is None:
+        for i, frame in frames:
+            save_frame_outputs(output_dir, i, frame, scene=scene)
+        return []
+    return [writer.submit(save_frame_outputs, output_dir, i, frame, scene=scene) for i, frame in frames]
+
+# Precomputed layouts (python scene_planner.py plan.npz --layout grid); they carry their own seeds
+# and are replayed on the pooled objects
+plan = ScenePlan(args.plan) if args.plan else None
+if plan is not None:
+    args.master_seed = plan.meta["master_seed"]
 
 # Main loop
-for scene_num in range(10):
-    if scene_num > 0:
+if USE_SCENE_POOL or plan is not None:
+    # Plane, lights and assets are created once for the whole run
+    create_plane()
+    setup_lights()
+    with stage("asset_load"):
+        pool = ScenePool(bproc, ply_folder, material_factory=create_vertex_color_material).load()
+
+writer = AsyncWriter(max_pending=16, workers=4) if ASYNC_WRITE else None
+culling = CullingStats()
+# Before the first scene: the LOD choice needs the camera resolution of the preset
+labels_only = configure_render()["labels_only"]
+
+first_scene = True
+for scene_num in args.scenes:
+    output_dir = os.path.join(output_base_dir, f"scene_{scene_num:03d}")
+    if scene_complete(output_dir):
+        print(f"\nScene {scene_num} already complete, skipping")
+        continue
+    scene_start = time.perf_counter()
+    if USE_SCENE_POOL or plan is not None:
+        pool.begin_scene()
+    elif not first_scene:
         bproc.clean_up()
+    materials.collect_garbage()
+    first_scene = False
     
     print(f"\nGenerating scene {scene_num}...")
+    # Own seed per scene: any scene can be regenerated on its own
+    seed = seed_scene(args.master_seed, scene_num)
+    telemetry.begin_scene(scene_num, seed=seed)
     
-    # Scene setup
-    create_plane()
-    objects = load_ply_objects()
-    setup_lights()
-    setup_cameras()
-    configure_render()
+    # Scene setup (cameras from the layout: enough products in view, and the LOD of each object)
+    boxes = None
+    if plan is not None:
+        with stage("pose_objects"):
+            objects, camera_poses = apply_scene(pool, plan, scene_num)
+    elif USE_SCENE_POOL:
+        objects, boxes, camera_poses = pose_ply_objects(pool, 5, culling)
+    else:
+        with stage("camera_poses"):
+            camera_poses = sample_cameras()
+        with stage("placement"):
+            create_plane()
+            objects = load_ply_objects()
+            setup_lights()
+    setup_cameras(camera_poses)
+    min_products = min(MIN_VISIBLE_PRODUCTS, len(boxes) if boxes is not None else len(objects))
+    print(f"Scene setup: {time.perf_counter() - scene_start:.2f}s")
+
+    def keep_frame(frame, min_products=min_products):
+        # Second check on the rendered segmap: enough products with enough visible pixels
+        seg = frame["instance_segmaps"]
+        cats = category_lut(seg, frame.get("instance_attribute_maps"), frame.get("category_id_segmaps"))
+        keep = segmap_visible(seg, MIN_SEGMAP_PIXELS, cats) >= min_products
+        culling.dropped += not keep
+        return keep
     
     # Render
-    data = bproc.renderer.render()
+    render_start = time.perf_counter()
+    with stage("render"):
+        data = bproc.renderer.render()
+    culling.add_render(len(camera_poses), time.perf_counter() - render_start)
+    telemetry.end_profile(scene_num)
     
     # Save
-    output_dir = os.path.join(output_base_dir, f"scene_{scene_num:03d}")
     os.makedirs(output_dir, exist_ok=True)
-    save_outputs(data, output_dir)
+    dropped_before = culling.dropped
+    futures = save_outputs(data, output_dir, writer, scene=scene_num, keep_frame=keep_frame if CULLING else None)
+    kept_frames = len(camera_poses) - (culling.dropped - dropped_before)
+    # The manifest (and the telemetry record) are written once every file of the scene is on disk
+    def finish_scene(output_dir=output_dir, scene_num=scene_num, seed=seed, kept_frames=kept_frames):
+        # kept_frames 0 (every frame culled) is still a finished scene with no files
+        write_scene_manifest(output_dir, scene_num, seed, extra={"kept_frames": kept_frames})
+        telemetry.end_scene(scene_num)
+    if writer is not None:
+        writer.after(futures, finish_scene, label=f"manifiesto de la escena {scene_num} (se volverá a generar)")
+    else:
+        finish_scene()
     
-    print(f"Scene {scene_num} saved to {output_dir}")
+    print(f"Scene {scene_num} queued for {output_dir}")
+
+if writer is not None:
+    writer.close()
+if coco is not None and coco.close():
+    print(f"COCO annotations: {coco.path}")
+telemetry.close()
+print(materials.summary())
+print(report(read_records([telemetry.path])))
+if CULLING:
+    print(culling.summary())
 
 print("\nGeneration completed successfully!")
\ No newline at end of file
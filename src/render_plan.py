@@ -0,0 +1,236 @@
+import os
+import csv
+import json
+import time
+from concurrent.futures import Future
+import numpy as np
+
+from telemetry import stage
+
+# Named quality/speed trade-offs; every generator picks one (see --preset of launcher.generator_args).
+# noise_threshold drives Cycles' adaptive sampling (0 disables it), samples is then only the cap.
+RENDER_PRESETS = {
+    "fast": dict(samples=32, noise_threshold=0.1, denoiser="INTEL", diffuse_bounces=1, glossy_bounces=1,
+                 max_bounces=2, tile_size=2048, resolution=(512, 512), labels_only=False),
+    "balanced": dict(samples=100, noise_threshold=0.05, denoiser="INTEL", diffuse_bounces=3, glossy_bounces=3,
+                     max_bounces=6, tile_size=2048, resolution=(512, 512), labels_only=False),
+    "final": dict(samples=512, noise_threshold=0.01, denoiser="INTEL", diffuse_bounces=4, glossy_bounces=4,
+                  max_bounces=12, tile_size=2048, resolution=(1024, 1024), labels_only=False),
+    # Segmentation / labels only: one sample without any bounce, colours are not written
+    "labels": dict(samples=1, noise_threshold=0.0, denoiser=None, diffuse_bounces=0, glossy_bounces=0,
+                   max_bounces=0, tile_size=2048, resolution=(512, 512), labels_only=True),
+}
+DEFAULT_PRESET = "balanced"
+
+# Renderer settings only need to be applied once per process
+_configured = {}
+
+
+def render_settings(preset=DEFAULT_PRESET, **overrides):
+    """Settings of a preset with the given (non-None) values replaced"""
+    if preset not in RENDER_PRESETS:
+        raise ValueError(f"Preset de render desconocido: {preset} (opciones: {', '.join(RENDER_PRESETS)})")
+    settings = dict(RENDER_PRESETS[preset])
+    for key, value in overrides.items():
+        if key not in settings:
+            raise ValueError(f"Ajuste de render desconocido: {key}")
+        if value is not None:
+            settings[key] = value
+    return settings
+
+
+def set_tile_size(tile_size):
+    """Cycles tile size (Blender 3+: tile_size; older: tile_x / tile_y); no-op outside Blender"""
+    try:
+        import bpy
+    except ImportError:
+        return
+    scene = bpy.context.scene
+    if hasattr(scene.cycles, "tile_size"):
+        scene.cycles.use_auto_tile = True
+        scene.cycles.tile_size = tile_size
+    else:
+        scene.render.tile_x = scene.render.tile_y = tile_size
+
+
+def configure_renderer(bproc, samples=None, diffuse_bounces=None, glossy_bounces=None, map_by="instance",
+                       default_values=None, preset=DEFAULT_PRESET, **overrides):
+    """Apply output format, segmentation output and the settings of a render preset once.
+
+    samples / bounces and any other preset key passed as keyword override
+    the preset. default_values fills attributes (e.g. category_id) of
+    objects that lack them. Returns the settings in use.
+    """
+    settings = render_settings(preset, samples=samples, diffuse_bounces=diffuse_bounces,
+                               glossy_bounces=glossy_bounces, **overrides)
+    key = (tuple(sorted(settings.items())), map_by if isinstance(map_by, str) else tuple(map_by))
+    if _configured.get(id(bproc)) == key:
+        return settings
+    if id(bproc) not in _configured:
+        # enable_segmentation_output adds a render pass; calling it twice duplicates it
+        bproc.renderer.set_output_format("PNG")
+        if default_values is None:
+            bproc.renderer.enable_segmentation_output(map_by=map_by)
+        else:
+            bproc.renderer.enable_segmentation_output(map_by=map_by, default_values=default_values)
+    bproc.renderer.set_max_amount_of_samples(settings["samples"])
+    bproc.renderer.set_noise_threshold(settings["noise_threshold"])
+    bproc.renderer.set_denoiser(settings["denoiser"])
+    bproc.renderer.set_light_bounces(diffuse_bounces=settings["diffuse_bounces"],
+                                     glossy_bounces=settings["glossy_bounces"],
+                                     max_bounces=settings["max_bounces"])
+    bproc.camera.set_resolution(*settings["resolution"])
+    set_tile_size(settings["tile_size"])
+    _configured[id(bproc)] = key
+    return settings
+
+
+def register_poses(bproc, poses):
+    """Replace the current keyframes with one camera pose per frame"""
+    bproc.utility.reset_keyframes()
+    for frame, pose in enumerate(poses):
+        bproc.camera.add_camera_pose(pose, frame=frame)
+
+
+def split_frames(data, n_frames):
+    """Turn bproc's {key: [frame0, frame1, ...]} output into one dict per frame"""
+    frames = [{} for _ in range(n_frames)]
+    for key, block in data.items():
+        if isinstance(block, (list, np.ndarray)) and len(block) == n_frames:
+            for i in range(n_frames):
+                frames[i][key] = block[i]
+        else:
+            # Per-render data (e.g. empty attribute maps) is kept for every frame
+            for frame in frames:
+                frame[key] = block
+    return frames
+
+
+def write_frame_hdf5(frame_dir, frame, version=None, compression="gzip", compression_opts=None, chunks=True,
+                     filename="0.hdf5"):
+    """Write one frame as frame_dir/filename with the same keys as bproc.writer.write_hdf5"""
+    import h5py
+
+    os.makedirs(frame_dir, exist_ok=True)
+    with h5py.File(os.path.join(frame_dir, filename), "w") as f:
+        for key, value in frame.items():
+            if isinstance(value, (list, dict)):
+                if isinstance(value, dict) or (len(value) > 0 and isinstance(value[0], dict)):
+                    value = np.bytes_(json.dumps(value, default=lambda o: o.tolist()))
+                value = np.array(value)
+            if value.dtype.char == "S":
+                f.create_dataset(key, data=value, dtype=value.dtype)
+            else:
+                f.create_dataset(key, data=value, compression=compression,
+                                 compression_opts=compression_opts, chunks=chunks if value.ndim else None)
+        if version is not None:
+            f.create_dataset("blender_proc_version", data=np.bytes_(version))
+
+
+def timed_write(fn, *args, **kwargs):
+    """Run a write job and return the seconds it took (submit it to an AsyncWriter)"""
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+class FrameTimings:
+    """Per-frame setup / render / write times, appended to a CSV file.
+
+    write_s is the time spent writing the frame. With an async writer that
+    is the time in the worker (a future of timed_write), not the time to
+    queue the frame; such scenes are recorded once their writes are done.
+    """
+
+    FIELDS = ["scene", "frame", "setup_s", "render_s", "write_s"]
+
+    def __init__(self, csv_path=None):
+        self.csv_path = csv_path
+        self.rows = []
+        self._pending = []
+
+    def add_scene(self, scene_idx, setup_s, render_s, write_s):
+        """Record a scene; setup and render are shared evenly by its frames.
+
+        write_s holds seconds or futures of seconds; returns the rows recorded so far.
+        """
+        self._pending.append((scene_idx, setup_s, render_s, list(write_s)))
+        return self._record_ready()
+
+    def _record_ready(self, wait=False):
+        ready, self._pending = self._split_ready(wait)
+        rows = []
+        for scene_idx, setup_s, render_s, write_s in ready:
+            n = len(write_s)
+            rows.extend({"scene": scene_idx, "frame": i, "setup_s": setup_s / n, "render_s": render_s / n,
+                         "write_s": self._seconds(w)} for i, w in enumerate(write_s))
+        self.rows.extend(rows)
+        if self.csv_path and rows:
+            new_file = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(rows)
+        return rows
+
+    def _split_ready(self, wait):
+        ready, pending = [], []
+        for entry in self._pending:
+            done = wait or all(not isinstance(w, Future) or w.done() for w in entry[3])
+            (ready if done else pending).append(entry)
+        return ready, pending
+
+    @staticmethod
+    def _seconds(write):
+        if not isinstance(write, Future):
+            return write
+        # Failed writes are reported by the writer itself
+        return write.result() if write.exception() is None else float("nan")
+
+    def summary(self):
+        self._record_ready(wait=True)
+        if not self.rows:
+            return "Sin frames registrados"
+        cols = {k: np.array([r[k] for r in self.rows]) for k in self.FIELDS[2:]}
+        total = sum(np.nansum(c) for c in cols.values())
+        parts = "  ".join(f"{k[:-2]} {np.nanmean(c) * 1000:.0f} ms" for k, c in cols.items())
+        return f"{len(self.rows)} frames, {total / len(self.rows) * 1000:.0f} ms/frame ({parts})"
+
+
+def render_plan(bproc, poses, scene_dir, write_frame, timings=None, scene_idx=0, setup_s=0.0, keep_frame=None,
+                drop_keys=()):
+    """Render all poses of a scene in a single render() call.
+
+    write_frame(frame_dir, frame) is called for every frame, frame_dir
+    being scene_dir/frame_YY as in the original one-render-per-angle layout.
+    When it returns a future (async writes of timed_write) that future is
+    the frame's write time.
+    Frames for which keep_frame(frame) is False are not written at all;
+    drop_keys (e.g. "colors" in labels-only runs) are removed beforehand.
+    """
+    start = time.perf_counter()
+    with stage("register_poses"):
+        register_poses(bproc, poses)
+    setup_s += time.perf_counter() - start
+
+    start = time.perf_counter()
+    with stage("render"):
+        data = bproc.renderer.render()
+    render_s = time.perf_counter() - start
+
+    write_s = []
+    for angle_idx, frame in enumerate(split_frames(data, len(poses))):
+        for key in drop_keys:
+            frame.pop(key, None)
+        if keep_frame is not None and not keep_frame(frame):
+            continue
+        start = time.perf_counter()
+        frame_dir = os.path.join(scene_dir, f"frame_{angle_idx:02d}")
+        os.makedirs(frame_dir, exist_ok=True)
+        written = write_frame(frame_dir, frame)
+        write_s.append(written if isinstance(written, Future) else time.perf_counter() - start)
+
+    if timings is not None and write_s:
+        timings.add_scene(scene_idx, setup_s, render_s, write_s)
+    return data
@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+from launcher import scene_seed, parse_scene_list, format_scene_list
+from placement import poisson_disk_positions, planogram_positions, footprint_radius, PlacementError
+from visibility import box_corners_batch, default_intrinsics, sample_visible_poses
+from render_plan import RENDER_PRESETS, DEFAULT_PRESET
+
+# Bump when the arrays of a plan file change
+PLAN_VERSION = 1
+
+# Scene recipes of the generators, sampled here instead of inside Blender:
+#   spaced:    bproc_test.py (Poisson-disk layout, cameras orbiting the centre, jittered sun)
+#   grid:      ply_dataset_generator.py (3-column grid, cameras on a sphere around the origin, fixed lights)
+#   planogram: either generator with LAYOUT = "planogram" (upright facings in shelf rows along X at
+#              heights `rows` (y, z), cameras in front of the shelf at -Y)
+LAYOUTS = {
+    "spaced": dict(bounds=(-2, 2, -2, 2), min_radius=0.6, scale=1.0, num_angles=10, camera="orbit",
+                   distance=6.0, height=3.0, angle_jitter=0.2, distance_jitter=0.1, target_jitter=0.3,
+                   sun=(4.0, -4.0, 4.0), sun_jitter=1.0, sun_energy=4.0, energy_jitter=1.0),
+    "grid": dict(columns=3, spacing=2.5, jitter=0.3, scale=0.7, num_angles=5, camera="sphere", radius=8.0,
+                 sun=None),
+    "planogram": dict(shelf_width=1.6, rows=((0.0, -0.6), (0.0, 0.5), (0.0, 1.6)), gap=0.1, jitter=0.04,
+                      align="center", scale=0.5, num_angles=5, camera="front", distance=4.0, spread=0.6,
+                      height=0.5, distance_jitter=0.1, target_jitter=0.2,
+                      sun=(1.0, -4.0, 4.0), sun_jitter=1.0, sun_energy=4.0, energy_jitter=1.0),
+}
+
+# Objects that do not fit in the placement area are parked below the floor
+PARKED_Z = -100.0
+
+# Scenes whose boxes are projected together when choosing LODs
+LOD_BLOCK = 1024
+
+
+# === Cameras ===
+
+def look_at(eyes, targets, up=(0.0, 0.0, 1.0)):
+    """(N, 4, 4) camera-to-world matrices of cameras at eyes looking at targets, all at once.
+
+    Same convention as bproc.camera.rotation_from_forward_vec: the camera
+    looks down its -Z axis with +Y as close to `up` as possible.
+    """
+    eyes = np.asarray(eyes, dtype=np.float64).reshape(-1, 3)
+    forward = np.asarray(targets, dtype=np.float64).reshape(-1, 3) - eyes
+    forward /= np.linalg.norm(forward, axis=1, keepdims=True)
+    right = np.cross(forward, np.asarray(up, dtype=np.float64))
+    norm = np.linalg.norm(right, axis=1, keepdims=True)
+    # Looking straight up or down: any right vector will do
+    right = np.where(norm < 1e-8, [1.0, 0.0, 0.0], right / np.maximum(norm, 1e-12))
+    true_up = np.cross(right, forward)
+    poses = np.zeros((len(eyes), 4, 4))
+    poses[:, :3, 0], poses[:, :3, 1], poses[:, :3, 2] = right, true_up, -forward
+    poses[:, :3, 3] = eyes
+    poses[:, 3, 3] = 1.0
+    return poses
+
+
+def orbit_eyes(rng, angles, num_angles, layout):
+    """(eyes, targets) of cameras around the centre: angle i of num_angles with a little jitter"""
+    i = np.asarray(angles)
+    n = len(i)
+    jitter = layout["angle_jitter"]
+    angle = 2 * np.pi * i / num_angles + rng.uniform(-jitter, jitter, n)
+    distance = layout["distance"] * rng.uniform(1 - layout["distance_jitter"], 1 + layout["distance_jitter"], n)
+    height = layout["height"] * rng.uniform(1 - layout["distance_jitter"], 1 + layout["distance_jitter"], n)
+    eyes = np.stack([distance * np.cos(angle), distance * np.sin(angle), height], axis=1)
+    targets = np.zeros((n, 3))
+    targets[:, :2] = rng.uniform(-layout["target_jitter"], layout["target_jitter"], (n, 2))
+    return eyes, targets
+
+
+def sphere_eyes(rng, num_angles, layout):
+    """(eyes, targets) uniformly on a sphere around the origin (bproc.sampler.sphere, mode SURFACE)"""
+    direction = rng.normal(size=(num_angles, 3))
+    eyes = layout["radius"] * direction / np.linalg.norm(direction, axis=1, keepdims=True)
+    return eyes, np.zeros_like(eyes)
+
+
+def front_eyes(rng, num_angles, layout):
+    """(eyes, targets) in front of a shelf along X: cameras at -Y looking at the shelf, spread sideways"""
+    n = num_angles
+    jitter = layout["distance_jitter"]
+    x = rng.uniform(-layout["spread"], layout["spread"], n)
+    y = -layout["distance"] * rng.uniform(1 - jitter, 1 + jitter, n)
+    z = layout["height"] + rng.uniform(-jitter, jitter, n) * layout["distance"]
+    eyes = np.stack([x, y, z], axis=1)
+    targets = np.zeros((n, 3))
+    targets[:, 0] = x / 2 + rng.uniform(-layout["target_jitter"], layout["target_jitter"], n)
+    targets[:, 2] = layout["height"]
+    return eyes, targets
+
+
+def sample_eyes(rng, angles, num_angles, layout):
+    """(eyes, targets) of the given camera angles with the camera recipe of the layout"""
+    if layout["camera"] == "orbit":
+        return orbit_eyes(rng, angles, num_angles, layout)
+    if layout["camera"] == "front":
+        return front_eyes(rng, len(angles), layout)
+    return sphere_eyes(rng, len(angles), layout)
+
+
+# === Objects ===
+
+def spaced_positions(rng, radii, layout):
+    """Poisson-disk layout; objects that do not fit are parked below the floor"""
+    try:
+        return poisson_disk_positions(radii, bounds=layout["bounds"], z=0, rng=rng), 0
+    except PlacementError as e:
+        positions = e.positions
+        positions[~e.placed] = (0, 0, PARKED_Z)
+        return positions, int((~e.placed).sum())
+
+
+def shelf_positions(rng, bounds, layout):
+    """Planogram layout: upright facings in shelf rows, in a random order.
+
+    Each object stands on its row (bottom of its box at the row height);
+    objects that do not fit on the rows are parked below the floor.
+    rng may also be the np.random module (generators without a plan).
+    """
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 2, 3)
+    scale = layout["scale"]
+    widths = (bounds[:, 1, 0] - bounds[:, 0, 0]) * scale
+    order = rng.permutation(len(bounds))
+    try:
+        shelved = planogram_positions(widths[order], layout["shelf_width"], layout["rows"], layout["gap"],
+                                      layout["jitter"], rng, layout["align"])
+        parked = 0
+    except PlacementError as e:
+        shelved = e.positions
+        shelved[~e.placed] = (0, 0, PARKED_Z)
+        parked = int((~e.placed).sum())
+    positions = np.empty_like(shelved)
+    positions[order] = shelved
+    on_shelf = positions[:, 2] != PARKED_Z
+    positions[on_shelf, 2] -= bounds[on_shelf, 0, 2] * scale
+    return positions, parked
+
+
+def grid_positions(rng, n, layout):
+    idx = np.arange(n)
+    base = np.stack([idx % layout["columns"] * layout["spacing"] - layout["spacing"],
+                     idx // layout["columns"] * layout["spacing"] - layout["spacing"], np.zeros(n)], axis=1)
+    return base + rng.uniform(-layout["jitter"], layout["jitter"], (n, 3))
+
+
+# === Planning ===
+
+def asset_info(ply_folder):
+    """(names, bounds) of the PLYs of a folder, in ScenePool order; read on the CPU, no Blender"""
+    from mesh_store import load_mesh
+
+    names, bounds = [], []
+    for fname in sorted(f for f in os.listdir(ply_folder) if f.lower().endswith(".ply")):
+        names.append(os.path.splitext(fname)[0])
+        bounds.append(np.asarray(load_mesh(os.path.join(ply_folder, fname)).bounds(), dtype=np.float64))
+    return names, np.array(bounds).reshape(-1, 2, 3)
+
+
+def plan_scenes(scene_ids, names, bounds, layout="spaced", master_seed=0, num_angles=None, lods=True,
+                culling=False, min_visible=3, min_area=400, preset=DEFAULT_PRESET, lod_thresholds=None):
+    """Object poses, camera matrices and light parameters of every scene, as a dict of arrays.
+
+    Each scene draws from its own launcher.scene_seed, so any subset of
+    scenes can be planned on its own with the same result. Cameras of all
+    scenes go through one vectorized look_at; with culling, poses that see
+    fewer than min_visible boxes are resampled (sample_visible_poses), which
+    costs a projection per try. lods picks the LOD of each object from the
+    largest it gets on screen (mesh_lod.select_lods). Spaced placement is
+    still one Poisson-disk run per scene and grows with the object count
+    (bench_scene_planner.py --objects).
+    """
+    from mesh_lod import select_lods, LOD_SCREEN_PX
+
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout desconocido: {layout} (opciones: {', '.join(LAYOUTS)})")
+    spec = LAYOUTS[layout]
+    num_angles = num_angles or spec["num_angles"]
+    scene_ids = np.asarray(scene_ids, dtype=np.int64)
+    n_scenes, n_objects = len(scene_ids), len(names)
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(n_objects, 2, 3)
+    resolution = RENDER_PRESETS[preset]["resolution"]
+    K = default_intrinsics(resolution)
+    radii = np.array([max(spec.get("min_radius", 0.0), footprint_radius(b, upright=False)) for b in bounds])
+
+    seeds = np.array([scene_seed(master_seed, int(s)) for s in scene_ids], dtype=np.uint32)
+    positions = np.zeros((n_scenes, n_objects, 3))
+    rotations = np.zeros((n_scenes, n_objects, 3))
+    eyes = np.zeros((n_scenes, num_angles, 3))
+    targets = np.zeros((n_scenes, num_angles, 3))
+    sun_location = np.zeros((n_scenes, 3))
+    sun_energy = np.zeros(n_scenes)
+    parked = 0
+    rngs = []
+    for s, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        rngs.append(rng)
+        if layout == "spaced":
+            positions[s], n_parked = spaced_positions(rng, radii, spec)
+            parked += n_parked
+        elif layout == "planogram":
+            positions[s], n_parked = shelf_positions(rng, bounds, spec)
+            parked += n_parked
+        else:
+            positions[s] = grid_positions(rng, n_objects, spec)
+        if layout != "planogram":
+            # Facings stay upright and face the cameras; the other layouts tumble the objects
+            rotations[s] = rng.uniform(0, 2 * np.pi, (n_objects, 3))
+        eyes[s], targets[s] = sample_eyes(rng, np.arange(num_angles), num_angles, spec)
+        if spec["sun"] is not None:
+            sun_location[s] = np.asarray(spec["sun"]) + rng.uniform(-spec["sun_jitter"], spec["sun_jitter"], 3)
+            sun_energy[s] = spec["sun_energy"] + rng.uniform(-spec["energy_jitter"], spec["energy_jitter"])
+    cam2world = look_at(eyes.reshape(-1, 3), targets.reshape(-1, 3)).reshape(n_scenes, num_angles, 4, 4)
+
+    scale = spec["scale"]
+    levels = np.zeros((n_scenes, n_objects), dtype=np.int8)
+    corners = box_corners_batch(bounds, positions, rotations, scale) if lods or culling else None
+    if culling:
+        for s in range(n_scenes):
+            rng = rngs[s]
+            sample = lambda i, rng=rng: look_at(*sample_eyes(rng, [i], num_angles, spec))[0]
+            cam2world[s] = sample_visible_poses(sample, num_angles, corners[s], K, resolution,
+                                                min_visible=min_visible, min_area=min_area)
+    if lods:
+        # All poses of LOD_BLOCK scenes projected at once
+        for start in range(0, n_scenes, LOD_BLOCK):
+            block = slice(start, start + LOD_BLOCK)
+            levels[block] = select_lods(corners[block], cam2world[block], K, resolution,
+                                        lod_thresholds or LOD_SCREEN_PX)
+
+    plan = {
+        "scene_ids": scene_ids, "seeds": seeds, "names": np.array(names, dtype=str),
+        "positions": positions.astype(np.float32), "rotations": rotations.astype(np.float32),
+        "scales": np.full((n_scenes, n_objects), scale, dtype=np.float32), "lods": levels,
+        "cam2world": cam2world.astype(np.float32),
+    }
+    if spec["sun"] is not None:
+        plan["sun_location"] = sun_location.astype(np.float32)
+        plan["sun_energy"] = sun_energy.astype(np.float32)
+    plan["meta"] = np.array(json.dumps({
+        "version": PLAN_VERSION, "layout": layout, "master_seed": master_seed, "num_angles": num_angles,
+        "preset": preset, "resolution": list(resolution), "lods": bool(lods), "culling": bool(culling),
+        "parked_objects": parked}))
+    return plan
+
+
+def save_plan(path, plan):
+    """Compressed .npz written through a temp file"""
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, **plan)
+    os.replace(tmp_path, path)
+    return path
+
+
+# === Replay (Blender side) ===
+
+class ScenePlan:
+    """A plan file opened for replay: scene(idx) returns the arrays of one scene"""
+
+    PER_SCENE = ["seeds", "positions", "rotations", "scales", "lods", "cam2world", "sun_location", "sun_energy"]
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            self.arrays = {k: data[k] for k in data.files}
+        self.meta = json.loads(str(self.arrays.pop("meta")))
+        if self.meta["version"] != PLAN_VERSION:
+            raise ValueError(f"Plan {path}: versión {self.meta['version']}, se esperaba {PLAN_VERSION}")
+        self.path = path
+        self.names = [str(n) for n in self.arrays["names"]]
+        self._rows = {int(s): row for row, s in enumerate(self.arrays["scene_ids"])}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, scene_idx):
+        return scene_idx in self._rows
+
+    @property
+    def scene_ids(self):
+        return list(self._rows)
+
+    def scene(self, scene_idx):
+        if scene_idx not in self._rows:
+            raise KeyError(f"La escena {scene_idx} no está en el plan {self.path}")
+        row = self._rows[scene_idx]
+        return {k: self.arrays[k][row] for k in self.PER_SCENE if k in self.arrays}
+
+
+def apply_scene(pool, plan, scene_idx, material=None):
+    """Pose the pooled objects (and the sun, if planned) as planned; returns (objects, camera poses)"""
+    if plan.names != pool.names:
+        raise ValueError(f"Los assets del plan no coinciden con los de {pool.ply_folder}; vuelve a planear")
+    scene = plan.scene(scene_idx)
+    objects = []
+    for i, name in enumerate(plan.names):
+        objects.extend(pool.place(name, scene["positions"][i], rotation=scene["rotations"][i],
+                                  scale=[float(scene["scales"][i])] * 3, category_id=i + 1,
+                                  lod=int(scene["lods"][i]), material=material))
+    if "sun_location" in scene:
+        sun = pool.light(0, "SUN")
+        sun.set_location(scene["sun_location"].tolist())
+        sun.set_energy(float(scene["sun_energy"]))
+    return objects, [pose.astype(np.float64) for pose in scene["cam2world"]]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Precalcula poses de objetos, cámaras y luces de muchas escenas "
+                                                 "(sin Blender) en un archivo .npz que los generadores reproducen")
+    parser.add_argument("output", help="archivo del plan, p.ej. plan.npz")
+    parser.add_argument("--ply-folder", default="../ply")
+    parser.add_argument("--scenes", default="0-9999", help="índices de escena, p.ej. 0-9999")
+    parser.add_argument("--master-seed", type=int, default=0)
+    parser.add_argument("--layout", choices=list(LAYOUTS), default="spaced",
+                        help="spaced: bproc_test.py, grid: ply_dataset_generator.py, planogram: filas de anaquel")
+    parser.add_argument("--angles", type=int, default=None, help="poses de cámara por escena")
+    parser.add_argument("--preset", choices=list(RENDER_PRESETS), default=DEFAULT_PRESET,
+                        help="resolución usada para LODs y culling")
+    parser.add_argument("--no-lods", action="store_true")
+    parser.add_argument("--cull", action="store_true", help="remuestrea poses que ven pocos productos (más lento)")
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python scene_planner.py plan.npz --scenes 0-9999 --layout spaced
+# blenderproc run bproc_test.py --plan plan.npz --scenes 0-99
+# python scene_planner.py anaquel.npz --scenes 0-999 --layout planogram   (filas de anaquel, cualquier generador)
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    names, bounds = asset_info(args.ply_folder)
+    scenes = parse_scene_list(args.scenes)
+    plan = plan_scenes(scenes, names, bounds, args.layout, args.master_seed, args.angles, not args.no_lods,
+                       args.cull, preset=args.preset)
+    save_plan(args.output, plan)
+    print(f"Plan de {len(scenes)} escenas ({format_scene_list(scenes)}), {len(names)} assets, "
+          f"{plan['cam2world'].shape[1]} poses por escena: {args.output} "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB, {time.perf_counter() - start:.2f}s)")
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+
+from mesh_lod import lod_paths
+from mesh_store import load_mesh, load_objects
+
+
+class PooledAsset:
+    """One PLY asset: the objects loaded from disk plus its linked duplicates"""
+
+    def __init__(self, name, path, parts):
+        self.name = name
+        self.path = path
+        self.copies = [parts]   # copies[0] is the original load, the rest share its mesh data
+        self.material = None
+        self.lods = [self]      # lods[k]: asset of LOD k (see mesh_lod.py), lods[0] is this one
+
+    def ensure_copies(self, count):
+        """Create linked duplicates (shared mesh data) until `count` copies exist"""
+        while len(self.copies) < count:
+            parts = [obj.duplicate(linked=True) for obj in self.copies[0]]
+            for obj in parts:
+                obj.hide(True)
+            self.copies.append(parts)
+        return self.copies[:count]
+
+
+class ScenePool:
+    """Keeps every PLY asset resident and only re-poses it per scene.
+
+    `bproc` is passed in instead of imported so the scene logic can run
+    against a lightweight stand-in (see fake_bproc.py) without Blender.
+    """
+
+    def __init__(self, bproc, ply_folder, material_factory=None, use_lods=True):
+        self.bproc = bproc
+        self.ply_folder = ply_folder
+        self.material_factory = material_factory
+        self.use_lods = use_lods
+        self.assets = {}
+        self.lights = []
+        self._visible = []
+
+    def _load_asset(self, name, path):
+        parts = load_objects(self.bproc, path)
+        asset = PooledAsset(name, path, parts)
+        if self.material_factory is not None:
+            self.set_material(asset, self.material_factory())
+        for obj in parts:
+            obj.hide(True)
+        return asset
+
+    def load(self):
+        """Load each PLY (and its LODs, if built) exactly once; every object starts hidden"""
+        ply_files = sorted(f for f in os.listdir(self.ply_folder) if f.lower().endswith(".ply"))
+        for fname in ply_files:
+            path = os.path.join(self.ply_folder, fname)
+            name = os.path.splitext(fname)[0]
+            asset = self._load_asset(name, path)
+            if self.use_lods:
+                asset.lods.extend(self._load_asset(name, p) for p in lod_paths(path)[1:])
+            self.assets[name] = asset
+        return self
+
+    @property
+    def names(self):
+        return list(self.assets)
+
+    def set_material(self, asset, material):
+        """Assign material to an asset; linked copies share it through the mesh data"""
+        if asset.material is material:
+            return
+        for obj in asset.copies[0]:
+            if obj.get_materials():
+                obj.set_material(0, material)
+            else:
+                obj.add_material(material)
+        asset.material = material
+
+    def begin_scene(self):
+        """Hide everything that was shown in the previous scene and clear camera poses"""
+        for obj in self._visible:
+            obj.hide(True)
+        self._visible = []
+        self.bproc.utility.reset_keyframes()
+
+    def lod_count(self, name):
+        return len(self.assets[name].lods)
+
+    def place(self, name, location, rotation=(0, 0, 0), scale=None, category_id=None,
+              copy_idx=0, material=None, lod=0):
+        """Show copy `copy_idx` of asset `name` with the given pose; returns its objects.
+
+        lod picks a simplified variant (clamped to the levels available);
+        copies are counted per level.
+        """
+        lods = self.assets[name].lods
+        asset = lods[min(int(lod), len(lods) - 1)]
+        parts = asset.ensure_copies(copy_idx + 1)[copy_idx]
+        if material is not None:
+            self.set_material(asset, material)
+        for obj in parts:
+            obj.set_location(np.asarray(location, dtype=float))
+            obj.set_rotation_euler(np.asarray(rotation, dtype=float))
+            if scale is not None:
+                obj.set_scale(np.asarray(scale, dtype=float))
+            if category_id is not None:
+                obj.set_cp("category_id", category_id)
+            obj.hide(False)
+            self._visible.append(obj)
+        return parts
+
+    def bounds(self, name):
+        """(lo, hi) corners of the bounding box of asset `name` in its own frame, from the PLY vertices"""
+        return load_mesh(self.assets[name].path).bounds()
+
+    def footprint_radius(self, name, scale=1.0, upright=True):
+        """Radius of the top-down footprint of asset `name`, from its PLY bounding box"""
+        from placement import footprint_radius
+        return footprint_radius(load_mesh(self.assets[name].path), scale, upright)
+
+    def visible_objects(self):
+        return list(self._visible)
+
+    def light(self, idx=0, light_type="SUN"):
+        """Persistent light `idx`, created on first use and reused across scenes"""
+        while len(self.lights) <= idx:
+            light = self.bproc.types.Light()
+            light.set_type(light_type)
+            self.lights.append(light)
+        return self.lights[idx]
@@ -0,0 +1,310 @@
+import io
+import os
+import json
+import mmap
+import time
+import tarfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from annotation import category_lut
+
+INDEX_NAME = "index.json"
+SHARD_FORMAT = "shard-{:05d}.tar"
+
+
+# === Reading rendered frames ===
+
+# Frames are counted from the label maps: labels-only renders carry no "colors"
+FRAME_KEYS = ("instance_segmaps", "category_id_segmaps")
+
+
+def _label_map(f):
+    """First label map of an open bproc HDF5 file: (H, W), or (N, H, W) when it stacks N frames"""
+    key = next((k for k in FRAME_KEYS if k in f), None)
+    if key is None:
+        raise ValueError(f"{f.filename}: sin instance_segmaps ni category_id_segmaps")
+    return f[key]
+
+
+def find_frames(root):
+    """(hdf5_path, frame_idx, key) of every rendered frame under root, in a stable order"""
+    import h5py
+
+    frames = []
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".hdf5"):
+                continue
+            path = os.path.join(folder, name)
+            rel = os.path.relpath(path, os.path.dirname(os.path.abspath(root)))
+            # WebDataset keys cannot contain dots: they separate the key from the member type
+            stem = os.path.splitext(rel)[0].replace(os.sep, "_").replace(".", "_")
+            with h5py.File(path, "r") as f:
+                labels = _label_map(f)
+                n = labels.shape[0] if labels.ndim == 3 else 1
+            frames.extend((path, i, stem if n == 1 else f"{stem}_{i:04d}") for i in range(n))
+    return frames
+
+
+def _attribute_maps(value):
+    if value is None:
+        return None
+    value = value[()]
+    if isinstance(value, (bytes, np.bytes_)):
+        return json.loads(value)
+    return None
+
+
+def read_frame(hdf5_path, frame_idx=0):
+    """(rgb, instance_mask, category_ids) of one frame of a bproc HDF5 file; rgb is None without colours"""
+    import h5py
+
+    with h5py.File(hdf5_path, "r") as f:
+        multi = _label_map(f).ndim == 3
+        rgb = None
+        if "colors" in f:
+            rgb = f["colors"][frame_idx] if multi else f["colors"][()]
+        mask = f["instance_segmaps"][frame_idx] if multi else f["instance_segmaps"][()]
+        cat_map = None
+        if "category_id_segmaps" in f:
+            cat_map = f["category_id_segmaps"][frame_idx] if multi else f["category_id_segmaps"][()]
+        attributes = _attribute_maps(f.get("instance_attribute_maps"))
+    if rgb is not None and rgb.dtype != np.uint8:
+        rgb = (np.clip(rgb, 0, 1) * 255).astype(np.uint8)
+    return rgb, mask, category_lut(mask, attributes, cat_map)
+
+
+# === Encoding ===
+
+def _npy_bytes(array):
+    buf = io.BytesIO()
+    np.save(buf, np.ascontiguousarray(array), allow_pickle=False)
+    return buf.getvalue()
+
+
+def encode_frame(rgb, mask, category_ids, encoding="png"):
+    """Members of one sample: {suffix: bytes}; no rgb member when rgb is None"""
+    members = {}
+    if rgb is not None and encoding == "npy":
+        members["rgb.npy"] = _npy_bytes(rgb)
+    elif rgb is not None:
+        ok, png = cv2.imencode(".png", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_PNG_COMPRESSION, 3])
+        members["rgb.png"] = png.tobytes()
+    # Smallest dtype that holds the instance ids (int64 in bproc's output)
+    if mask.size and mask.min() >= 0 and mask.max() < 1 << 16:
+        mask = mask.astype(np.uint16)
+        if encoding == "png":
+            ok, png = cv2.imencode(".png", mask, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+            members["mask.png"] = png.tobytes()
+        else:
+            members["mask.npy"] = _npy_bytes(mask)
+    else:
+        members["mask.npy"] = _npy_bytes(mask.astype(np.int32))
+    members["cats.npy"] = _npy_bytes(category_ids.astype(np.int32))
+    return members
+
+
+class ShardWriter:
+    """Streams samples into WebDataset-style tar shards of at most max_samples / max_bytes.
+
+    Members are stored uncompressed inside the tar (PNGs are compressed on
+    their own), so a reader can mmap a shard and slice any single member.
+    index_entries holds the byte range of every member for the index file.
+    """
+
+    def __init__(self, out_dir, max_samples=1000, max_bytes=1 << 30, encoding="png", first_shard=0,
+                 shard_format=SHARD_FORMAT):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.max_samples = max_samples
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.shard_format = shard_format
+        self.shard_idx = first_shard - 1
+        self.shards = []
+        self.index_entries = []
+        self._tar = None
+        self._count = 0
+
+    def _roll(self):
+        self.close()
+        self.shard_idx += 1
+        name = self.shard_format.format(self.shard_idx)
+        self._tmp_path = os.path.join(self.out_dir, name + ".tmp")
+        self._tar = tarfile.open(self._tmp_path, "w", format=tarfile.USTAR_FORMAT)
+        self._name = name
+        self._count = 0
+
+    def write(self, key, members, source=None):
+        if self._tar is None or self._count >= self.max_samples or self._tar.offset >= self.max_bytes:
+            self._roll()
+        entry = {"key": key, "shard": self._name, "members": {}}
+        if source is not None:
+            entry["source"] = source
+        for suffix, data in members.items():
+            info = tarfile.TarInfo(f"{key}.{suffix}")
+            info.size = len(data)
+            info.mtime = 0
+            self._tar.addfile(info, io.BytesIO(data))
+            # Whatever precedes the (512-padded) data is the member's header
+            padded = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            entry["members"][suffix] = [self._tar.offset - padded, len(data)]
+        # Keep only the offsets; tarfile would otherwise grow its member list for the whole shard
+        self._tar.members = []
+        self.index_entries.append(entry)
+        self._count += 1
+
+    def close(self):
+        if self._tar is None:
+            return
+        self._tar.close()
+        os.replace(self._tmp_path, os.path.join(self.out_dir, self._name))
+        self.shards.append(self._name)
+        self._tar = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_index(out_dir, entries, encoding):
+    """Index of every sample: shard and byte range of each member (written atomically)"""
+    shards = sorted({e["shard"] for e in entries})
+    index = {"version": 1, "encoding": encoding, "shards": shards, "samples": entries}
+    tmp_path = os.path.join(out_dir, INDEX_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(out_dir, INDEX_NAME))
+    return index
+
+
+# === Conversion ===
+
+def export_shard(frames, out_dir, shard_idx, encoding="png"):
+    """Worker job: pack a list of (hdf5_path, frame_idx, key) into one shard; returns its index entries"""
+    with ShardWriter(out_dir, max_samples=len(frames), max_bytes=float("inf"), encoding=encoding,
+                     first_shard=shard_idx) as writer:
+        for path, frame_idx, key in frames:
+            rgb, mask, cats = read_frame(path, frame_idx)
+            writer.write(key, encode_frame(rgb, mask, cats, encoding), source=[path, frame_idx])
+    return writer.index_entries
+
+
+def export_trees(roots, out_dir, samples_per_shard=1000, encoding="png", workers=None):
+    """Convert rendered output trees into shards (one process per shard) plus index.json"""
+    frames = []
+    for root in roots:
+        frames.extend(find_frames(root))
+    chunks = [frames[i:i + samples_per_shard] for i in range(0, len(frames), samples_per_shard)]
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(export_shard, chunk, out_dir, i, encoding) for i, chunk in enumerate(chunks)]
+        for future in futures:
+            entries.extend(future.result())
+    index = write_index(out_dir, entries, encoding)
+
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(out_dir, s)) for s in index["shards"]) / 1e6
+    print(f"{len(entries)} frames → {len(index['shards'])} shards ({size:.1f} MB) en {elapsed:.2f}s")
+    return index
+
+
+# === Reader ===
+
+class ShardReader:
+    """Random access to exported samples; each shard is memory-mapped once.
+
+    Only the members of the requested sample are touched: .npy members come
+    back as read-only views of the map, PNG members are decoded on demand.
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        with open(os.path.join(out_dir, INDEX_NAME)) as f:
+            self.index = json.load(f)
+        self.samples = self.index["samples"]
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.samples)
+
+    def _map(self, shard):
+        if shard not in self._maps:
+            with open(os.path.join(self.out_dir, shard), "rb") as f:
+                self._maps[shard] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[shard]
+
+    def _member(self, mm, suffix, offset, size):
+        data = np.frombuffer(mm, dtype=np.uint8, count=size, offset=offset)
+        if suffix.endswith(".npy"):
+            header = io.BytesIO(data[:256].tobytes())
+            version = np.lib.format.read_magic(header)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, fortran, dtype = read_header(header)
+            array = np.frombuffer(mm, dtype=dtype, count=int(np.prod(shape)), offset=offset + header.tell())
+            return array.reshape(shape, order="F" if fortran else "C")
+        image = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+        if suffix == "rgb.png":
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return image
+
+    def sample(self, idx):
+        """{member type: array} of sample idx, e.g. keys rgb, mask, cats"""
+        entry = self.samples[idx]
+        mm = self._map(entry["shard"])
+        return {suffix.split(".")[0]: self._member(mm, suffix, offset, size)
+                for suffix, (offset, size) in entry["members"].items()}
+
+    def __getitem__(self, idx):
+        """(rgb, instance_mask, category_ids): category_ids[instance_id] is the category of an instance.
+
+        rgb is None for samples exported from labels-only renders.
+        """
+        s = self.sample(idx)
+        return s.get("rgb"), s["mask"], s["cats"]
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def close(self):
+        for mm in self._maps.values():
+            mm.close()
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Empaqueta escenas renderizadas en shards tar con índice")
+    parser.add_argument("roots", nargs="*", default=["output_scenes", "output_ply_vertex"])
+    parser.add_argument("-o", "--output", default="shards")
+    parser.add_argument("--samples-per-shard", type=int, default=1000)
+    parser.add_argument("--encoding", choices=["png", "npy"], default="png",
+                        help="png: compacto; npy: sin compresión, lectura zero-copy")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python shard_export.py output_scenes output_ply_vertex -o shards --samples-per-shard 500 -j 8
+
+if __name__ == "__main__":
+    args = parse_args()
+    export_trees([r for r in args.roots if os.path.isdir(r)], args.output, args.samples_per_shard,
+                 args.encoding, args.workers)
@@ -0,0 +1,289 @@
+import os
+import sys
+import glob
+import json
+import time
+import threading
+import functools
+import argparse
+from contextlib import contextmanager
+
+import numpy as np
+
+# Optional per-scene profilers (pyinstrument is a sampling profiler, installed separately)
+PROFILERS = ["cprofile", "pyinstrument"]
+
+
+def telemetry_name(shard_id=None):
+    return "telemetry.jsonl" if shard_id is None else f"telemetry_shard{shard_id:03d}.jsonl"
+
+
+def rss_mb():
+    """(current, peak) resident set size of this process in MB.
+
+    The peak is VmHWM, which reset_peak_rss() can reset on Linux; elsewhere
+    it is the peak of the whole process (ru_maxrss).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if line.startswith(("VmRSS", "VmHWM")))
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+        return peak, peak
+
+
+def reset_peak_rss():
+    """Start a new VmHWM window (Linux only); returns False where unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class _Record:
+    def __init__(self, kind, scene=None, **extra):
+        self.kind = kind
+        self.scene = scene
+        self.extra = extra
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.calls = {}
+        self.counters = {}
+        self.peak_rss_mb = 0.0
+
+    def as_dict(self):
+        current, peak = rss_mb()
+        return {"kind": self.kind, "scene": self.scene, **self.extra, "started_at": self.started,
+                "total_s": time.perf_counter() - self.start,
+                "stages": {k: round(v, 6) for k, v in self.stages.items()}, "calls": self.calls,
+                "counters": self.counters, "rss_mb": round(current, 1),
+                "peak_rss_mb": round(max(self.peak_rss_mb, peak), 1)}
+
+
+class Telemetry:
+    """Stage timers and counters, one JSONL record per scene.
+
+    Stages and counters go to the current scene (begin_scene) unless a scene
+    is given explicitly, which is what background writer threads do; things
+    measured outside any scene (e.g. loading the assets once) go to a "run"
+    record written by close(). Without a path nothing is written.
+    """
+
+    def __init__(self, path=None, shard_id=None, profiler=None, profile_dir=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Profiler desconocido: {profiler} (opciones: {', '.join(PROFILERS)})")
+        self.path = path
+        self.shard_id = shard_id
+        self.profiler = profiler
+        self.profile_dir = profile_dir or (os.path.join(os.path.dirname(path) or ".", "profiles") if path else None)
+        self.current = None
+        self._lock = threading.Lock()
+        self._records = {None: _Record("run", shard=shard_id)}
+        self._profile = None
+
+    def _record(self, scene):
+        return self._records.get(self.current if scene is None else scene) or self._records[None]
+
+    @contextmanager
+    def stage(self, name, scene=None):
+        """Time the enclosed block as stage `name` (durations of repeated calls add up)"""
+        record = self._record(scene)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = rss_mb()[1]
+            with self._lock:
+                record.stages[name] = record.stages.get(name, 0.0) + elapsed
+                record.calls[name] = record.calls.get(name, 0) + 1
+                record.peak_rss_mb = max(record.peak_rss_mb, peak)
+
+    def count(self, name, n=1, scene=None):
+        record = self._record(scene)
+        with self._lock:
+            record.counters[name] = record.counters.get(name, 0) + n
+
+    def add_bytes(self, paths, scene=None):
+        """Count the size of files written (missing ones are ignored)"""
+        total = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+        self.count("bytes_written", total, scene)
+        return total
+
+    def begin_scene(self, scene, **extra):
+        reset_peak_rss()
+        with self._lock:
+            self._records[scene] = _Record("scene", scene, shard=self.shard_id, **extra)
+            self.current = scene
+        if self.profiler == "cprofile":
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profile = Profiler()
+            self._profile.start()
+
+    def end_profile(self, scene):
+        """Stop the profiler of the current scene (call once its main-thread work is done)"""
+        if self._profile is None or self.profile_dir is None:
+            return None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stem = os.path.join(self.profile_dir, f"scene_{scene}")
+        if self.profiler == "cprofile":
+            self._profile.disable()
+            path = stem + ".prof"
+            self._profile.dump_stats(path)
+        else:
+            self._profile.stop()
+            path = stem + ".html"
+            with open(path, "w") as f:
+                f.write(self._profile.output_html())
+        self._profile = None
+        return path
+
+    def end_scene(self, scene, **extra):
+        """Write the record of a scene; safe to call from a writer callback thread"""
+        with self._lock:
+            record = self._records.pop(scene, None)
+            if self.current == scene:
+                self.current = None
+        if record is None:
+            return None
+        record.extra.update(extra)
+        row = record.as_dict()
+        self._write(row)
+        return row
+
+    def _write(self, row):
+        if not self.path:
+            return
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+
+    def close(self):
+        """Write the run-level record"""
+        self._write(self._records[None].as_dict())
+
+
+_default = Telemetry()
+
+
+def default_telemetry():
+    return _default
+
+
+def configure_telemetry(path=None, shard_id=None, profiler=None, profile_dir=None):
+    """Replace the process-wide Telemetry used by stage(), timed() and count()"""
+    global _default
+    _default = Telemetry(path, shard_id, profiler, profile_dir)
+    return _default
+
+
+def stage(name, scene=None):
+    return _default.stage(name, scene)
+
+
+def count(name, n=1, scene=None):
+    _default.count(name, n, scene)
+
+
+def add_bytes(paths, scene=None):
+    return _default.add_bytes(paths, scene)
+
+
+def timed(name):
+    """Decorator timing every call of a function as stage `name` of the process-wide Telemetry"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _default.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# === Summary across shards ===
+
+def read_records(paths):
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def find_telemetry(roots):
+    paths = []
+    for root in roots:
+        if os.path.isfile(root):
+            paths.append(root)
+        else:
+            paths.extend(sorted(glob.glob(os.path.join(root, "**", "telemetry*.jsonl"), recursive=True)))
+    return paths
+
+
+def summarize(records):
+    """{stage: {n, p50, p95, mean, total}} over the scene records (seconds per scene)"""
+    scenes = [r for r in records if r.get("kind") == "scene"]
+    columns = {"total": [r["total_s"] for r in scenes]}
+    for r in scenes:
+        for name in r["stages"]:
+            columns.setdefault(name, [])
+    for name in columns:
+        if name != "total":
+            columns[name] = [r["stages"].get(name, 0.0) for r in scenes]
+    frames = np.array([r["counters"].get("frames", 0) for r in scenes], dtype=float)
+    if len(scenes) and frames.sum():
+        columns["per_frame"] = list(np.array(columns["total"]) / np.maximum(frames, 1))
+    stats = {}
+    for name, values in columns.items():
+        v = np.asarray(values, dtype=float)
+        if len(v):
+            stats[name] = {"n": len(v), "p50": float(np.percentile(v, 50)), "p95": float(np.percentile(v, 95)),
+                           "mean": float(v.mean()), "total": float(v.sum())}
+    return stats
+
+
+def report(records):
+    scenes = [r for r in records if r.get("kind") == "scene"]
+    if not scenes:
+        return "Sin escenas registradas"
+    stats = summarize(records)
+    shards = {r.get("shard") for r in scenes}
+    frames = sum(r["counters"].get("frames", 0) for r in scenes)
+    written = sum(r["counters"].get("bytes_written", 0) for r in scenes) / 1e6
+    lines = [f"{len(scenes)} escenas, {len(shards)} shards, {frames} frames, {written:.1f} MB escritos, "
+             f"RSS pico {max(r['peak_rss_mb'] for r in records):.0f} MB",
+             f"{'etapa':<20}{'p50 s':>9}{'p95 s':>9}{'media s':>9}{'total s':>10}"]
+    order = sorted((k for k in stats if k not in ("total", "per_frame")), key=lambda k: -stats[k]["total"])
+    for name in order + [k for k in ("per_frame", "total") if k in stats]:
+        s = stats[name]
+        lines.append(f"{name:<20}{s['p50']:>9.3f}{s['p95']:>9.3f}{s['mean']:>9.3f}{s['total']:>10.1f}")
+    for r in records:
+        if r.get("kind") == "run" and r["stages"]:
+            run = ", ".join(f"{k} {v:.2f}s" for k, v in r["stages"].items())
+            lines.append(f"run (shard {r.get('shard')}): {run}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen p50/p95 por etapa de los telemetry*.jsonl de una corrida")
+    parser.add_argument("roots", nargs="*", default=["output_scenes"], help="carpetas de salida o archivos .jsonl")
+    return parser.parse_args(argv)
+
+
+# === USO ===
+# python telemetry.py output_scenes
+# python -m pstats output_scenes/profiles/scene_3.prof      (generador con --profile cprofile)
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(report(read_records(find_telemetry(args.roots))))
@@ -0,0 +1,188 @@
+import numpy as np
+
+# Blender's default camera: 50 mm lens on a 36 mm sensor
+DEFAULT_FOV = 2 * np.arctan(18 / 50)
+DEFAULT_RESOLUTION = (512, 512)     # (width, height), bproc's default
+
+# Coarse coverage grid used for the occlusion estimate
+OCCLUSION_GRID = 64
+
+
+def default_intrinsics(resolution=DEFAULT_RESOLUTION, fov=DEFAULT_FOV):
+    """3x3 K of a pinhole camera with horizontal field of view `fov`"""
+    w, h = resolution
+    f = (w / 2) / np.tan(fov / 2)
+    return np.array([[f, 0, w / 2], [0, f, h / 2], [0, 0, 1]])
+
+
+def euler_matrix(rotation):
+    """Rotation matrix of Blender XYZ Euler angles (R = Rz @ Ry @ Rx)"""
+    x, y, z = rotation
+    cx, sx, cy, sy, cz, sz = np.cos(x), np.sin(x), np.cos(y), np.sin(y), np.cos(z), np.sin(z)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+
+def euler_matrices(rotations):
+    """euler_matrix of many (..., 3) Euler angles at once → (..., 3, 3)"""
+    x, y, z = np.moveaxis(np.asarray(rotations, dtype=float), -1, 0)
+    cx, sx, cy, sy, cz, sz = np.cos(x), np.sin(x), np.cos(y), np.sin(y), np.cos(z), np.sin(z)
+    return np.stack([
+        np.stack([cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx], axis=-1),
+        np.stack([sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx], axis=-1),
+        np.stack([-sy, cy * sx, cy * cx], axis=-1),
+    ], axis=-2)
+
+
+def box_corners_batch(bounds, locations, rotations, scale=1.0):
+    """box_corners of N boxes (bounds (N, 2, 3)) posed many times: (..., N, 3) poses → (..., N, 8, 3)"""
+    bounds = np.asarray(bounds, dtype=float)
+    idx = np.array([[i >> 2 & 1, i >> 1 & 1, i & 1] for i in range(8)], dtype=bool)
+    local = np.where(idx, bounds[:, 1:2], bounds[:, 0:1]) * np.asarray(scale, dtype=float)
+    world = np.einsum("...nij,nkj->...nki", euler_matrices(rotations), local)
+    return world + np.asarray(locations, dtype=float)[..., None, :]
+
+
+def box_corners(bounds, location=(0, 0, 0), rotation=(0, 0, 0), scale=1.0):
+    """(8, 3) world corners of a mesh bounding box (lo, hi) after scale, rotation and translation"""
+    lo, hi = (np.asarray(b, dtype=float) for b in bounds)
+    idx = np.array([[i >> 2 & 1, i >> 1 & 1, i & 1] for i in range(8)])
+    corners = np.where(idx, hi, lo) * np.asarray(scale, dtype=float)
+    return corners @ euler_matrix(rotation).T + np.asarray(location, dtype=float)
+
+
+def project_boxes(corners, cam2world, K, resolution=DEFAULT_RESOLUTION, near=0.01):
+    """Screen rectangles of boxes seen from one camera (Blender convention: looks down -Z, up +Y).
+
+    corners: (M, 8, 3) world points. Returns (rects (M, 4) as x0, y0, x1, y1
+    clipped to the image, depth (M,) of the box centers); boxes entirely
+    behind the camera get an empty rectangle. Leading dimensions broadcast:
+    (..., M, 8, 3) corners with (..., 4, 4) poses give (..., M, 4) rects.
+    """
+    corners = np.asarray(corners, dtype=float)
+    cam2world = np.asarray(cam2world, dtype=float)
+    rot, t = cam2world[..., None, :3, :3], cam2world[..., None, None, :3, 3]
+    pc = (corners - t) @ rot            # world → camera: R^T (p - t)
+    depth = -pc[..., 2]
+    front = depth > near
+    d = np.where(front, depth, 1.0)
+    u = K[0, 0] * pc[..., 0] / d + K[0, 2]
+    v = K[1, 2] - K[1, 1] * pc[..., 1] / d
+    inf = np.inf
+    x0 = np.where(front, u, inf).min(axis=-1)
+    x1 = np.where(front, u, -inf).max(axis=-1)
+    y0 = np.where(front, v, inf).min(axis=-1)
+    y1 = np.where(front, v, -inf).max(axis=-1)
+    w, h = resolution
+    rects = np.stack([np.clip(x0, 0, w), np.clip(y0, 0, h), np.clip(x1, 0, w), np.clip(y1, 0, h)], axis=-1)
+    rects[~front.any(axis=-1)] = 0
+    return rects, depth.mean(axis=-1)
+
+
+def visible_areas(corners, cam2world, K, resolution=DEFAULT_RESOLUTION, occlusion=True, grid=OCCLUSION_GRID):
+    """Approximate visible pixels of each box from one camera.
+
+    Without occlusion it is the on-screen area of the projected rectangle.
+    With occlusion the rectangles are painted front to back on a coarse
+    grid and each box only counts the cells nobody nearer already covered.
+    """
+    rects, depth = project_boxes(corners, cam2world, K, resolution)
+    w, h = resolution
+    area = np.maximum(rects[:, 2] - rects[:, 0], 0) * np.maximum(rects[:, 3] - rects[:, 1], 0)
+    if not occlusion:
+        return area
+    covered = np.zeros((grid, grid), dtype=bool)
+    cell_area = (w / grid) * (h / grid)
+    visible = np.zeros(len(rects))
+    gx = np.array([grid / w, grid / h, grid / w, grid / h])
+    cells = np.round(rects * gx).astype(int)
+    for i in np.argsort(depth):
+        if area[i] <= 0:
+            continue
+        x0, y0, x1, y1 = cells[i]
+        patch = covered[y0:y1, x0:x1]
+        visible[i] = (~patch).sum() * cell_area
+        patch[:] = True
+    return visible
+
+
+def count_visible(corners, cam2world, K, resolution=DEFAULT_RESOLUTION, min_area=400, occlusion=True):
+    """Number of boxes with at least min_area visible pixels"""
+    return int((visible_areas(corners, cam2world, K, resolution, occlusion) >= min_area).sum())
+
+
+def segmap_visible(seg, min_pixels=400, categories=None):
+    """Number of instances with at least min_pixels pixels in a rendered segmap.
+
+    categories (annotation.category_lut) restricts the count to instances
+    with a category > 0, leaving out the plane and other props.
+    """
+    seg = np.asarray(seg)
+    if seg.size == 0 or int(seg.max()) <= 0:
+        return 0
+    counts = np.bincount(np.clip(seg, 0, None).ravel())
+    counts[0] = 0
+    if categories is not None:
+        n = min(len(counts), len(categories))
+        counts[:n][np.asarray(categories)[:n] <= 0] = 0
+        counts[n:] = 0
+    return int((counts >= min_pixels).sum())
+
+
+class CullingStats:
+    """Acceptance of sampled poses and rendered frames, and the render time it saved"""
+
+    def __init__(self):
+        self.sampled = 0
+        self.accepted = 0
+        self.first_rejected = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.render_s = 0.0
+
+    def add_render(self, frames, seconds):
+        self.rendered += frames
+        self.render_s += seconds
+
+    def summary(self):
+        if not self.sampled and not self.rendered:
+            return "Sin poses evaluadas"
+        rate = self.accepted / max(self.sampled, 1)
+        per_frame = self.render_s / max(self.rendered, 1)
+        # Without culling each pose is rendered from its first (blind) sample: only a rejected first
+        # sample or a frame dropped by the segmap check is a render that would have been wasted
+        saved = (self.first_rejected + self.dropped) * per_frame
+        kept = self.rendered - self.dropped
+        return (f"Poses: {self.accepted}/{self.sampled} aceptadas ({rate:.0%}); "
+                f"frames: {kept}/{self.rendered} conservados tras el render; "
+                f"render ahorrado ≈ {saved:.1f}s ({per_frame:.2f} s/frame)")
+
+
+def sample_visible_poses(sample_pose, n_poses, corners, K, resolution=DEFAULT_RESOLUTION, min_visible=3,
+                         min_area=400, max_tries=20, occlusion=True, stats=None):
+    """Call sample_pose(i) until pose i sees at least min_visible boxes (max_tries per pose).
+
+    If no sample of pose i passes, the one that saw the most boxes is kept,
+    so a scene always gets n_poses frames. Returns the list of poses.
+    """
+    poses = []
+    corners = np.asarray(corners, dtype=float)
+    needed = min(min_visible, len(corners))
+    for i in range(n_poses):
+        best, best_count = None, -1
+        for attempt in range(max_tries):
+            pose = sample_pose(i)
+            count = count_visible(corners, np.asarray(pose), K, resolution, min_area, occlusion)
+            if stats is not None:
+                stats.sampled += 1
+                stats.first_rejected += attempt == 0 and count < needed
+            if count > best_count:
+                best, best_count = pose, count
+            if count >= needed:
+                if stats is not None:
+                    stats.accepted += 1
+                break
+        poses.append(best)
+    return poses
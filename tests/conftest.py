@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# The modules live as flat scripts in src/
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+
+@pytest.fixture(scope="session")
+def ply_folder():
+    """The four sample assets shipped in ply/"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ply")
@@ -0,0 +1,140 @@
+import json
+
+import numpy as np
+import pytest
+
+from annotation import CocoWriter, frame_annotations, instance_stats, rle_counts, rle_to_string
+
+
+# Reference implementations written from the COCO RLE spec (pycocotools' maskApi.c)
+
+def decode_string(s):
+    """Counts of a compressed RLE string (rleFrString)"""
+    counts, p = [], 0
+    while p < len(s):
+        x, k, more = 0, 0, True
+        while more:
+            c = ord(s[p]) - 48
+            x |= (c & 0x1f) << 5 * k
+            more = c & 0x20
+            p += 1
+            k += 1
+            if not more and c & 0x10:
+                x |= -1 << 5 * k
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
+
+
+def decode_counts(counts, h, w):
+    """Binary (h, w) mask of uncompressed RLE counts: column-major, starting with zeros"""
+    flat = np.zeros(h * w, dtype=bool)
+    pos = 0
+    for i, run in enumerate(counts):
+        flat[pos:pos + run] = i % 2 == 1
+        pos += run
+    assert pos == h * w
+    return flat.reshape((h, w), order="F")
+
+
+def naive_counts(mask):
+    flat = mask.ravel(order="F")
+    counts, value, run = [], False, 0
+    for pixel in flat:
+        if pixel != value:
+            counts.append(run)
+            value, run = pixel, 0
+        run += 1
+    counts.append(run)
+    return counts
+
+
+def segmap(seed, shape=(17, 23), n_ids=6):
+    rng = np.random.default_rng(seed)
+    # Blocky instances so there are long runs as well as single pixels
+    small = rng.integers(0, n_ids, (shape[0] // 3 + 1, shape[1] // 3 + 1))
+    seg = np.kron(small, np.ones((3, 3), dtype=np.int64))[:shape[0], :shape[1]]
+    noise = rng.random(shape) < 0.05
+    seg[noise] = rng.integers(0, n_ids, noise.sum())
+    return seg
+
+
+def category_lut_of(seg):
+    return np.arange(seg.max() + 1) * 10
+
+
+def test_hand_encoded_mask():
+    # Column-major pixels 0 1 1 0 → one zero, two ones, one zero
+    seg = np.array([[0, 1], [1, 0]])
+    assert rle_counts(seg, [1]) == [[1, 2, 1]]
+    # Deltas only from the fourth count on (as in pycocotools), so no change here
+    assert rle_to_string([1, 2, 1]) == "121"
+    assert rle_to_string([1, 2, 1, 3]) == "1211"
+    # First pixel set: the counts start with an empty run of zeros
+    assert rle_counts(np.array([[2, 2], [2, 0]]), [2]) == [[0, 3, 1]]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rle_counts_match_naive_encoding(seed):
+    seg = segmap(seed)
+    seg[0, 0], seg[-1, -1] = 1, 2
+    ids = np.unique(seg)
+    for inst, counts in zip(ids, rle_counts(seg, ids)):
+        assert counts == naive_counts(seg == inst)
+        assert sum(counts) == seg.size
+
+
+@pytest.mark.parametrize("counts", [[0, 5], [1, 2, 1], [3, 40, 1000, 2, 70000, 9],
+                                    [100, 1, 1, 1, 5000, 31, 32, 33, 0]])
+def test_string_round_trip(counts):
+    assert decode_string(rle_to_string(counts)) == counts
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_annotations_match_masks(seed):
+    seg = segmap(seed)
+    h, w = seg.shape
+    annotations = frame_annotations(seg)
+    assert [a["instance_id"] for a in annotations] == [i for i in np.unique(seg).tolist() if i > 0]
+    for ann in annotations:
+        mask = seg == ann["instance_id"]
+        ys, xs = np.nonzero(mask)
+        assert ann["area"] == mask.sum()
+        assert ann["bbox"] == [xs.min(), ys.min(), xs.max() - xs.min() + 1, ys.max() - ys.min() + 1]
+        assert ann["segmentation"]["size"] == [h, w]
+        decoded = decode_counts(decode_string(ann["segmentation"]["counts"]), h, w)
+        np.testing.assert_array_equal(decoded, mask)
+
+
+def test_instance_stats_sparse_ids():
+    seg = np.zeros((5, 6), dtype=np.int64)
+    seg[1:3, 2:5] = 1 << 30
+    seg[4, 0] = 7
+    ids, areas, boxes = instance_stats(seg)
+    assert ids.tolist() == [7, 1 << 30]
+    assert areas.tolist() == [1, 6]
+    assert boxes.tolist() == [[0, 4, 1, 1], [2, 1, 3, 2]]
+
+
+def test_coco_writer(tmp_path):
+    path = str(tmp_path / "shard.json")
+    writer = CocoWriter(path)
+    first, second = segmap(0), segmap(1)
+    writer.add_frame("b.png", 23, 17, frame_annotations(second, category_lut_of(second)))
+    writer.add_frame("a.png", 23, 17, frame_annotations(first[::-1], category_lut_of(first)))
+    # A re-rendered frame replaces the earlier record
+    writer.add_frame("a.png", 23, 17, frame_annotations(first, category_lut_of(first)))
+    assert writer.close() == (2, len(frame_annotations(first)) + len(frame_annotations(second)))
+
+    with open(path) as f:
+        coco = json.load(f)
+    assert [(i["id"], i["file_name"]) for i in coco["images"]] == [(1, "a.png"), (2, "b.png")]
+    assert [a["id"] for a in coco["annotations"]] == list(range(1, len(coco["annotations"]) + 1))
+    assert [c["id"] for c in coco["categories"]] == [10, 20, 30, 40, 50]
+    for ann in coco["annotations"]:
+        seg = first if ann["image_id"] == 1 else second
+        mask = decode_counts(decode_string(ann["segmentation"]["counts"]), 17, 23)
+        np.testing.assert_array_equal(mask, seg == ann["instance_id"])
+        assert ann["category_id"] == ann["instance_id"] * 10
+        assert ann["area"] == mask.sum()
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from async_writer import AsyncWriter
+
+
+def failing(message):
+    raise IOError(message)
+
+
+def test_submit_blocks_when_queue_full():
+    release = threading.Event()
+    with AsyncWriter(max_pending=2, workers=1) as writer:
+        writer.submit(release.wait)
+        writer.submit(release.wait)
+        third = threading.Thread(target=writer.submit, args=(release.wait,))
+        third.start()
+        third.join(0.2)
+        assert third.is_alive()             # waiting for a free slot
+        assert writer.pending == 2
+        release.set()
+        third.join(5)
+        assert not third.is_alive()
+        writer.flush()
+        assert writer.completed == 3
+
+
+def test_flush_raises_first_error_once():
+    writer = AsyncWriter(max_pending=4, workers=2)
+    done = []
+    writer.submit(done.append, 1)
+    writer.submit(failing, "disco lleno")
+    writer.submit(done.append, 2)
+    with pytest.raises(IOError, match="disco lleno"):
+        writer.flush()
+    assert sorted(done) == [1, 2]
+    writer.flush()                          # already reported
+    writer.close()
+
+
+def test_close_raises_pending_error():
+    writer = AsyncWriter()
+    writer.submit(failing, "sin permiso")
+    with pytest.raises(IOError, match="sin permiso"):
+        writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(print)
+
+
+def test_after_runs_once_futures_done_in_order():
+    release = threading.Event()
+    calls = []
+    with AsyncWriter(max_pending=8, workers=2) as writer:
+        slow = writer.submit(release.wait)
+        fast = writer.submit(lambda: None)
+        fast.result()
+        writer.after([slow], lambda: calls.append("slow"))
+        writer.after([fast], lambda: calls.append("fast 1"))
+        writer.after([fast], lambda: calls.append("fast 2"))
+        assert calls == ["fast 1", "fast 2"]
+        release.set()
+        writer.flush()
+    assert calls == ["fast 1", "fast 2", "slow"]
+
+
+def test_after_skips_and_reports_failed_scene(capsys):
+    calls = []
+    writer = AsyncWriter()
+    bad = writer.submit(failing, "x")
+    good = writer.submit(lambda: None)
+    with pytest.raises(IOError):
+        writer.flush()
+    writer.after([good, bad], lambda: calls.append("scene 1"), label="manifiesto de la escena 1")
+    writer.after([good], lambda: calls.append("scene 2"))
+    assert calls == ["scene 2"]
+    assert writer.skipped_callbacks == 1
+    assert "manifiesto de la escena 1" in capsys.readouterr().out
+    writer.close()
+
+
+def test_raising_callback_keeps_the_others():
+    release = threading.Event()
+    calls = []
+
+    def broken():
+        raise ValueError("manifiesto")
+
+    writer = AsyncWriter(max_pending=8, workers=2)
+    done = writer.submit(lambda: None)
+    done.result()
+    later = writer.submit(release.wait)
+    writer._callbacks = [([done], broken, "roto"), ([later], lambda: calls.append("later"), "later"),
+                         ([done], lambda: calls.append("done"), "done")]
+    with pytest.raises(ValueError):
+        writer.after([], lambda: calls.append("new"), "new")
+    assert calls == []
+    release.set()
+    writer.flush()
+    assert calls == ["later", "done", "new"]
+    writer.close()
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import batch_obj_to_ply
+from batch_obj_to_ply import convert_all_objs_in_folder, load_manifest
+
+TRIANGLE = "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+
+
+@pytest.fixture
+def folders(tmp_path):
+    src, out = tmp_path / "obj", tmp_path / "ply"
+    src.mkdir()
+    for name in "abc":
+        (src / f"{name}.obj").write_text(TRIANGLE)
+    return str(src), str(out)
+
+
+def test_unchanged_files_skipped(folders):
+    src, out = folders
+    assert len(convert_all_objs_in_folder(src, out, workers=1)) == 3
+    assert convert_all_objs_in_folder(src, out, workers=1) == []
+    with open(os.path.join(src, "b.obj"), "a") as f:
+        f.write("v 1 1 0\nf 2 4 3\n")
+    assert [name for name, _, _ in convert_all_objs_in_folder(src, out, workers=1)] == ["b.obj"]
+
+
+def test_deleted_sources_pruned(folders):
+    src, out = folders
+    convert_all_objs_in_folder(src, out, workers=1)
+    os.remove(os.path.join(src, "a.obj"))
+    convert_all_objs_in_folder(src, out, workers=1)
+    assert sorted(load_manifest(out)) == ["b.obj", "c.obj"]
+
+
+def test_manifest_saved_as_conversions_finish(folders, monkeypatch):
+    src, out = folders
+    as_completed = batch_obj_to_ply.as_completed
+    on_disk = []
+
+    def killed_after_first(futures):
+        # What a killed run (no finally) would leave: the manifest after one conversion
+        for future in as_completed(futures):
+            yield future
+            on_disk.append(load_manifest(out))
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(batch_obj_to_ply, "as_completed", killed_after_first)
+    with pytest.raises(KeyboardInterrupt):
+        convert_all_objs_in_folder(src, out, workers=1)
+    assert len(on_disk[0]) == 1
+    assert len(load_manifest(out)) == 1
@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import textwrap
+
+import numpy as np
+import pytest
+
+from conftest import SRC
+from launcher import (scene_seed, seed_scene, split_shards, parse_scene_list, format_scene_list, launch,
+                      scene_complete, write_scene_manifest, MANIFEST_NAME)
+
+# Stand-in generator: draws from the seeded global RNG like the Blender scripts do
+FAKE_GENERATOR = textwrap.dedent("""
+    import os, sys
+    import numpy as np
+    sys.path.insert(0, {src!r})
+    from launcher import generator_args, seed_scene, write_scene_manifest
+
+    args = generator_args()
+    with open(os.path.join(args.output_dir, "runs.log"), "a") as log:
+        log.write(",".join(map(str, args.scenes)) + "\\n")
+    for scene_idx in args.scenes:
+        seed = seed_scene(args.master_seed, scene_idx)
+        scene_dir = os.path.join(args.output_dir, f"scene_{{scene_idx:02d}}")
+        os.makedirs(scene_dir, exist_ok=True)
+        np.save(os.path.join(scene_dir, "draws.npy"), np.random.uniform(size=8))
+        write_scene_manifest(scene_dir, scene_idx, seed)
+""")
+
+
+@pytest.fixture
+def generator(tmp_path):
+    path = tmp_path / "fake_generator.py"
+    path.write_text(FAKE_GENERATOR.format(src=SRC))
+    return str(path)
+
+
+def run(generator, output_dir, scenes, workers, master_seed=0):
+    os.makedirs(output_dir, exist_ok=True)
+    return launch(generator, scenes, str(output_dir), workers=workers, threads_per_worker=1,
+                  master_seed=master_seed, runner=[sys.executable])
+
+
+def runs(output_dir):
+    path = os.path.join(output_dir, "runs.log")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [parse_scene_list(line.strip()) for line in f]
+
+
+def draws(output_dir, scenes):
+    return np.array([np.load(os.path.join(output_dir, f"scene_{s:02d}", "draws.npy")) for s in scenes])
+
+
+def test_scene_seed_depends_on_index_only():
+    scenes = list(range(50))
+    seeds = {s: scene_seed(7, s) for s in scenes}
+    assert len(set(seeds.values())) == len(scenes)
+    for n_shards in (1, 3, 8, 50):
+        shards = split_shards(scenes, n_shards)
+        assert sorted(s for shard in shards for s in shard) == scenes
+        assert {s: scene_seed(7, s) for shard in shards for s in shard} == seeds
+    assert scene_seed(8, 0) != seeds[0]
+
+
+def test_seed_scene_reproduces_draws():
+    seed_scene(3, 12)
+    first = np.random.uniform(size=5)
+    np.random.uniform(size=100)
+    seed_scene(3, 12)
+    np.testing.assert_array_equal(np.random.uniform(size=5), first)
+
+
+def test_scene_list_round_trip():
+    scenes = parse_scene_list("0-9,20,30-31")
+    assert scenes == list(range(10)) + [20, 30, 31]
+    assert format_scene_list(scenes) == "0-9,20,30-31"
+
+
+def test_same_output_for_any_shard_count(tmp_path, generator):
+    scenes = list(range(12))
+    one, four = tmp_path / "one", tmp_path / "four"
+    assert run(generator, one, scenes, workers=1) == 0
+    assert run(generator, four, scenes, workers=4) == 0
+    assert len(runs(four)) == 4
+    np.testing.assert_array_equal(draws(four, scenes), draws(one, scenes))
+
+
+def test_resume_skips_finished_scenes(tmp_path, generator):
+    out = tmp_path / "out"
+    scenes = list(range(6))
+    run(generator, out, scenes, workers=2)
+    assert all(scene_complete(out / f"scene_{s:02d}") for s in scenes)
+    before = draws(out, scenes)
+
+    run(generator, out, scenes, workers=2)
+    assert len(runs(out)) == 2                      # nothing pending, no process started
+
+    # A truncated output file makes its scene pending again; the others are left alone
+    with open(out / "scene_04" / "draws.npy", "r+b") as f:
+        f.truncate(10)
+    run(generator, out, scenes, workers=2)
+    assert runs(out)[-1] == [4]
+    np.testing.assert_array_equal(draws(out, scenes), before)
+
+
+def test_scene_without_manifest_is_pending(tmp_path):
+    scene_dir = tmp_path / "scene_00"
+    scene_dir.mkdir()
+    (scene_dir / "0.hdf5").write_bytes(b"x" * 10)
+    assert not scene_complete(scene_dir)
+    write_scene_manifest(str(scene_dir), 0, 1)
+    assert scene_complete(scene_dir)
+    (scene_dir / MANIFEST_NAME).write_text("{")
+    assert not scene_complete(scene_dir)
+
+
+def test_empty_manifest_is_complete(tmp_path):
+    # Every frame culled: the scene is finished with no files
+    write_scene_manifest(str(tmp_path), 0, 1, extra={"kept_frames": 0})
+    with open(tmp_path / MANIFEST_NAME) as f:
+        assert json.load(f)["files"] == {}
+    assert scene_complete(tmp_path)
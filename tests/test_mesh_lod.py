@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from mesh_lod import choose_lods, LOD_SCREEN_PX
+
+
+def test_choose_lods_boundaries():
+    # A size exactly at a threshold reaches it and keeps the finer level
+    assert choose_lods([256, 257, 255]).tolist() == [0, 0, 1]
+    assert choose_lods([96, 95, 32, 31, 0]).tolist() == [1, 2, 2, 3, 3]
+
+
+@pytest.mark.parametrize("thresholds", [LOD_SCREEN_PX, (500, 100), (64,)])
+def test_choose_lods_first_reached_threshold(thresholds):
+    sizes = np.arange(0, 600)
+    expected = [next((k for k, t in enumerate(thresholds) if s >= t), len(thresholds)) for s in sizes]
+    assert choose_lods(sizes, thresholds).tolist() == expected
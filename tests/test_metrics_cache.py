@@ -0,0 +1,114 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+import metrics_cache
+from metrics_cache import MetricsCache, analyze_images_cached, fast_digest
+from image_metrics import flag_images, get_image_paths
+
+
+@pytest.fixture
+def photos(tmp_path):
+    folder = tmp_path / "fotos"
+    folder.mkdir()
+    rng = np.random.default_rng(0)
+    for i in range(4):
+        image = (rng.random((64, 80, 3)) * 255 * (i + 1) / 4).astype(np.uint8)
+        cv2.imwrite(str(folder / f"{i}.png"), image)
+    return sorted(get_image_paths(str(folder)))
+
+
+def analyze(paths, db):
+    return analyze_images_cached(paths, str(db), workers=0)
+
+
+def lookup(paths, db):
+    with MetricsCache(str(db)) as cache:
+        return cache.lookup(paths)
+
+
+def no_decoding(monkeypatch):
+    def fail(path):
+        raise AssertionError(f"decoded {path}")
+    monkeypatch.setattr(metrics_cache, "analyze_image", fail)
+
+
+def test_unchanged_files_hit(photos, tmp_path, monkeypatch):
+    db = tmp_path / "cache.sqlite"
+    first = analyze(photos, db)
+    no_decoding(monkeypatch)
+    second = analyze(photos, db)
+    assert first.equals(second)
+    assert lookup(photos, db) == (photos, [])
+
+
+def test_changed_files_miss(photos, tmp_path):
+    db = tmp_path / "cache.sqlite"
+    analyze(photos, db)
+    # Size change
+    with open(photos[0], "ab") as f:
+        f.write(b"\0")
+    # Same size, new mtime, different content (the digest notices)
+    data = bytearray(open(photos[1], "rb").read())
+    data[100] ^= 0xFF
+    with open(photos[1], "wb") as f:
+        f.write(data)
+    # Only touched: new mtime, same content
+    st = os.stat(photos[2])
+    os.utime(photos[2], ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    cached, stale = lookup(photos, db)
+    assert stale == photos[:2]
+    assert cached == photos[2:]
+    # The touched file's new mtime is stored, so the next lookup needs no digest
+    with MetricsCache(str(db)) as cache:
+        assert cache._stamps()[os.path.abspath(photos[2])][1] == os.stat(photos[2]).st_mtime_ns
+
+
+def test_version_bump_recomputes(photos, tmp_path, monkeypatch):
+    db = tmp_path / "cache.sqlite"
+    analyze(photos, db)
+    monkeypatch.setattr(metrics_cache, "METRICS_VERSION", metrics_cache.METRICS_VERSION + 1)
+    assert lookup(photos, db) == ([], photos)
+    with MetricsCache(str(db)) as cache:
+        assert len(cache.load()) == 0
+
+
+def test_hit_from_another_working_directory(photos, tmp_path, monkeypatch):
+    db = tmp_path / "cache.sqlite"
+    monkeypatch.chdir(tmp_path)
+    relative = [os.path.relpath(p) for p in photos]
+    first = analyze(relative, db)
+    assert first["path"].tolist() == relative
+    monkeypatch.chdir(tmp_path / "fotos")
+    no_decoding(monkeypatch)
+    df = analyze([os.path.basename(p) for p in photos], db)
+    assert df["path"].tolist() == [os.path.basename(p) for p in photos]
+    assert lookup(photos, db) == (photos, [])
+
+
+def test_thresholds_reapplied_without_images(photos, tmp_path):
+    db = tmp_path / "cache.sqlite"
+    expected = analyze(photos, db)
+    shutil.rmtree(os.path.dirname(photos[0]))
+    with MetricsCache(str(db)) as cache:
+        df = cache.load()
+    assert len(df) == len(photos)
+    strict = flag_images(df, blur_threshold=np.inf)
+    assert strict["blurred"].all() and not strict["good"].any()
+    np.testing.assert_array_equal(flag_images(df).values, flag_images(expected).values)
+
+
+def test_fast_digest_reads_head_and_tail(tmp_path):
+    path = tmp_path / "big.bin"
+    data = bytearray(os.urandom(3 * metrics_cache.DIGEST_BLOCK))
+    path.write_bytes(data)
+    digest = fast_digest(str(path))
+    data[len(data) // 2] ^= 0xFF              # middle byte: not sampled
+    path.write_bytes(data)
+    assert fast_digest(str(path)) == digest
+    data[-1] ^= 0xFF
+    path.write_bytes(data)
+    assert fast_digest(str(path)) != digest
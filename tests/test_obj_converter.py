@@ -0,0 +1,66 @@
+import numpy as np
+
+from obj_converter import read_obj, write_ply, convert_obj_with_vertex_colors_to_ply, VERTEX_DTYPE, DEFAULT_COLOR
+from mesh_store import read_ply
+
+CUBE_CORNERS = [(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)]
+
+
+def write_obj(path, text):
+    path.write_bytes(text.encode())
+    return str(path)
+
+
+def test_vertex_colors_and_default(tmp_path):
+    obj = write_obj(tmp_path / "a.obj", "v 0 0 0 1 0 0\nv 1 0 0\nv 0 1 0 0 0.5 1\nf 1 2 3\n")
+    vertices, faces = read_obj(obj)
+    np.testing.assert_array_equal(vertices["red"], [255, DEFAULT_COLOR[0], 0])
+    np.testing.assert_array_equal(vertices["green"], [0, DEFAULT_COLOR[1], 127])
+    np.testing.assert_array_equal(vertices["blue"], [0, DEFAULT_COLOR[2], 255])
+    np.testing.assert_array_equal(faces, [[0, 1, 2]])
+
+
+def test_polygons_fan_triangulated(tmp_path):
+    obj = write_obj(tmp_path / "a.obj", "".join(f"v {x} {y} {z}\n" for x, y, z in CUBE_CORNERS) +
+                    "f 1 2 4 3\nf 5/1/1 6/2/2 8/3/3 7/4/4 1//5\n")
+    _, faces = read_obj(obj)
+    np.testing.assert_array_equal(faces, [[0, 1, 3], [0, 3, 2], [4, 5, 7], [4, 7, 6], [4, 6, 0]])
+
+
+def test_negative_indices_count_from_face_line(tmp_path):
+    # -1 is the last vertex defined before the face, not the last one in the file
+    obj = write_obj(tmp_path / "a.obj", "v 0 0 0\nv 1 0 0\nv 0 1 0\nf -3 -2 -1\n"
+                                        "v 1 1 0\nf -1 -2 -3\nf 1 -1 3\n")
+    _, faces = read_obj(obj)
+    np.testing.assert_array_equal(faces, [[0, 1, 2], [3, 2, 1], [0, 3, 2]])
+
+
+def test_comments_and_other_records_ignored(tmp_path):
+    obj = write_obj(tmp_path / "a.obj", "# exported\nmtllib a.mtl\no thing\nv 0 0 0 # origin\nv 1 0 0\n"
+                                        "vn 0 0 1\nvt 0 0\nv 0 1 0\ns off\nf 1 2 3 # lid\n")
+    vertices, faces = read_obj(obj)
+    assert len(vertices) == 3
+    np.testing.assert_array_equal(faces, [[0, 1, 2]])
+
+
+def test_write_ply_round_trip(tmp_path):
+    obj = write_obj(tmp_path / "a.obj", "".join(f"v {x} {y} {z} {x} {y} {z}\n" for x, y, z in CUBE_CORNERS) +
+                    "f 1 2 4 3\nf 5 6 8 7\n")
+    for binary in (True, False):
+        ply = str(tmp_path / f"a_{binary}.ply")
+        n_vertices, n_faces = convert_obj_with_vertex_colors_to_ply(obj, ply, binary=binary, verbose=False)
+        mesh = read_ply(ply, mmap=False)
+        assert (n_vertices, n_faces) == (8, 4)
+        vertices, faces = read_obj(obj)
+        np.testing.assert_array_equal(mesh.vertices.astype(VERTEX_DTYPE), vertices)
+        np.testing.assert_array_equal(mesh.faces, faces)
+
+
+def test_write_ply_drops_extra_properties(tmp_path):
+    vertices = np.zeros(3, dtype=VERTEX_DTYPE.descr + [("alpha", "u1")])
+    vertices["x"] = [0, 1, 0]
+    vertices["alpha"] = 7
+    write_ply(str(tmp_path / "a.ply"), vertices, [[0, 1, 2]])
+    mesh = read_ply(str(tmp_path / "a.ply"), mmap=False)
+    assert mesh.vertices.dtype.names == VERTEX_DTYPE.names
+    np.testing.assert_array_equal(mesh.vertices["x"], [0, 1, 0])
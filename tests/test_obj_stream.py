@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from obj_converter import read_obj, convert_obj_with_vertex_colors_to_ply
+
+
+def random_obj(path, n_vertices=300, n_faces=400, seed=0):
+    """OBJ mixing coloured and plain vertices, quads, comments and relative indices"""
+    rng = np.random.default_rng(seed)
+    lines, defined = ["# random mesh"], 0
+    for i in range(n_vertices + n_faces):
+        if defined < 4 or (rng.random() < n_vertices / (n_vertices + n_faces) and defined < n_vertices):
+            x, y, z, r, g, b = rng.random(6)
+            lines.append(f"v {x:.6f} {y:.6f} {z:.6f}" + (f" {r:.4f} {g:.4f} {b:.4f}" if i % 3 else ""))
+            defined += 1
+        else:
+            idx = rng.choice(defined, rng.integers(3, min(6, defined + 1)), replace=False) + 1
+            if rng.random() < 0.3:
+                idx = idx - defined - 1
+            lines.append("f " + " ".join(map(str, idx)) + (" # face" if i % 7 == 0 else ""))
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1000])
+def test_chunked_parse_matches_whole_file(tmp_path, chunk_size):
+    # Small chunks split lines and relative faces across block boundaries
+    obj = random_obj(tmp_path / "a.obj")
+    vertices, faces = read_obj(obj, chunk_size=1 << 30)
+    chunked_vertices, chunked_faces = read_obj(obj, chunk_size=chunk_size)
+    np.testing.assert_array_equal(chunked_vertices, vertices)
+    np.testing.assert_array_equal(chunked_faces, faces)
+    assert faces.min() >= 0 and faces.max() < len(vertices)
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_spill_output_byte_identical(tmp_path, binary):
+    obj = random_obj(tmp_path / "a.obj", seed=1)
+    convert_obj_with_vertex_colors_to_ply(obj, str(tmp_path / "mem.ply"), binary=binary, verbose=False)
+    convert_obj_with_vertex_colors_to_ply(obj, str(tmp_path / "spill.ply"), binary=binary, verbose=False,
+                                          spill=True, chunk_size=100)
+    assert (tmp_path / "spill.ply").read_bytes() == (tmp_path / "mem.ply").read_bytes()
+
+
+def test_no_trailing_newline(tmp_path):
+    (tmp_path / "a.obj").write_bytes(b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3")
+    _, faces = read_obj(str(tmp_path / "a.obj"), chunk_size=5)
+    np.testing.assert_array_equal(faces, [[0, 1, 2]])
+
+
+@pytest.mark.parametrize("text, line", [("v 0 0 0\nv 1 x 0\n", "v 1 x 0"), ("v 0 0\n", "v 0 0"),
+                                        ("v 0 0 0\nf 1 2.5 3\n", "f 1 2.5 3")])
+def test_malformed_line_raises(tmp_path, text, line):
+    (tmp_path / "a.obj").write_text(text)
+    with pytest.raises(ValueError, match=line):
+        read_obj(str(tmp_path / "a.obj"))
+
+
+def test_short_face_warns(tmp_path):
+    (tmp_path / "a.obj").write_text("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2\nf 1 2 3\n")
+    with pytest.warns(UserWarning, match="1 caras"):
+        _, faces = read_obj(str(tmp_path / "a.obj"))
+    np.testing.assert_array_equal(faces, [[0, 1, 2]])
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from placement import poisson_disk_positions, planogram_positions, min_clearance, footprint_radius, PlacementError
+from scene_planner import plan_scenes, asset_info, shelf_positions, LAYOUTS, PARKED_Z
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_poisson_disk_no_overlap(seed):
+    rng = np.random.default_rng(seed)
+    radii = rng.uniform(0.05, 0.4, rng.integers(2, 40))
+    positions = poisson_disk_positions(radii, bounds=(-3, 3, -3, 3), gap=0.01, rng=rng, strict=False)
+    placed = ~np.isnan(positions[:, 0])
+    assert placed.sum() >= 2
+    assert min_clearance(positions[placed], radii[placed]) >= 0.01 - 1e-9
+
+
+def test_poisson_disk_raises_when_full():
+    with pytest.raises(PlacementError) as info:
+        poisson_disk_positions([1.0] * 10, bounds=(-1, 1, -1, 1), rng=np.random.default_rng(0),
+                               dart_attempts=256)
+    error = info.value
+    assert 0 < error.placed.sum() < 10
+    assert np.isnan(error.positions[~error.placed]).all()
+    assert min_clearance(error.positions[error.placed], np.ones(error.placed.sum())) >= 0
+
+
+def test_planned_scenes_no_overlap(ply_folder):
+    names, bounds = asset_info(ply_folder)
+    radii = np.array([max(LAYOUTS["spaced"]["min_radius"], footprint_radius(b, upright=False)) for b in bounds])
+    plan = plan_scenes(range(50), names, bounds, "spaced", lods=False)
+    for positions in plan["positions"]:
+        on_floor = positions[:, 2] != PARKED_Z
+        assert min_clearance(positions[on_floor], radii[on_floor]) >= -1e-5    # float32 positions
+
+
+def assert_rows_valid(positions, widths, shelf_width, gap=0.0):
+    """Facings of each row (same y, z) inside the shelf and not overlapping along X"""
+    rows = {}
+    for p, w in zip(positions, widths):
+        rows.setdefault((round(p[1], 6), round(p[2], 6)), []).append((p[0] - w / 2, p[0] + w / 2))
+    for spans in rows.values():
+        spans.sort()
+        assert spans[0][0] >= -shelf_width / 2 - 1e-9 and spans[-1][1] <= shelf_width / 2 + 1e-9
+        assert all(b[0] - a[1] >= gap - 1e-9 for a, b in zip(spans, spans[1:]))
+    return rows
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_planogram_rows(seed):
+    rng = np.random.default_rng(seed)
+    widths = rng.uniform(0.1, 0.8, 12)
+    rows = [(0.0, 0.0), (0.1, 1.0), (0.2, 2.0), (0.3, 3.0)]
+    positions = planogram_positions(widths, 2.5, rows, gap=0.05, jitter=0.02, rng=rng)
+    used = assert_rows_valid(positions, widths, 2.5)
+    assert set(used) <= set(rows)
+    # Filled in order: a facing only starts a new row when it did not fit on the previous one
+    row_of = [rows.index((p[1], p[2])) for p in positions]
+    assert row_of == sorted(row_of)
+
+
+def test_planogram_alignment():
+    widths = np.array([0.5, 0.5, 0.5])
+    left = planogram_positions(widths, 2.0, [(0, 0)], gap=0.1)
+    np.testing.assert_allclose(left[:, 0], [-0.75, -0.15, 0.45])
+    center = planogram_positions(widths, 2.0, [(0, 0)], gap=0.1, align="center")
+    np.testing.assert_allclose(center[:, 0], [-0.6, 0.0, 0.6], atol=1e-12)
+    # Each full row is centred on its own
+    two_rows = planogram_positions([0.9, 0.9, 0.5], 2.0, [(0, 0), (0, 1)], gap=0.1, align="center")
+    np.testing.assert_allclose(two_rows[:, 0], [-0.5, 0.5, 0.0], atol=1e-12)
+
+
+def test_planogram_jitter_stays_on_shelf():
+    widths = np.full(4, 0.45)
+    for seed in range(50):
+        positions = planogram_positions(widths, 2.0, [(0, 0)], gap=0.05, jitter=1.0, rng=np.random.default_rng(seed))
+        assert_rows_valid(positions, widths, 2.0)
+
+
+def test_planogram_raises_when_rows_full():
+    with pytest.raises(PlacementError) as info:
+        planogram_positions([1.0] * 5, 2.0, [(0, 0), (0, 1)])
+    assert info.value.placed.tolist() == [True] * 4 + [False]
+
+
+def test_planned_planogram_scenes(ply_folder):
+    names, bounds = asset_info(ply_folder)
+    spec = LAYOUTS["planogram"]
+    widths = (bounds[:, 1, 0] - bounds[:, 0, 0]) * spec["scale"]
+    plan = plan_scenes(range(30), names, bounds, "planogram", lods=False)
+    assert not plan["rotations"].any()
+    for positions in plan["positions"]:
+        assert (positions[:, 2] != PARKED_Z).all()
+        # Bottom of every box on its row
+        bottoms = positions[:, 2] + bounds[:, 0, 2] * spec["scale"]
+        assert np.isin(np.round(bottoms, 4), [round(z, 4) for _, z in spec["rows"]]).all()
+        shelved = positions.astype(np.float64)
+        shelved[:, 2] = bottoms
+        assert_rows_valid(shelved, widths, spec["shelf_width"])
+
+
+def test_shelf_positions_park_what_does_not_fit():
+    spec = dict(LAYOUTS["planogram"], rows=((0.0, 0.0),))
+    bounds = np.array([[[-0.5, -0.1, 0.0], [0.5, 0.1, 1.0]]] * 6)
+    positions, parked = shelf_positions(np.random.default_rng(0), bounds, spec)
+    assert parked == 6 - int((positions[:, 2] != PARKED_Z).sum()) > 0
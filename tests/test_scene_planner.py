@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from scene_planner import plan_scenes, asset_info, LAYOUTS
+
+PER_SCENE = ["seeds", "positions", "rotations", "scales", "lods", "cam2world", "sun_location", "sun_energy"]
+
+
+@pytest.fixture(scope="module")
+def assets(ply_folder):
+    return asset_info(ply_folder)
+
+
+@pytest.mark.parametrize("layout", list(LAYOUTS))
+def test_subset_matches_full_plan(assets, layout):
+    names, bounds = assets
+    full = plan_scenes(range(12), names, bounds, layout, master_seed=3)
+    for subset in ([7], [11, 0, 4]):
+        part = plan_scenes(subset, names, bounds, layout, master_seed=3)
+        for key in PER_SCENE:
+            if key in full:
+                np.testing.assert_array_equal(part[key], full[key][subset], err_msg=key)
+
+
+def test_subset_matches_full_plan_with_culling(assets):
+    names, bounds = assets
+    full = plan_scenes(range(6), names, bounds, culling=True)
+    part = plan_scenes([5], names, bounds, culling=True)
+    np.testing.assert_array_equal(part["cam2world"], full["cam2world"][[5]])
+
+
+def test_master_seed_changes_plan(assets):
+    names, bounds = assets
+    a = plan_scenes(range(3), names, bounds, master_seed=0)
+    b = plan_scenes(range(3), names, bounds, master_seed=1)
+    assert not np.array_equal(a["positions"], b["positions"])
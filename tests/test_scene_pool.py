@@ -0,0 +1,47 @@
+import numpy as np
+
+from fake_bproc import FakeBproc
+from scene_pool import ScenePool
+
+
+def run_scenes(pool, n_scenes, copies=2):
+    shown = []
+    for _ in range(n_scenes):
+        pool.begin_scene()
+        objects = []
+        for name in pool.names:
+            for copy_idx in range(copies):
+                objects.extend(pool.place(name, np.random.uniform(-2, 2, 3), copy_idx=copy_idx))
+        shown.append(objects)
+    return shown
+
+
+def test_assets_loaded_once(ply_folder):
+    bproc = FakeBproc()
+    pool = ScenePool(bproc, ply_folder, use_lods=False).load()
+    loads = bproc.stats["load_obj"]
+    assert loads == len(pool.names)
+    run_scenes(pool, 5)
+    assert bproc.stats["load_obj"] == loads
+
+
+def test_copies_reused_across_scenes(ply_folder):
+    bproc = FakeBproc()
+    pool = ScenePool(bproc, ply_folder, use_lods=False).load()
+    first, *rest = run_scenes(pool, 4)
+    duplicates = bproc.stats["duplicates"]
+    assert duplicates == len(pool.names)    # one linked copy per asset, made in the first scene
+    run_scenes(pool, 3)
+    assert bproc.stats["duplicates"] == duplicates
+    for objects in rest:
+        assert [id(obj) for obj in objects] == [id(obj) for obj in first]
+
+
+def test_begin_scene_hides_previous_objects(ply_folder):
+    bproc = FakeBproc()
+    pool = ScenePool(bproc, ply_folder, use_lods=False).load()
+    objects = run_scenes(pool, 1, copies=1)[0]
+    assert not any(obj.is_hidden() for obj in objects)
+    pool.begin_scene()
+    assert all(obj.is_hidden() for obj in objects)
+    assert pool.visible_objects() == []
@@ -0,0 +1,80 @@
+import h5py
+import numpy as np
+import pytest
+
+from shard_export import ShardReader, export_shard, find_frames, write_index
+
+
+def segmaps(rng, shape=(24, 32)):
+    mask = rng.integers(0, 4, shape).astype(np.int64)
+    cats = np.choose(mask, [0, 7, 8, 9]).astype(np.int64)
+    return mask, cats
+
+
+def write_hdf5(path, colors=None, **maps):
+    with h5py.File(path, "w") as f:
+        if colors is not None:
+            f.create_dataset("colors", data=colors)
+        for key, value in maps.items():
+            f.create_dataset(key, data=value)
+
+
+def export(root, out_dir, encoding):
+    frames = find_frames(str(root))
+    entries = export_shard(frames, str(out_dir), 0, encoding)
+    write_index(str(out_dir), entries, encoding)
+    return frames
+
+
+@pytest.mark.parametrize("encoding", ["png", "npy"])
+def test_labels_only_frames(tmp_path, encoding):
+    rng = np.random.default_rng(0)
+    root = tmp_path / "output_scenes" / "scene_0000"
+    root.mkdir(parents=True)
+    mask, cats = segmaps(rng)
+    write_hdf5(root / "0.hdf5", instance_segmaps=mask, category_id_segmaps=cats)
+
+    frames = export(tmp_path / "output_scenes", tmp_path / "shards", encoding)
+    assert len(frames) == 1
+    reader = ShardReader(str(tmp_path / "shards"))
+    rgb, got_mask, got_cats = reader[0]
+    assert rgb is None
+    assert "rgb" not in reader.sample(0)
+    np.testing.assert_array_equal(got_mask, mask)
+    np.testing.assert_array_equal(got_cats, [0, 7, 8, 9])
+
+
+def test_stacked_frames_counted_from_segmaps(tmp_path):
+    rng = np.random.default_rng(1)
+    root = tmp_path / "output_scenes"
+    root.mkdir()
+    masks, cats = zip(*(segmaps(rng) for _ in range(3)))
+    write_hdf5(root / "0.hdf5", instance_segmaps=np.stack(masks), category_id_segmaps=np.stack(cats))
+
+    frames = export(root, tmp_path / "shards", "npy")
+    assert [frame_idx for _, frame_idx, _ in frames] == [0, 1, 2]
+    for (rgb, mask, _), expected in zip(ShardReader(str(tmp_path / "shards")), masks):
+        assert rgb is None
+        np.testing.assert_array_equal(mask, expected)
+
+
+def test_frames_with_colours(tmp_path):
+    rng = np.random.default_rng(2)
+    root = tmp_path / "output_scenes"
+    root.mkdir()
+    mask, cats = segmaps(rng)
+    colors = rng.random(mask.shape + (3,)).astype(np.float32)
+    write_hdf5(root / "0.hdf5", colors=colors, instance_segmaps=mask, category_id_segmaps=cats)
+
+    export(root, tmp_path / "shards", "png")
+    rgb, got_mask, _ = ShardReader(str(tmp_path / "shards"))[0]
+    np.testing.assert_array_equal(rgb, (np.clip(colors, 0, 1) * 255).astype(np.uint8))
+    np.testing.assert_array_equal(got_mask, mask)
+
+
+def test_file_without_label_maps(tmp_path):
+    root = tmp_path / "output_scenes"
+    root.mkdir()
+    write_hdf5(root / "0.hdf5", colors=np.zeros((4, 4, 3), np.uint8))
+    with pytest.raises(ValueError, match="instance_segmaps"):
+        find_frames(str(root))
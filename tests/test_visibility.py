@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from visibility import CullingStats, box_corners, default_intrinsics, sample_visible_poses, segmap_visible
+
+# One box 5 m in front of the default camera (looks down -Z)
+CORNERS = box_corners(((-1, -1, -1), (1, 1, 1)), location=(0, 0, -5))[None]
+FRONT = np.eye(4)
+BACK = np.diag([-1.0, 1.0, -1.0, 1.0])     # turned around: sees nothing
+
+
+def run(samples, stats, max_tries=3):
+    """sample_visible_poses over scripted samples: samples[i] are the poses tried for pose i"""
+    queues = [list(s) for s in samples]
+    return sample_visible_poses(lambda i: queues[i].pop(0), len(samples), CORNERS, default_intrinsics(),
+                                min_visible=1, max_tries=max_tries, stats=stats)
+
+
+def test_first_rejected_counts_blind_samples_only():
+    stats = CullingStats()
+    poses = run([[BACK, BACK, FRONT], [FRONT], [BACK, BACK, BACK]], stats)
+    assert [p is FRONT for p in poses] == [True, True, False]
+    assert (stats.sampled, stats.accepted, stats.first_rejected) == (7, 2, 2)
+
+
+def test_saved_render_time():
+    stats = CullingStats()
+    run([[BACK, BACK, FRONT], [FRONT], [BACK, BACK, BACK]], stats)
+    stats.add_render(3, 3.0)
+    stats.dropped = 1
+    # 2 rejected first samples + 1 dropped frame at 1 s/frame; retries of one pose are not extra renders
+    assert "render ahorrado ≈ 3.0s (1.00 s/frame)" in stats.summary()
+    assert "Poses: 2/7 aceptadas" in stats.summary()
+
+
+def test_accepted_first_samples_save_nothing():
+    stats = CullingStats()
+    run([[FRONT], [FRONT]], stats)
+    stats.add_render(2, 4.0)
+    assert stats.first_rejected == 0
+    assert "render ahorrado ≈ 0.0s" in stats.summary()
+
+
+@pytest.mark.parametrize("categories, expected", [(None, 2), ([0, 0, 1, 1], 1)])
+def test_segmap_visible(categories, expected):
+    seg = np.zeros((40, 40), dtype=np.int64)
+    seg[:20, :20] = 1
+    seg[20:, :] = 2
+    seg[:20, 20:21] = 3
+    assert segmap_visible(seg, min_pixels=400, categories=categories) == expected